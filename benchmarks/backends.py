@@ -0,0 +1,186 @@
+"""
+Detector backend comparison.
+
+Runs every given model (best.pt and its exports from `python -m src.export`)
+over a local YOLO-format validation set and reports mAP@0.5, precision and
+recall at CONFIDENCE_THRESHOLD, and per-image latency. The first model is
+the baseline the others are compared against.
+
+    python -m benchmarks.backends models/best.pt models/best.onnx models/best.int8.onnx \\
+                                  models/best_openvino_model [--data data/valid] [--out backends.json]
+"""
+import argparse
+import json
+import os
+import time
+import cv2
+import numpy as np
+import src.config as config
+from src.detectors.backends import load_backend
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+EVAL_CONF = 0.001   # Keep low-confidence boxes for the precision/recall curve
+IOU_MATCH = 0.5
+
+
+# ==========================================
+# DATASET
+# ==========================================
+def load_dataset(directory, limit):
+    """Returns [(image, labels)] with labels as (class_id, x1, y1, x2, y2) pixel rows."""
+    image_dir = os.path.join(directory, "images")
+    label_dir = os.path.join(directory, "labels")
+    names = sorted(n for n in os.listdir(image_dir) if n.lower().endswith(IMAGE_EXTENSIONS))
+
+    samples = []
+    for name in names[:limit]:
+        image = cv2.imread(os.path.join(image_dir, name))
+        if image is None:
+            continue
+        h, w = image.shape[:2]
+        labels = np.zeros((0, 5), dtype=np.float32)
+        label_path = os.path.join(label_dir, os.path.splitext(name)[0] + ".txt")
+        if os.path.exists(label_path):
+            rows = np.loadtxt(label_path, dtype=np.float32, ndmin=2)
+            if rows.size:
+                cls, cx, cy, bw, bh = rows[:, :5].T
+                labels = np.stack([cls, (cx - bw / 2) * w, (cy - bh / 2) * h,
+                                   (cx + bw / 2) * w, (cy + bh / 2) * h], axis=1)
+        samples.append((image, labels))
+    return samples
+
+
+# ==========================================
+# METRICS
+# ==========================================
+def box_iou(a, b):
+    """IoU matrix between (N, 4) and (M, 4) xyxy boxes."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match(predictions, labels):
+    """
+    Greedy matching per image at IOU_MATCH. Returns (confs, class_ids, is_tp)
+    over all predictions and the number of ground-truth boxes per class.
+    """
+    confs, class_ids, hits = [], [], []
+    gt_counts = np.zeros(len(config.CLASS_NAMES), dtype=np.int64)
+    for (xyxy, cls, conf), gt in zip(predictions, labels):
+        gt_cls = gt[:, 0].astype(np.int32)
+        np.add.at(gt_counts, gt_cls, 1)
+        tp = np.zeros(len(conf), dtype=bool)
+        if len(conf) and len(gt):
+            iou = box_iou(xyxy, gt[:, 1:])
+            iou[cls[:, None] != gt_cls[None, :]] = 0
+            used = np.zeros(len(gt), dtype=bool)
+            for i in np.argsort(-conf):
+                candidates = np.where(used, 0, iou[i])
+                j = candidates.argmax()
+                if candidates[j] >= IOU_MATCH:
+                    used[j] = True
+                    tp[i] = True
+        confs.append(conf)
+        class_ids.append(cls)
+        hits.append(tp)
+    return np.concatenate(confs), np.concatenate(class_ids), np.concatenate(hits), gt_counts
+
+
+def average_precision(confs, is_tp, n_gt):
+    """All-point interpolated AP for one class."""
+    if n_gt == 0:
+        return None
+    order = np.argsort(-confs)
+    tp = np.cumsum(is_tp[order])
+    fp = np.cumsum(~is_tp[order])
+    recall = np.concatenate(([0.0], tp / n_gt, [1.0]))
+    precision = np.concatenate(([1.0], tp / np.maximum(tp + fp, 1), [0.0]))
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    return float(np.sum(np.diff(recall) * precision[1:]))
+
+
+def evaluate(predictions, labels):
+    confs, class_ids, is_tp, gt_counts = match(predictions, labels)
+    per_class = {}
+    for cls_id, name in config.CLASS_NAMES.items():
+        mask = class_ids == cls_id
+        per_class[name] = average_precision(confs[mask], is_tp[mask], gt_counts[cls_id])
+    aps = [ap for ap in per_class.values() if ap is not None]
+
+    # Operating point used by the live system
+    keep = confs >= config.CONFIDENCE_THRESHOLD
+    tp = int(is_tp[keep].sum())
+    return {
+        "map50": float(np.mean(aps)) if aps else 0.0,
+        "ap50": per_class,
+        "precision": tp / max(int(keep.sum()), 1),
+        "recall": tp / max(int(gt_counts.sum()), 1),
+    }
+
+
+def run_model(path, samples, imgsz, warmup):
+    backend = load_backend(path, "auto")
+    images = [image for image, _ in samples]
+    for image in images[:warmup]:
+        backend.predict([image], EVAL_CONF, imgsz)
+
+    latencies, predictions = [], []
+    for image in images:
+        start = time.perf_counter()
+        predictions.extend(backend.predict([image], EVAL_CONF, imgsz))
+        latencies.append(time.perf_counter() - start)
+
+    result = evaluate(predictions, [labels for _, labels in samples])
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+    result.update({"backend": backend.name, "p50_ms": float(p50), "p95_ms": float(p95)})
+    return result
+
+
+# ==========================================
+# ENTRY POINT
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Compare detector backends on accuracy and latency")
+    parser.add_argument("models", nargs="+", help="Model paths; the first one is the baseline")
+    parser.add_argument("--data", default=os.path.join(config.ROOT_DIR, "data", "valid"),
+                        help="Directory with images/ and labels/ in YOLO format")
+    parser.add_argument("--limit", type=int, default=500, help="Max validation images")
+    parser.add_argument("--imgsz", type=int, default=config.YOLO_INPUT_SIZE)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--out", help="Write JSON results here")
+    args = parser.parse_args()
+
+    samples = load_dataset(args.data, args.limit)
+    if not samples:
+        print(f"❌ No validation images in {args.data}/images")
+        return
+    print(f"⏱️  {len(samples)} validation images, imgsz {args.imgsz}")
+
+    results = {}
+    print(f"{'model':<36} {'backend':<12} {'mAP50':>6} {'P':>6} {'R':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for path in args.models:
+        r = results[path] = run_model(path, samples, args.imgsz, args.warmup)
+        print(f"{os.path.basename(path.rstrip('/')):<36} {r['backend']:<12} {r['map50']:>6.3f} "
+              f"{r['precision']:>6.3f} {r['recall']:>6.3f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}")
+
+    baseline = results[args.models[0]]
+    if len(args.models) > 1:
+        print(f"\nvs {os.path.basename(args.models[0].rstrip('/'))}:")
+        for path in args.models[1:]:
+            r = results[path]
+            speedup = baseline["p50_ms"] / r["p50_ms"] if r["p50_ms"] else 0.0
+            print(f"   {os.path.basename(path.rstrip('/')):<36} mAP50 {r['map50'] - baseline['map50']:+.3f}  "
+                  f"{speedup:.2f}x faster")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"data": args.data, "images": len(samples), "models": results}, f, indent=2)
+        print(f"💾 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Head-pose solver benchmark.
+
+Replays a synthetic head trajectory (smooth pitch/yaw/roll sweeps with
+pixel noise on the projected landmarks) through DistractionDetector in
+each solver mode and reports angle error against the ground truth and
+per-call latency.
+
+    python -m benchmarks.head_pose [--frames 3000] [--noise 1.0]
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+import src.config as config
+from src.detectors.distraction import DistractionDetector, MODEL_POINTS
+from src.detectors.landmarks import NUM_LANDMARKS, POSE_IDXS
+
+# (label, solver, warm_start)
+MODES = [
+    ("iterative (cold)", "iterative", False),
+    ("iterative + warm", "iterative", True),
+    ("sqpnp (cold)", "sqpnp", False),
+    ("sqpnp + warm", "sqpnp", True),
+    ("epnp (cold)", "epnp", False),
+    ("epnp + warm", "epnp", True),
+]
+
+
+def make_trajectory(n_frames, frame_w, frame_h, noise, seed=0):
+    """
+    Returns (points, true_angles): a list of (NUM_LANDMARKS, 3) landmark
+    arrays and the (n_frames, 3) ground-truth pitch/yaw/roll.
+    """
+    rng = np.random.default_rng(seed)
+    detector = DistractionDetector()
+    camera_matrix, dist_coeffs = detector.get_camera(frame_w, frame_h)
+
+    t = np.arange(n_frames) / config.FPS
+    pitch = 25 * np.sin(2 * np.pi * t / 7.0)
+    yaw = 40 * np.sin(2 * np.pi * t / 11.0)
+    roll = 10 * np.sin(2 * np.pi * t / 5.0)
+
+    # The model is y-up and the image is y-down, so the face is flipped about x
+    flip = np.diag([1.0, -1.0, -1.0])
+    tvec = np.array([[0.0], [0.0], [2900.0]])
+
+    points, true_angles = [], []
+    for p, y, r in zip(pitch, yaw, roll):
+        # Ground truth is whatever the detector's own angle conversion reports
+        # for the true pose, so only the solver error is measured
+        head_rmat, _ = cv2.Rodrigues(np.radians([p, y, r]))
+        rvec, _ = cv2.Rodrigues(flip @ head_rmat)
+
+        projected, _ = cv2.projectPoints(MODEL_POINTS, rvec, tvec, camera_matrix, dist_coeffs)
+        frame_points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        frame_points[POSE_IDXS, :2] = projected[:, 0, :] + rng.normal(0, noise, (len(POSE_IDXS), 2))
+
+        points.append(frame_points)
+        true_angles.append(DistractionDetector.rotation_to_angles(rvec))
+
+    return points, np.array(true_angles)
+
+
+def make_poses(count, frame_w, frame_h, max_angle=35.0, depths=(1500.0, 3000.0), seed=0):
+    """
+    Noise-free landmarks of `count` random head poses (pitch / yaw / roll
+    each within +-max_angle, nose 1500-3000 model units from the camera
+    and anywhere in the middle 60% of the frame).
+    Returns an (F, NUM_LANDMARKS, 3) stack.
+    """
+    rng = np.random.default_rng(seed)
+    camera_matrix, dist_coeffs = DistractionDetector().get_camera(frame_w, frame_h)
+    flip = np.diag([1.0, -1.0, -1.0])
+    points = np.zeros((count, NUM_LANDMARKS, 3), dtype=np.float32)
+    for i in range(count):
+        head_rmat, _ = cv2.Rodrigues(np.radians(rng.uniform(-max_angle, max_angle, 3)))
+        rvec, _ = cv2.Rodrigues(flip @ head_rmat)
+        # Anywhere in the frame, as in multi-face mode
+        depth = rng.uniform(*depths)
+        nose = rng.uniform([0.2 * frame_w, 0.2 * frame_h], [0.8 * frame_w, 0.8 * frame_h])
+        tvec = np.append((nose - camera_matrix[:2, 2]) / camera_matrix[[0, 1], [0, 1]] * depth, depth)[:, None]
+        projected, _ = cv2.projectPoints(MODEL_POINTS, rvec, tvec, camera_matrix, dist_coeffs)
+        points[i, POSE_IDXS, :2] = projected[:, 0, :]
+    return points
+
+
+def affine_vs_pnp(points, frame_w, frame_h):
+    """
+    (F, 3) absolute pitch / yaw / roll differences between the batched
+    affine fit (get_head_poses, multi-face mode) and cold PnP per face,
+    and the share of faces whose pitch and yaw signs agree.
+    """
+    detector = DistractionDetector(warm_start=False)
+    pnp = np.array([detector.get_head_pose(p, frame_w, frame_h) for p in points])
+    affine = DistractionDetector.get_head_poses(points, detector.get_camera(frame_w, frame_h)[0])
+    same_sign = (np.sign(pnp[:, :2]) == np.sign(affine[:, :2])).all(axis=1).mean()
+    return angle_error(affine, pnp), same_sign
+
+
+def angle_error(a, b):
+    """Absolute angle difference in degrees, wrapped to [0, 180]."""
+    d = np.abs(a - b) % 360
+    return np.minimum(d, 360 - d)
+
+
+def run_mode(solver, warm_start, points, true_angles, frame_w, frame_h):
+    detector = DistractionDetector(solver=solver, warm_start=warm_start)
+    latencies = np.empty(len(points))
+    angles = np.empty((len(points), 3))
+
+    for i, frame_points in enumerate(points):
+        start = time.perf_counter()
+        angles[i] = detector.get_head_pose(frame_points, frame_w, frame_h)
+        latencies[i] = time.perf_counter() - start
+
+    errors = angle_error(angles, true_angles)
+    return {
+        "mean_error": errors.mean(axis=0),
+        "p95_error": np.percentile(errors.max(axis=1), 95),
+        "p50_us": np.percentile(latencies, 50) * 1e6,
+        "p95_us": np.percentile(latencies, 95) * 1e6,
+        "warm": detector.warm_solves,
+        "cold": detector.cold_solves,
+        "resets": detector.resets,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark head-pose solver modes")
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--noise", type=float, default=1.0, help="Landmark noise (pixels, std)")
+    parser.add_argument("--width", type=int, default=config.FRAME_WIDTH)
+    parser.add_argument("--height", type=int, default=config.FRAME_HEIGHT)
+    args = parser.parse_args()
+
+    points, true_angles = make_trajectory(args.frames, args.width, args.height, args.noise)
+
+    print(f"Head pose benchmark: {args.frames} frames, {args.width}x{args.height}, noise {args.noise}px")
+    print(f"{'mode':<18} {'pitch':>7} {'yaw':>7} {'roll':>7} {'p95max':>7} "
+          f"{'p50 us':>8} {'p95 us':>8} {'warm':>6} {'cold':>6} {'resets':>6}")
+    for label, solver, warm_start in MODES:
+        r = run_mode(solver, warm_start, points, true_angles, args.width, args.height)
+        pitch_err, yaw_err, roll_err = r["mean_error"]
+        print(f"{label:<18} {pitch_err:>7.2f} {yaw_err:>7.2f} {roll_err:>7.2f} {r['p95_error']:>7.2f} "
+              f"{r['p50_us']:>8.1f} {r['p95_us']:>8.1f} {r['warm']:>6} {r['cold']:>6} {r['resets']:>6}")
+
+    # The batched affine fit of multi-face mode against PnP, on exact landmarks
+    errors, same_sign = affine_vs_pnp(make_poses(args.frames, args.width, args.height), args.width, args.height)
+    print(f"\nAffine fit (multi-face) vs PnP, {len(errors)} poses within +-35 deg at depth 1500-3000:")
+    print(f"{'':<18} {'pitch':>7} {'yaw':>7} {'roll':>7}")
+    for label, values in (("median error", np.median(errors, axis=0)),
+                          ("p95 error", np.percentile(errors, 95, axis=0)),
+                          ("max error", errors.max(axis=0))):
+        print(f"{label:<18} {values[0]:>7.2f} {values[1]:>7.2f} {values[2]:>7.2f}")
+    print(f"{'same sign':<18} {same_sign:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
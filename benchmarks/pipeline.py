@@ -0,0 +1,282 @@
+"""
+Pipeline benchmark.
+
+Replays a fixed set of frames through every stage separately
+(FaceMeshDetector, DrowsinessDetector, DistractionDetector, ObjectDetector,
+Visualizer) and through the whole serial pipeline, and reports
+p50/p95/p99 latency, throughput and peak RSS per stage.
+
+    python -m benchmarks.pipeline [--clip video.mp4 | --images dir/] [--stub-model]
+                                  [--out results.json] [--compare baseline.json]
+
+Without --clip/--images a synthetic clip is generated. With --stub-model
+(or when models/best.pt is missing) YOLO is replaced by benchmarks.stubs.StubYOLO.
+Results are JSON, so runs from different commits can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import cv2
+import numpy as np
+import src.config as config
+from benchmarks.head_pose import make_trajectory
+from benchmarks.stubs import StubYOLO
+
+STAGES = ("face_mesh", "drowsiness", "distraction", "object", "visualizer", "end_to_end")
+
+
+# ==========================================
+# INPUT FRAMES
+# ==========================================
+def load_clip(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def load_images(directory, limit):
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith((".jpg", ".jpeg", ".png")))
+    frames = [cv2.imread(os.path.join(directory, n)) for n in names[:limit]]
+    return [f for f in frames if f is not None]
+
+
+def synthetic_clip(count, width, height, seed=0):
+    """Noise background with a moving bright blob, deterministic per seed."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = int(width * (0.3 + 0.4 * (i % 60) / 60))
+        cv2.circle(frame, (x, height // 2), height // 6, (200, 180, 160), -1)
+        frames.append(frame)
+    return frames
+
+
+# ==========================================
+# MEASUREMENT
+# ==========================================
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies, rss_before):
+    latencies = np.asarray(latencies)
+    total = latencies.sum()
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    rss = peak_rss_mb()
+    return {
+        "n": int(len(latencies)),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "mean_ms": float(latencies.mean() * 1000),
+        "throughput_fps": float(len(latencies) / total) if total > 0 else 0.0,
+        "peak_rss_mb": float(rss),
+        "rss_growth_mb": float(rss - rss_before),
+    }
+
+
+def run_stage(fn, inputs, warmup):
+    """Calls fn(item) for every input and returns per-call latencies (s)."""
+    for item in inputs[:warmup]:
+        fn(item)
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+# ==========================================
+# BENCHMARK
+# ==========================================
+def build_detectors(stub_model, stub_latency):
+    from src.detectors.face_mesh import FaceMeshDetector
+    from src.detectors.drowsiness import DrowsinessDetector
+    from src.detectors.distraction import DistractionDetector
+    from src.detectors.object_det import ObjectDetector
+    from src.utils.visualizer import Visualizer
+
+    object_det = ObjectDetector()
+    if stub_model or object_det.model is None:
+        print(f"ℹ️  Using StubYOLO ({stub_latency * 1000:.0f}ms per call) instead of {config.YOLO_MODEL_PATH}")
+        object_det.model = StubYOLO(latency=stub_latency, per_image=0.0)
+
+    return FaceMeshDetector(), DrowsinessDetector(), DistractionDetector(), object_det, Visualizer()
+
+
+def uses_stub(object_det):
+    return isinstance(object_det.model, StubYOLO)
+
+
+def run_benchmark(frames, warmup, stub_model, stub_latency):
+    from src.main import handle_packet
+    from src.pipeline import FramePacket
+
+    face_mesh, drowsy_det, distract_det, object_det, viz = build_detectors(stub_model, stub_latency)
+    h, w, _ = frames[0].shape
+
+    class _SilentAlerter:
+        def trigger(self, alert_type="warning", reason=None, source=None, subject=None):
+            pass
+    alerter = _SilentAlerter()
+
+    # Landmarks: real ones where a face is found, synthetic head poses otherwise,
+    # so the EAR / PnP stages always have work to do
+    synthetic_points, _ = make_trajectory(len(frames), w, h, noise=1.0)
+    points = []
+    for frame, fallback in zip(frames, synthetic_points):
+        found = face_mesh.get_points(frame)
+        points.append(found.copy() if found is not None else fallback)
+
+    objects = object_det.detect(frames[0])
+    results = {}
+
+    def measure(name, fn, inputs):
+        rss_before = peak_rss_mb()
+        results[name] = summarize(run_stage(fn, inputs, warmup), rss_before)
+        print_row(name, results[name])
+
+    print_header()
+    measure("face_mesh", face_mesh.get_points, frames)
+    measure("drowsiness", lambda p: drowsy_det.analyze(p, w, h), points)
+    measure("distraction", lambda p: distract_det.analyze(p, w, h), points)
+    measure("object", object_det.detect, frames)
+
+    def draw(frame):
+        packet = FramePacket(0, time.time(), frame.copy())
+        handle_packet(packet, objects, alerter, viz)
+        viz.draw_fps(packet.frame, 30)
+    measure("visualizer", draw, frames)
+
+    # Serial end to end, YOLO on every DETECTION_INTERVAL-th frame like the fixed schedule
+    state = {"i": 0, "objects": []}
+
+    def end_to_end(frame):
+        frame = cv2.flip(frame, 1)
+        found = face_mesh.get_points(frame)
+        p = found if found is not None else points[state["i"] % len(points)]
+        packet = FramePacket(state["i"], time.time(), frame)
+        packet.is_drowsy, packet.ear_score = drowsy_det.analyze(p, w, h)
+        packet.is_distracted, packet.pose_data = distract_det.analyze(p, w, h)
+        if state["i"] % config.DETECTION_INTERVAL == 0:
+            state["objects"] = object_det.detect(frame)
+        handle_packet(packet, state["objects"], alerter, viz)
+        state["i"] += 1
+    measure("end_to_end", end_to_end, frames)
+
+    return results, uses_stub(object_det)
+
+
+# ==========================================
+# REPORTING
+# ==========================================
+def print_header():
+    print(f"{'stage':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fps':>9} {'rss MB':>8} {'+MB':>6}")
+
+
+def print_row(name, r):
+    print(f"{name:<12} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+          f"{r['throughput_fps']:>9.1f} {r['peak_rss_mb']:>8.1f} {r['rss_growth_mb']:>6.1f}")
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=config.ROOT_DIR, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Prints p50/p95 changes vs a baseline run. Returns True if any stage regressed."""
+    regressed = False
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'}:")
+    for name in STAGES:
+        new, old = results.get(name), baseline["stages"].get(name)
+        if not new or not old or not old["p50_ms"]:
+            continue
+        change = new["p50_ms"] / old["p50_ms"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  ⚠️  slower"
+            regressed = True
+        print(f"   {name:<12} p50 {old['p50_ms']:.2f} -> {new['p50_ms']:.2f}ms ({change:+.0%}) "
+              f"p95 {old['p95_ms']:.2f} -> {new['p95_ms']:.2f}ms{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage and the full pipeline")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--clip", help="Video file to replay")
+    source.add_argument("--images", help="Directory of frames to replay")
+    parser.add_argument("--frames", type=int, default=300, help="Max frames to replay")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--stub-model", action="store_true", help="Replace YOLO with StubYOLO")
+    parser.add_argument("--stub-latency", type=float, default=0.02, help="StubYOLO seconds per call")
+    parser.add_argument("--out", help="Write JSON results here")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="p50 slowdown (fraction) that counts as a regression")
+    args = parser.parse_args()
+
+    if args.clip:
+        frames = load_clip(args.clip, args.frames)
+    elif args.images:
+        frames = load_images(args.images, args.frames)
+    else:
+        frames = synthetic_clip(args.frames, config.FRAME_WIDTH, config.FRAME_HEIGHT)
+    if not frames:
+        print("❌ No frames to replay.")
+        sys.exit(1)
+
+    h, w, _ = frames[0].shape
+    print(f"⏱️  Benchmarking {len(frames)} frames at {w}x{h} (warmup {args.warmup})")
+    stages, stubbed = run_benchmark(frames, args.warmup, args.stub_model, args.stub_latency)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "frames": len(frames),
+            "resolution": [w, h],
+            "source": args.clip or args.images or "synthetic",
+            "stub_model": stubbed,
+        },
+        "stages": stages,
+    }
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(stages, baseline, args.threshold):
+            sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
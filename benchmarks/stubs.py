@@ -0,0 +1,60 @@
+"""
+Stand-ins for heavy models so the benchmarks run without models/best.pt.
+"""
+import time
+import numpy as np
+
+
+class _Array:
+    """Mimics the torch tensors on ultralytics results (.cpu().numpy())."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data
+
+
+class _Boxes:
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy = _Array(xyxy)
+        self.cls = _Array(cls)
+        self.conf = _Array(conf)
+
+    def __len__(self):
+        return len(self.xyxy.data)
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class StubYOLO:
+    """
+    Stand-in detector backend (see src/detectors/backends.py), also callable
+    like an ultralytics YOLO model. Sleeps `latency` seconds per batch plus
+    `per_image` seconds per image and reports one phone box per image.
+    """
+    name = "stub"
+
+    def __init__(self, latency=0.02, per_image=0.005):
+        self.latency = latency
+        self.per_image = per_image
+        self._boxes = _Boxes(
+            np.array([[100.0, 120.0, 180.0, 260.0]], dtype=np.float32),
+            np.array([0.0], dtype=np.float32),
+            np.array([0.9], dtype=np.float32),
+        )
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        time.sleep(self.latency + self.per_image * len(images))
+        return [_Result(self._boxes) for _ in images]
+
+    def predict(self, images, conf, imgsz):
+        b = self._boxes
+        return [(b.xyxy.data, b.cls.data.astype(np.int32), b.conf.data) for _ in self(images)]
@@ -1,69 +1,126 @@
+import argparse
 import cv2
-import os
-import time
-
-# Settings
-output_folder = "data/raw/webcam_captures"
-
-# Counters
-counts = {'phone': 0, 'food': 0, 'drink': 0}
-
-# Create folder if not exists
-if not os.path.exists(output_folder):
-    os.makedirs(output_folder)
-
-cap = cv2.VideoCapture(0)
-
-# Set resolution
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-print("--- Data Collection Tool ---")
-print("Press '0' -> Save PHONE")
-print("Press '1' -> Save FOOD")
-print("Press '2' -> Save DRINK")
-print("Press 'q' -> QUIT")
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("Error: Camera not found.")
-        break
-    
-    # Copy frame for drawing text (so we don't save the text on the image)
-    display_frame = frame.copy()
-    
-    # Display Status
-    status_text = f"Phone: {counts['phone']} | Food: {counts['food']} | Drink: {counts['drink']}"
-    cv2.putText(display_frame, status_text, (10, 30), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-    
-    cv2.imshow("Data Collector", display_frame)
-    
-    key = cv2.waitKey(1) & 0xFF
-    
-    if key == ord('q'):
-        break
-    elif key == ord('0'):
-        filename = f"{output_folder}/phone_{int(time.time())}.jpg"
-        cv2.imwrite(filename, frame)
-        counts['phone'] += 1
-        print(f"Saved PHONE ({counts['phone']})")
-        time.sleep(0.2) # Small delay to prevent accidental double-clicks
-        
-    elif key == ord('1'):
-        filename = f"{output_folder}/food_{int(time.time())}.jpg"
-        cv2.imwrite(filename, frame)
-        counts['food'] += 1
-        print(f"Saved FOOD ({counts['food']})")
-        time.sleep(0.2)
-        
-    elif key == ord('2'):
-        filename = f"{output_folder}/drink_{int(time.time())}.jpg"
-        cv2.imwrite(filename, frame)
-        counts['drink'] += 1
-        print(f"Saved DRINK ({counts['drink']})")
-        time.sleep(0.2)
-
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+import numpy as np
+import src.config as config
+from src.utils.dataset import DatasetWriter, HashIndex, dhash
+from src.utils.sources import open_source
+
+# '0' / '1' / '2' save one frame, 'p' / 'f' / 'd' start or stop a burst
+SHOT_KEYS = {ord(str(cls_id)): label for cls_id, label in config.CLASS_NAMES.items()}
+BURST_KEYS = {ord(label[0]): label for label in config.CLASS_NAMES.values()}
+STATUS_HEIGHT = 70
+
+def capture(frame, label, timestamp, index, writer, counts):
+    """Queues `frame` as `label` unless it nearly duplicates a kept image. Returns True if queued."""
+    h = dhash(frame)
+    if index.is_duplicate(h):
+        counts['duplicates'] += 1
+        return False
+    if writer.save(frame, label, timestamp) is None:
+        return False
+    index.add(h)
+    counts[label] += 1
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture labeled training images")
+    parser.add_argument("--source", default="0", help="Camera index, video file, folder or stream URL")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--out", default=config.COLLECT_DIR, help="Output folder")
+    parser.add_argument("--burst-fps", type=float, default=config.COLLECT_BURST_FPS,
+                        help="Frames per second saved while a burst is recording")
+    parser.add_argument("--dedup", type=int, default=config.COLLECT_DEDUP_DISTANCE,
+                        help="Max dHash bits from a kept image that count as a duplicate (-1 = keep all)")
+    parser.add_argument("--prelabel", action="store_true",
+                        help="Write YOLO label files with the current model's boxes (review before training)")
+    args = parser.parse_args()
+
+    detector = None
+    if args.prelabel:
+        from src.detectors.object_det import ObjectDetector
+        detector = ObjectDetector(background=True)
+
+    writer = DatasetWriter(args.out, detector=detector)
+    index = HashIndex(args.dedup)
+    if index.distance >= 0:
+        print(f"ℹ️  Indexed {index.add_folder(args.out)} existing images for duplicate checks")
+
+    # Counters
+    counts = dict.fromkeys(config.CLASS_NAMES.values(), 0)
+    counts['duplicates'] = 0
+
+    # Read ahead in the background (always the newest frame of a camera)
+    source = open_source(args.source, args.width, args.height)
+
+    print("--- Data Collection Tool ---")
+    for key, label in SHOT_KEYS.items():
+        print(f"Press '{chr(key)}' -> Save {label.upper()}   '{label[0]}' -> Start / stop a {label.upper()} burst")
+    print("Press 'q' -> QUIT")
+
+    status_strip = None  # Pixels under the status text, restored before saving
+    burst = None         # Label being recorded continuously
+    last_burst = 0.0
+
+    while True:
+        # The frame is a recycled buffer, valid until the next read
+        ret, frame, timestamp = source.read(timeout=1.0)
+        if not ret:
+            if source.finished:
+                print("Error: Camera not found.")
+                break
+            continue
+
+        # Draw the status on the frame itself and put the covered strip back
+        # after showing it (so we don't save the text on the image). Only the
+        # top rows are copied instead of the whole frame.
+        if status_strip is None or status_strip.shape[1] != frame.shape[1]:
+            status_strip = np.empty((STATUS_HEIGHT, frame.shape[1], 3), dtype=np.uint8)
+        np.copyto(status_strip, frame[:STATUS_HEIGHT])
+
+        # Display Status
+        status_text = " | ".join(f"{label.capitalize()}: {counts[label]}" for label in config.CLASS_NAMES.values())
+        cv2.putText(frame, status_text, (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        detail = f"Dup: {counts['duplicates']} | Dropped: {writer.dropped} | Queue: {writer.pending}"
+        if burst is not None:
+            detail = f"REC {burst.upper()} | {detail}"
+        cv2.putText(frame, detail, (10, 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255) if burst else (0, 255, 0), 2)
+
+        cv2.imshow("Data Collector", frame)
+        np.copyto(frame[:STATUS_HEIGHT], status_strip)
+
+        if burst is not None and timestamp - last_burst >= 1.0 / args.burst_fps:
+            last_burst = timestamp
+            capture(frame, burst, timestamp, index, writer, counts)
+
+        key = cv2.waitKey(1) & 0xFF
+
+        if key == ord('q'):
+            break
+        elif key in SHOT_KEYS:
+            # Holding the key repeats it; near-duplicates are skipped, so no delay is needed
+            label = SHOT_KEYS[key]
+            if capture(frame, label, timestamp, index, writer, counts):
+                print(f"Saved {label.upper()} ({counts[label]})")
+        elif key in BURST_KEYS:
+            label = BURST_KEYS[key]
+            if burst == label:
+                print(f"ℹ️  {label.upper()} burst stopped ({counts[label]} total)")
+                burst = None
+            else:
+                print(f"📷 Recording {label.upper()} at {args.burst_fps:g} fps (press '{chr(key)}' again to stop)")
+                burst = label
+
+    source.release()
+    cv2.destroyAllWindows()
+
+    print("🔄 Writing queued images...")
+    writer.close()
+    print(f"✅ Saved {writer.saved} images to {args.out} "
+          f"({counts['duplicates']} near-duplicates skipped, {writer.dropped} dropped"
+          + (f", {writer.labeled} pre-labeled)" if detector is not None else ")"))
+
+if __name__ == "__main__":
+    main()
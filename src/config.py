@@ -8,15 +8,27 @@ ROOT_DIR = os.path.dirname(BASE_DIR)
 MODELS_DIR = os.path.join(ROOT_DIR, 'models')
 
 # Pointing to your trained Custom Model
+# (or an export of it: best.onnx, best.int8.onnx, best_openvino_model/ -> python -m src.export)
 YOLO_MODEL_PATH = os.path.join(MODELS_DIR, 'best.pt') 
 
 # ==========================================
 # 2. CAMERA SETTINGS
 # ==========================================
 CAMERA_INDEX = 0      # 0 = Default Webcam
+# What main() reads: a camera index or /dev/video* path, a video file, an
+# image folder, an rtsp:// URL or a GStreamer pipeline ("... ! appsink")
+CAMERA_SOURCE = CAMERA_INDEX
 FRAME_WIDTH = 1280    # HD Resolution (Better for distance detection)
 FRAME_HEIGHT = 720
 FPS = 30
+CAMERA_FOURCC = "MJPG"  # Pixel format asked from cameras (None = driver default)
+CAMERA_BUFFERS = 1      # Driver-side frame queue; short = fresh frames
+SOURCE_READ_AHEAD = 4   # Frames decoded ahead for files / folders (live sources keep only the newest)
+SOURCE_RECONNECT_DELAY = 0.5      # Seconds before reopening a lost camera / stream (doubles each try)
+SOURCE_RECONNECT_MAX_DELAY = 10.0
+RTSP_BACKEND = "ffmpeg"  # or "gstreamer" (OpenCV built with GStreamer)
+RTSP_LATENCY_MS = 0      # rtspsrc jitter buffer with the gstreamer backend
+MAX_FPS = 60          # Upper bound used to size the time-window ring buffers
 
 # ==========================================
 # 3. OBJECT DETECTION (YOLOv8)
@@ -25,8 +37,44 @@ FPS = 30
 CONFIDENCE_THRESHOLD = 0.30  
 
 # UPDATED: Run every 10 frames (approx 0.3s) to catch quick sips/bites
+# (only used when ADAPTIVE_DETECTION is off)
 DETECTION_INTERVAL = 10  
 
+# Adaptive scheduling: run YOLO often while something is happening,
+# back off while the scene is static and empty
+ADAPTIVE_DETECTION = True
+TARGET_FPS = 30                # End-to-end frame rate we want to keep
+DETECTION_MIN_INTERVAL = 0.1   # Seconds between detections in an active scene
+DETECTION_MAX_INTERVAL = 1.0   # Seconds between detections in a static scene
+DETECTION_MIN_SHARE = 0.2      # YOLO may always use at least this share of CPU time
+MOTION_THRESHOLD = 0.02        # Mean frame difference (0-1) that counts as movement
+ACTIVITY_HOLD = 2.0            # Keep the fast rate this long after the last activity
+
+# Model input size (pixels). ROI crops are resized to this before inference
+YOLO_INPUT_SIZE = 640
+
+# Inference backend: "auto" (from the model file name), "ultralytics",
+# "onnxruntime" or "openvino". The last two do not import PyTorch.
+YOLO_BACKEND = "auto"
+YOLO_IOU_THRESHOLD = 0.7  # NMS overlap for the exported backends
+YOLO_THREADS = 0          # CPU threads for the exported backends (0 = runtime default)
+
+# ROI mode: run YOLO only on a region around the face and upper body
+# (falls back to the full frame when no face is found)
+ROI_DETECTION = True
+ROI_MARGIN = 1.5          # Face widths added left and right
+ROI_MARGIN_UP = 0.5       # Face heights added above the forehead
+ROI_MARGIN_DOWN = 3.0     # Face heights added below the chin (hands / torso)
+ROI_MIN_SIZE = 320        # Never crop smaller than this (pixels)
+
+# Object tracking: carry YOLO boxes between detections with a Kalman/IoU
+# tracker (persistent IDs, moving boxes, one alert per tracked object).
+# With tracking on, DETECTION_INTERVAL / DETECTION_MAX_INTERVAL can be raised.
+OBJECT_TRACKING = True
+TRACK_IOU_MIN = 0.3       # Min IoU between a track's predicted box and a detection
+TRACK_MIN_HITS = 2        # Detections before a track is shown / alerts
+TRACK_MAX_AGE = 1.5       # Seconds without a detection before a track is dropped
+
 # Must match the training order: 0=phone, 1=food, 2=drink
 CLASS_NAMES = {
     0: 'phone',
@@ -45,8 +93,39 @@ COLORS = {
 # ==========================================
 # 4. DROWSINESS (Mediapipe)
 # ==========================================
+# Decode only the landmarks the detectors use (False = all 478 points)
+LANDMARK_SUBSET = True
+
+# Faces analyzed per frame. Above 1 every face is monitored: EAR and head
+# pose are computed for all faces in one vectorized pass and each face keeps
+# its own state under a stable face ID (src/detectors/faces.py). FACE_TRACKING
+# and the PnP settings (HEAD_POSE_*) only apply with a single face.
+MAX_NUM_FACES = 1
+MAX_TRACKED_FACES = 2 * MAX_NUM_FACES  # Face IDs kept (visible + recently lost)
+FACE_ID_IOU_MIN = 0.3      # Min IoU with a face's previous box to keep its ID
+FACE_ID_MAX_AGE = 1.0      # Seconds a lost face keeps its ID
+
+# Tracking mode: run the mesh only every FACE_MESH_EVERY frames, on a crop
+# around the last face, and follow the used landmarks with optical flow in
+# between. Re-detects as soon as the tracked points drift or move too fast.
+FACE_TRACKING = False
+FACE_MESH_EVERY = 3        # Full mesh at least every N frames
+FACE_MESH_CROP = True      # Run the mesh on a face crop instead of the full frame
+FACE_CROP_MARGIN = 0.6     # Face sizes added around the crop on each side
+FACE_CROP_SIZE = 320       # Crops larger than this (pixels) are downscaled first
+TRACK_MAX_FB_ERROR = 1.5   # Max forward-backward optical flow error (pixels) per point
+TRACK_MAX_MOTION = 0.15    # Max median point motion per frame (fraction of face width)
+
 EAR_THRESHOLD = 0.25      # Eye Aspect Ratio (below 0.25 = closed)
+EAR_OPEN_THRESHOLD = 0.27 # ...and open again only above this (hysteresis)
 EAR_CONSEC_FRAMES = 15    # Must close eyes for ~0.5s to trigger
+# Decisions are time-based, so they behave the same at 12 or 30 FPS
+DROWSY_SECONDS = EAR_CONSEC_FRAMES / FPS
+
+# PERCLOS: share of time the eyes were closed over the last PERCLOS_WINDOW
+# seconds. Also counts as drowsy above PERCLOS_THRESHOLD (None = report only)
+PERCLOS_WINDOW = 60.0
+PERCLOS_THRESHOLD = None
 
 # ==========================================
 # 5. DISTRACTION (Head Pose)
@@ -56,8 +135,121 @@ PITCH_THRESHOLD = 25
 # UPDATED: Increased to 30 for more natural movement
 YAW_THRESHOLD = 30        
 DISTRACTION_FRAMES = 10   # Consecutive frames
+DISTRACTION_SECONDS = DISTRACTION_FRAMES / FPS
+POSE_SMOOTHING_SECONDS = 5 / FPS  # Head angles are averaged over this window
+DISTRACTION_RELEASE = 0.9         # Focused again below this fraction of the thresholds
+
+# PnP solver: "iterative" (most accurate), "sqpnp" or "epnp" (faster cold solves)
+HEAD_POSE_SOLVER = "iterative"
+HEAD_POSE_WARM_START = True       # Start from the previous frame's pose
+HEAD_POSE_MAX_REPROJ_ERROR = 0.25 # Reprojection RMS (fraction of eye distance) before a cold re-solve
+HEAD_POSE_MAX_JUMP = 45           # Degrees of rotation between frames before a cold re-solve
 
 # ==========================================
 # 6. ALERTS
 # ==========================================
-ENABLE_AUDIO = True
\ No newline at end of file
+# ENABLE_ALERTS = False silences every sink. ENABLE_AUDIO = False only drops
+# the audio sink: with other ALERT_SINKS (jsonl, socket, webhook) alerts still
+# go there. (Before there were sinks, ENABLE_AUDIO = False silenced all alerts.)
+ENABLE_ALERTS = True
+ENABLE_AUDIO = True
+ALERT_SINKS = ["audio"]       # Any of "audio", "jsonl", "socket", "webhook"
+ALERT_COOLDOWNS = {"danger": 3.0, "warning": 3.0}  # Seconds between alerts of one kind
+ALERT_PRIORITIES = {"danger": 0, "warning": 1}     # Lower is more urgent; danger cuts off a warning
+ALERT_QUEUE_SIZE = 32
+ALERT_NETWORK_QUEUE_SIZE = 16  # Per socket / webhook sink, which send on their own thread
+ALERT_SOUNDS = {"danger": None, "warning": None}   # wav/ogg files (None = generated beep)
+ALERT_LOG_PATH = os.path.join(ROOT_DIR, "alerts.jsonl")
+ALERT_SOCKET_ADDRESS = ("127.0.0.1", 9109)         # UDP, one JSON datagram per alert
+ALERT_WEBHOOK_URL = None
+ALERT_WEBHOOK_TIMEOUT = 2.0
+OBJECT_MIN_SECONDS = 0.3      # An object must be seen this long before it alerts
+OBJECT_RELEASE_SECONDS = 0.5  # ...and be gone this long before the alert ends
+
+# ==========================================
+# 7. PIPELINE (Threads)
+# ==========================================
+# "drop_oldest" keeps latency low by discarding stale frames,
+# "block" applies backpressure so every captured frame is analyzed.
+PIPELINE_QUEUE_POLICY = "drop_oldest"
+CAPTURE_BUFFER_SIZE = 2   # Frames waiting for face analysis
+RENDER_BUFFER_SIZE = 2    # Analyzed frames waiting to be drawn
+# Pooled frame buffers beyond the two rings (face stage, YOLO pending +
+# in flight, renderer, one being filled). Buffers still held are never
+# reused; the pool grows instead, so this only sets the starting size.
+PREPROCESS_SPARE_BUFFERS = 5
+STATS_INTERVAL = 10.0     # Seconds between stage/queue reports (0 = off)
+
+# YOLO results older than this (seconds since their frame was captured)
+# are dropped instead of being drawn and alerted on
+DETECTION_MAX_AGE = 1.0
+
+# "threads": everything in one process. "processes": face analysis and YOLO
+# run in their own worker processes (own GIL), frames are shared through a
+# shared memory ring (src/multiproc.py). Crashed workers are restarted.
+EXECUTION_MODE = "threads"
+SHARED_RING_SLOTS = 8       # Frames in the shared ring (queued + in the workers + rendering)
+WORKER_CPUS = {"main": None, "face": None, "object": None}  # Core pinning, e.g. {"face": [1], "object": [2, 3]} (Linux)
+WORKER_RESTART_DELAY = 1.0  # Seconds before a crashed worker is restarted
+WORKER_MAX_FAILED_STARTS = 3  # Deaths in a row before the ready message, then it is given up on
+
+# HUD: without a window (servers) frames are analyzed but not drawn or shown
+HEADLESS = False
+VIZ_SPRITE_CACHE = 512    # Pre-rendered text sprites kept (LRU)
+
+# ==========================================
+# 8. MULTI-STREAM (python -m src.multi_stream)
+# ==========================================
+MULTI_STREAM_MAX_BATCH = 8      # Max frames (one per stream) per YOLO call
+MULTI_STREAM_BATCH_WAIT = 0.01  # Seconds to wait for other streams to fill a batch
+
+# ==========================================
+# 9. OFFLINE ANALYSIS (python -m src.offline)
+# ==========================================
+OFFLINE_READ_AHEAD = 64     # Frames decoded ahead of the analysis
+OFFLINE_BATCH_SIZE = 8      # Sampled frames per YOLO call
+OFFLINE_EVENT_GAP = 1.0     # Merge events less than this many seconds apart
+
+# ==========================================
+# 10. METRICS
+# ==========================================
+METRICS_ENABLED = True
+METRICS_WINDOW = 60.0                 # Seconds per rolling histogram window
+METRICS_INTERVAL = 30.0               # Seconds between JSON log lines
+METRICS_LOG_PATH = None               # JSON lines file (None = stdout)
+METRICS_EXPORTERS = ["json"]                        # With a display window
+METRICS_HEADLESS_EXPORTERS = ["json", "prometheus"] # Without one
+METRICS_HTTP_HOST = "127.0.0.1"
+METRICS_HTTP_PORT = 9108
+
+# ==========================================
+# 11. SESSION RECORDING (python -m src.sessions)
+# ==========================================
+# Per-frame metrics, detections, events and alerts as chunked columnar
+# binary files (src/utils/recorder.py), for audit trails of 24/7 runs
+RECORD_SESSIONS = False
+RECORD_DIR = os.path.join(ROOT_DIR, "sessions")
+RECORD_CHUNK_SECONDS = 3600   # One chunk (directory of column files) per hour
+RECORD_FLUSH_SECONDS = 1.0    # Rows are written in batches at most this often
+RECORD_BATCH_ROWS = 4096      # ...or when a table collected this many rows
+RECORD_QUEUE_BATCHES = 64     # Batches waiting for the disk before rows are dropped
+RECORD_MAX_FRAME_GAP = 1.0    # Longest time one frame counts for in duration aggregates
+
+# ==========================================
+# 12. THRESHOLD TUNING (python -m src.tune)
+# ==========================================
+# Replays recorded traces against labeled intervals for many threshold
+# combinations at once (src/tune.py)
+TUNE_TOLERANCE = 2.0          # Seconds an alert may come after a labeled interval ends
+TUNE_MAX_CELLS = 20_000_000   # Combinations x frames evaluated per block (memory bound)
+
+# ==========================================
+# 13. DATA COLLECTION (python collect_data.py)
+# ==========================================
+COLLECT_DIR = os.path.join(ROOT_DIR, "data", "raw", "webcam_captures")
+COLLECT_BURST_FPS = 5          # Frames per second saved while a burst is recording
+COLLECT_DEDUP_DISTANCE = 6     # Skip frames within this many dHash bits (of 64) of a kept image (-1 = keep all)
+COLLECT_WRITERS = 2            # Background JPEG encoder / writer threads
+COLLECT_QUEUE = 64             # Frames waiting for a writer before new captures are dropped
+COLLECT_JPEG_QUALITY = 95
+COLLECT_LABEL_BATCH = 8        # Frames per YOLO call when pre-labeling (--prelabel)
@@ -0,0 +1,196 @@
+"""
+Inference backends for ObjectDetector.
+
+Every backend takes a list of BGR images and returns, per image, a tuple of
+NumPy arrays (xyxy float32 (N, 4), class_ids int32 (N,), confs float32 (N,))
+in that image's pixel coordinates.
+
+    ultralytics  best.pt / best.torchscript (PyTorch, the training stack)
+    onnxruntime  best.onnx / best.int8.onnx (no PyTorch import)
+    openvino     best_openvino_model/ or *.xml, FP32 or INT8 (no PyTorch import)
+
+Models are produced from best.pt with `python -m src.export`.
+"""
+import os
+from abc import ABC, abstractmethod
+import cv2
+import numpy as np
+import src.config as config
+
+
+def backend_for_path(path):
+    """Picks a backend from the model file name."""
+    path = path.rstrip("/\\")
+    if path.endswith(".onnx"):
+        return "onnxruntime"
+    if path.endswith(".xml") or path.endswith("_openvino_model"):
+        return "openvino"
+    return "ultralytics"
+
+
+def load_backend(path, name=None):
+    name = name or config.YOLO_BACKEND
+    if name == "auto":
+        name = backend_for_path(path)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown YOLO backend '{name}' (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](path)
+
+
+class UltralyticsBackend:
+    """The ultralytics YOLO wrapper (PyTorch, TorchScript, or anything else it can load)."""
+    name = "ultralytics"
+
+    def __init__(self, path):
+        # Imported here: pulls in PyTorch, which the exported backends avoid
+        from ultralytics import YOLO
+        self.path = path
+        self.model = YOLO(path)
+
+    def predict(self, images, conf, imgsz):
+        results = self.model(images, verbose=False, conf=conf, imgsz=imgsz)
+        # Whole-tensor transfers instead of one box at a time
+        return [
+            (r.boxes.xyxy.cpu().numpy().astype(np.float32),
+             r.boxes.cls.cpu().numpy().astype(np.int32),
+             r.boxes.conf.cpu().numpy().astype(np.float32))
+            for r in results
+        ]
+
+
+class ExportedBackend(ABC):
+    """
+    Shared pre/post-processing for exported YOLOv8 graphs: letterbox to the
+    model input, one (B, 3, S, S) float32 blob, then decode the
+    (B, 4 + classes, anchors) output with per-class NMS in OpenCV.
+    """
+    name = "exported"
+
+    def __init__(self, path):
+        self.path = path
+        self.input_size = None  # Fixed model input (pixels), None if dynamic
+        self.max_batch = None   # Fixed batch size, None if dynamic
+
+    @abstractmethod
+    def infer(self, blob):
+        """Runs the graph on a (B, 3, S, S) blob. Returns the (B, 4 + classes, anchors) output."""
+
+    @staticmethod
+    def letterbox(image, size):
+        """Resizes keeping aspect ratio and pads to size x size. Returns (padded, ratio, (pad_x, pad_y))."""
+        h, w = image.shape[:2]
+        ratio = min(size / h, size / w)
+        new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+        pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+        padded = np.full((size, size, 3), 114, dtype=np.uint8)
+        if (new_w, new_h) != (w, h):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        padded[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = image
+        return padded, ratio, (pad_x, pad_y)
+
+    def decode(self, output, ratio, pad, shape, conf):
+        """One image's (4 + classes, anchors) output -> (xyxy, class_ids, confs)."""
+        preds = output.T
+        scores = preds[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confs = scores[np.arange(len(scores)), class_ids]
+        keep = confs >= conf
+        if not keep.any():
+            return (np.zeros((0, 4), np.float32), np.zeros(0, np.int32), np.zeros(0, np.float32))
+
+        preds, class_ids, confs = preds[keep], class_ids[keep], confs[keep]
+        cx, cy, bw, bh = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+        xywh = np.stack([cx - bw / 2, cy - bh / 2, bw, bh], axis=1)
+
+        picked = cv2.dnn.NMSBoxesBatched(xywh.tolist(), confs.tolist(), class_ids.tolist(),
+                                         conf, config.YOLO_IOU_THRESHOLD)
+        picked = np.asarray(picked, dtype=np.intp).reshape(-1)
+        xywh, class_ids, confs = xywh[picked], class_ids[picked], confs[picked]
+
+        # Undo the letterbox
+        h, w = shape
+        xyxy = np.empty((len(picked), 4), dtype=np.float32)
+        xyxy[:, 0] = (xywh[:, 0] - pad[0]) / ratio
+        xyxy[:, 1] = (xywh[:, 1] - pad[1]) / ratio
+        xyxy[:, 2] = xyxy[:, 0] + xywh[:, 2] / ratio
+        xyxy[:, 3] = xyxy[:, 1] + xywh[:, 3] / ratio
+        np.clip(xyxy[:, 0::2], 0, w, out=xyxy[:, 0::2])
+        np.clip(xyxy[:, 1::2], 0, h, out=xyxy[:, 1::2])
+        return xyxy, class_ids.astype(np.int32), confs.astype(np.float32)
+
+    def predict(self, images, conf, imgsz):
+        size = self.input_size or imgsz
+        step = self.max_batch or len(images)
+        results = []
+        for start in range(0, len(images), step):
+            chunk = images[start:start + step]
+            blob = np.empty((len(chunk), 3, size, size), dtype=np.float32)
+            meta = []
+            for i, image in enumerate(chunk):
+                padded, ratio, pad = self.letterbox(image, size)
+                # BGR HWC uint8 -> RGB CHW float 0-1
+                blob[i] = padded[:, :, ::-1].transpose(2, 0, 1)
+                meta.append((ratio, pad, image.shape[:2]))
+            blob *= 1.0 / 255
+
+            outputs = self.infer(blob)
+            for output, (ratio, pad, shape) in zip(outputs, meta):
+                results.append(self.decode(output, ratio, pad, shape, conf))
+        return results
+
+
+class OnnxRuntimeBackend(ExportedBackend):
+    """ONNX Runtime on CPU. Use an export with dynamic=True to batch streams."""
+    name = "onnxruntime"
+
+    def __init__(self, path):
+        super().__init__(path)
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if config.YOLO_THREADS:
+            options.intra_op_num_threads = config.YOLO_THREADS
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, size, _ = model_input.shape
+        self.max_batch = batch if isinstance(batch, int) else None
+        self.input_size = size if isinstance(size, int) else None
+
+    def infer(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVINOBackend(ExportedBackend):
+    """OpenVINO runtime on CPU (FP32 or NNCF INT8 IR)."""
+    name = "openvino"
+
+    def __init__(self, path):
+        super().__init__(path)
+        import openvino as ov
+        if os.path.isdir(path):
+            path = next(os.path.join(path, n) for n in sorted(os.listdir(path)) if n.endswith(".xml"))
+
+        core = ov.Core()
+        model = core.read_model(path)
+        shape = model.input(0).get_partial_shape()
+        self.max_batch = shape[0].get_length() if shape[0].is_static else None
+        self.input_size = shape[2].get_length() if shape[2].is_static else None
+
+        properties = {"PERFORMANCE_HINT": "LATENCY"}
+        if config.YOLO_THREADS:
+            properties["INFERENCE_NUM_THREADS"] = config.YOLO_THREADS
+        self.compiled = core.compile_model(model, "CPU", properties)
+        self.output = self.compiled.output(0)
+
+    def infer(self, blob):
+        return self.compiled(blob)[self.output]
+
+
+BACKENDS = {
+    "ultralytics": UltralyticsBackend,
+    "onnxruntime": OnnxRuntimeBackend,
+    "openvino": OpenVINOBackend,
+}
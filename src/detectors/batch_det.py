@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict
+import src.config as config
+from src.detectors.object_det import BatchDetections, DetectionResult, ResultSlot
+from src.utils.stats import StageStats
+
+
+class StreamDetector:
+    """
+    One stream's handle on a shared BatchDetectionServer.
+
+    Offers the same non-blocking API as ObjectDetector (submit / latest /
+    busy / stats / queue_stats / stop), so a BehaviorPipeline can use it
+    in place of its own detector.
+    """
+
+    def __init__(self, server, name):
+        self.server = server
+        self.name = name
+        # Submit -> result latency, including the wait for a batch slot
+        self.stats = StageStats(name)
+        self.submitted = 0
+        self.dropped = 0
+        self._latest = ResultSlot()
+        self._in_flight = False
+
+    def submit(self, frame, frame_id=None, timestamp=None, roi=None, scale=1.0, hold=None):
+        if timestamp is None:
+            timestamp = time.time()
+        return self.server.submit(self, frame, frame_id, timestamp, roi, scale, hold)
+
+    def latest(self, max_age=None):
+        return self._latest.get(max_age)
+
+    @property
+    def busy(self):
+        return self._in_flight or self.server.is_pending(self.name)
+
+    @property
+    def ready(self):
+        return self.server.object_det.ready
+
+    def queue_stats(self):
+        depth = 1 if self.server.is_pending(self.name) else 0
+        return {"depth": depth, "max_depth": 1, "put": self.submitted, "dropped": self.dropped}
+
+    def stop(self):
+        """The shared server keeps running; it is stopped by its owner."""
+        self.server.discard(self.name)
+
+
+class BatchDetectionServer:
+    """
+    Shares one ObjectDetector (one YOLO model) between several streams.
+
+    Each stream keeps at most one pending frame (a newer submit replaces it).
+    The worker collects pending frames from up to MULTI_STREAM_MAX_BATCH
+    streams, waiting at most MULTI_STREAM_BATCH_WAIT seconds for a batch to
+    fill, and runs them through a single detect_batch() call.
+
+    A frame may wait behind other streams' batches for a while, so each
+    pending frame keeps its `hold` (see ObjectDetector.submit) until it has
+    been through inference or is replaced.
+    """
+
+    def __init__(self, object_det, max_batch=None, batch_wait=None):
+        self.object_det = object_det
+        self.max_batch = max_batch or config.MULTI_STREAM_MAX_BATCH
+        self.batch_wait = config.MULTI_STREAM_BATCH_WAIT if batch_wait is None else batch_wait
+
+        # Stream name -> (client, frame, frame_id, timestamp, roi, scale, submitted_at, hold).
+        # Replacing a stream's frame keeps its place in line.
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._worker = None
+
+        # One entry per forward pass
+        self.stats = StageStats("batch")
+        self.batches = 0
+        self.batched_frames = 0
+
+    def client(self, name):
+        return StreamDetector(self, name)
+
+    def start(self):
+        if self._worker is not None:
+            return
+        self._worker = threading.Thread(target=self._worker_loop, name="batch-detector")
+        self._worker.daemon = True
+        self._worker.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout=2.0)
+            self._worker = None
+
+    def submit(self, client, frame, frame_id, timestamp, roi, scale=1.0, hold=None):
+        item = (client, frame, frame_id, timestamp, roi, scale, time.perf_counter(), hold)
+        with self._cond:
+            if self._stopped:
+                self._release(item)
+                return False
+            replaced = self._pending.get(client.name)
+            if replaced is not None:
+                client.dropped += 1
+            client.submitted += 1
+            self._pending[client.name] = item
+            self._cond.notify_all()
+        if replaced is not None:
+            self._release(replaced)
+        self.start()
+        return True
+
+    @staticmethod
+    def _release(item):
+        hold = item[-1]
+        if hold is not None:
+            hold.release()
+
+    def is_pending(self, name):
+        with self._cond:
+            return name in self._pending
+
+    def discard(self, name):
+        with self._cond:
+            item = self._pending.pop(name, None)
+        if item is not None:
+            self._release(item)
+
+    @property
+    def avg_batch_size(self):
+        return self.batched_frames / self.batches if self.batches else 0.0
+
+    def _take_batch(self):
+        """Waits for pending frames and removes up to max_batch of them."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._stopped, 0.5)
+            if self._stopped or not self._pending:
+                return []
+
+            # Give the other streams a moment to join the batch
+            if len(self._pending) < self.max_batch and self.batch_wait > 0:
+                self._cond.wait_for(
+                    lambda: len(self._pending) >= self.max_batch or self._stopped,
+                    self.batch_wait
+                )
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch:
+                _, item = self._pending.popitem(last=False)
+                item[0]._in_flight = True
+                batch.append(item)
+            return batch
+
+    def _worker_loop(self):
+        while not self._stopped:
+            batch = self._take_batch()
+            if not batch:
+                continue
+
+            frames = [item[1] for item in batch]
+            rois = [item[4] for item in batch]
+            scales = [item[5] for item in batch]
+
+            start = time.perf_counter()
+            try:
+                detections = self.object_det.detect_batch(frames, rois, scales)
+            except Exception as e:
+                print(f"❌ Batched YOLO inference failed: {e}")
+                detections = BatchDetections.empty(len(batch))
+            finally:
+                for item in batch:
+                    self._release(item)
+            done = time.perf_counter()
+
+            self.stats.record(done - start)
+            self.batches += 1
+            self.batched_frames += len(batch)
+
+            for i, (client, _, frame_id, timestamp, _, _, submitted_at, _) in enumerate(batch):
+                objects = detections.to_dicts(i)
+                client._latest.publish(DetectionResult(objects, frame_id, timestamp))
+                client.stats.record(done - submitted_at)
+                client._in_flight = False
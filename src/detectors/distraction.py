@@ -1,56 +1,169 @@
 #/Users/mohsinniaz/BehaviorDetector/src/detectors/distraction.py
 import cv2
+import math
+import time
 import numpy as np
-from collections import deque
 import src.config as config
+from src.detectors.landmarks import POSE_IDXS
+from src.utils.metrics import metrics
+from src.utils.temporal import Hysteresis, HysteresisArray, RowOwners, TimeWindow, Track, TrackArray
+
+# 3D Model Points (generic face, same order as POSE_IDXS)
+MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),             # Nose tip
+    (0.0, -330.0, -65.0),        # Chin
+    (-225.0, 170.0, -135.0),     # Left eye left corner
+    (225.0, 170.0, -135.0),      # Right eye right corner
+    (-150.0, -150.0, -125.0),    # Left Mouth corner
+    (150.0, -150.0, -125.0)      # Right mouth corner
+], dtype=np.float64)
+
+# Pseudo-inverse of the homogeneous model points: fits the affine camera
+# of any number of faces with one matrix product (get_head_poses)
+MODEL_PINV = np.linalg.pinv(np.hstack([MODEL_POINTS, np.ones((len(MODEL_POINTS), 1))]))
+
+# config.HEAD_POSE_SOLVER -> OpenCV flag
+PNP_SOLVERS = {
+    "iterative": cv2.SOLVEPNP_ITERATIVE,
+    "sqpnp": cv2.SOLVEPNP_SQPNP,
+    "epnp": cv2.SOLVEPNP_EPNP,
+}
 
 class DistractionDetector:
-    def __init__(self):
-        self.frame_counter = 0
+    def __init__(self, solver=None, warm_start=None):
         self.alarm_on = False
-        self.pitch_queue = deque(maxlen=5)
-        self.yaw_queue = deque(maxlen=5)
-        self.roll_queue = deque(maxlen=5)
+        # (pitch, yaw, roll) averaged over POSE_SMOOTHING_SECONDS
+        self.pose_window = TimeWindow(config.POSE_SMOOTHING_SECONDS, width=3)
+        # Head turned (with hysteresis) -> distracted once turned for DISTRACTION_SECONDS
+        self.turned = Hysteresis(1.0, config.DISTRACTION_RELEASE)
+        self.track = Track("distracted", min_on=config.DISTRACTION_SECONDS)
+
+        # Start / stop events from the last analyze() / analyze_faces() call
+        self.events = []
+
+        # Multi-face state (analyze_faces): one row per face track. The pose
+        # window holds (pitch, yaw, roll, present) per row.
+        rows = config.MAX_TRACKED_FACES
+        self.face_rows = RowOwners(rows)
+        self.faces_pose_window = TimeWindow(config.POSE_SMOOTHING_SECONDS, width=4 * rows)
+        self.faces_turned = HysteresisArray(rows, 1.0, config.DISTRACTION_RELEASE)
+        self.face_tracks = TrackArray("distracted", rows, min_on=config.DISTRACTION_SECONDS)
+        self._face_samples = np.zeros((rows, 4))
+
+        # PnP settings (arguments override config, used by the benchmark)
+        self.solver = solver or config.HEAD_POSE_SOLVER
+        if self.solver not in PNP_SOLVERS:
+            raise ValueError(f"Unknown HEAD_POSE_SOLVER: {self.solver}")
+        self.warm_start = config.HEAD_POSE_WARM_START if warm_start is None else warm_start
+
+        # Camera model per resolution, built once
+        self._cameras = {}
+
+        # Last solution, used as the initial guess for the next frame
+        self._rvec = None
+        self._tvec = None
+
+        # Solver counters
+        self.warm_solves = 0
+        self.cold_solves = 0
+        self.resets = 0
+
+    def get_camera(self, frame_w, frame_h):
+        """Returns (camera_matrix, dist_coeffs) for a resolution, cached."""
+        key = (frame_w, frame_h)
+        camera = self._cameras.get(key)
+        if camera is None:
+            focal_length = frame_w
+            center = (frame_w / 2, frame_h / 2)
+            camera_matrix = np.array([
+                [focal_length, 0, center[0]],
+                [0, focal_length, center[1]],
+                [0, 0, 1]
+            ], dtype="double")
+            dist_coeffs = np.zeros((4, 1))
+            camera = (camera_matrix, dist_coeffs)
+            self._cameras[key] = camera
+        return camera
 
-    def get_head_pose(self, landmarks, frame_w, frame_h):
+    def reset_pose(self):
+        """Forget the previous solution so the next frame is solved from scratch."""
+        self._rvec = None
+        self._tvec = None
+
+    def _diverged(self, rvec, tvec, image_points, camera_matrix, dist_coeffs):
         """
-        Estimates Pitch, Yaw, and Roll.
+        Sanity check for a warm-started solution: the face must stay in front
+        of the camera, reproject close to the landmarks and not rotate more
+        than HEAD_POSE_MAX_JUMP degrees since the previous frame.
+        """
+        if tvec[2, 0] <= 0:
+            return True
+
+        projected, _ = cv2.projectPoints(MODEL_POINTS, rvec, tvec, camera_matrix, dist_coeffs)
+        rms_error = cv2.norm(projected.reshape(-1, 2), image_points, cv2.NORM_L2) / math.sqrt(len(image_points))
+        eye_dist = math.hypot(*(image_points[2] - image_points[3]))
+        if rms_error > config.HEAD_POSE_MAX_REPROJ_ERROR * max(eye_dist, 1.0):
+            return True
+
+        # Rotation between the two poses: ||R1 - R2||_F = 2*sqrt(2)*sin(angle/2)
+        prev_rmat, _ = cv2.Rodrigues(self._rvec)
+        rmat, _ = cv2.Rodrigues(rvec)
+        chord = min(cv2.norm(prev_rmat, rmat, cv2.NORM_L2) / (2 * math.sqrt(2)), 1.0)
+        return math.degrees(2 * math.asin(chord)) > config.HEAD_POSE_MAX_JUMP
+
+    def solve_pose(self, image_points, frame_w, frame_h):
+        """
+        Runs PnP, warm-started from the previous frame when possible.
+        Falls back to a cold solve with the configured solver if the warm
+        start fails or diverges. Returns the rotation vector (or None).
         """
-        # 1. 3D Model Points
-        model_points = np.array([
-            (0.0, 0.0, 0.0),             # Nose tip
-            (0.0, -330.0, -65.0),        # Chin
-            (-225.0, 170.0, -135.0),     # Left eye left corner
-            (225.0, 170.0, -135.0),      # Right eye right corner
-            (-150.0, -150.0, -125.0),    # Left Mouth corner
-            (150.0, -150.0, -125.0)      # Right mouth corner
-        ])
-
-        # 2. 2D Image Points
-        idx_list = [1, 152, 33, 263, 61, 291]
-        image_points = np.array([
-            (int(landmarks.landmark[idx].x * frame_w),
-             int(landmarks.landmark[idx].y * frame_h)) for idx in idx_list
-        ], dtype="double")
-
-        # 3. Camera Matrix
-        focal_length = frame_w
-        center = (frame_w / 2, frame_h / 2)
-        camera_matrix = np.array([
-            [focal_length, 0, center[0]],
-            [0, focal_length, center[1]],
-            [0, 0, 1]
-        ], dtype="double")
-
-        dist_coeffs = np.zeros((4, 1))
-
-        # 4. Solve PnP
-        success, rotation_vector, _ = cv2.solvePnP(
-            model_points, image_points, camera_matrix, dist_coeffs,
-            flags=cv2.SOLVEPNP_ITERATIVE
+        camera_matrix, dist_coeffs = self.get_camera(frame_w, frame_h)
+
+        # Warm start only exists for the iterative (Levenberg-Marquardt) solver
+        if self.warm_start and self._rvec is not None:
+            success, rvec, tvec = cv2.solvePnP(
+                MODEL_POINTS, image_points, camera_matrix, dist_coeffs,
+                self._rvec.copy(), self._tvec.copy(),
+                useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE
+            )
+            if success and not self._diverged(rvec, tvec, image_points, camera_matrix, dist_coeffs):
+                self.warm_solves += 1
+                self._rvec, self._tvec = rvec, tvec
+                return rvec
+            self.resets += 1
+
+        success, rvec, tvec = cv2.solvePnP(
+            MODEL_POINTS, image_points, camera_matrix, dist_coeffs,
+            flags=PNP_SOLVERS[self.solver]
         )
+        self.cold_solves += 1
+        if not success:
+            self.reset_pose()
+            return None
+
+        self._rvec, self._tvec = rvec, tvec
+        return rvec
 
-        # 5. Rotation Vector -> Euler Angles
+    def get_head_pose(self, points, frame_w, frame_h):
+        """
+        Estimates Pitch, Yaw, and Roll.
+        `points` is the (N, 3) pixel landmark array from FaceMeshDetector.get_points.
+        """
+        # 1. 2D Image Points (gathered from the shared landmark array)
+        image_points = points[POSE_IDXS, :2].astype(np.float64)
+
+        # 2. Solve PnP
+        with metrics.span("pnp"):
+            rotation_vector = self.solve_pose(image_points, frame_w, frame_h)
+        if rotation_vector is None:
+            return 0.0, 0.0, 0.0
+
+        # 3. Rotation Vector -> Euler Angles
+        return self.rotation_to_angles(rotation_vector)
+
+    @staticmethod
+    def rotation_to_angles(rotation_vector):
+        """Converts a PnP rotation vector to (pitch, yaw, roll) in degrees."""
         rmat, _ = cv2.Rodrigues(rotation_vector)
         angles, _, _, _, _, _ = cv2.RQDecomp3x3(rmat)
 
@@ -73,36 +186,122 @@ class DistractionDetector:
 
         return pitch, yaw, roll
 
-    def analyze(self, landmarks, frame_w, frame_h):
-        if landmarks is None:
-            self.pitch_queue.clear()
-            self.yaw_queue.clear()
-            self.roll_queue.clear()
-            self.frame_counter = 0
+    def analyze(self, points, frame_w, frame_h, timestamp=None):
+        """
+        `timestamp` is the frame's capture time in seconds (default: now).
+        Returns: (is_distracted, (pitch, yaw, roll))
+        """
+        t = time.time() if timestamp is None else timestamp
+        self.events = []
+        if points is None:
+            self.reset_pose()
+            self.pose_window.clear()
+            self.turned.reset()
+            event = self.track.reset(t)
+            if event is not None:
+                self.events.append(event)
             self.alarm_on = False
             return False, (0, 0, 0)
 
-        pitch, yaw, roll = self.get_head_pose(landmarks, frame_w, frame_h)
+        pitch, yaw, roll = self.get_head_pose(points, frame_w, frame_h)
 
-        self.pitch_queue.append(pitch)
-        self.yaw_queue.append(yaw)
-        self.roll_queue.append(roll)
+        self.pose_window.push(t, (pitch, yaw, roll))
+        avg_pitch, avg_yaw, avg_roll = self.pose_window.mean().tolist()
 
-        if len(self.pitch_queue) > 0:
-            avg_pitch = sum(self.pitch_queue) / len(self.pitch_queue)
-            avg_yaw   = sum(self.yaw_queue) / len(self.yaw_queue)
-            avg_roll  = sum(self.roll_queue) / len(self.roll_queue)
-        else:
-            avg_pitch, avg_yaw, avg_roll = pitch, yaw, roll
+        # Check thresholds (1.0 = at the threshold on either axis)
+        turn = max(abs(avg_pitch) / config.PITCH_THRESHOLD, abs(avg_yaw) / config.YAW_THRESHOLD)
+        event = self.track.update(t, self.turned.update(turn))
+        if event is not None:
+            self.events.append(event)
+        self.alarm_on = self.track.active
 
-        # Check thresholds
-        if abs(avg_pitch) > config.PITCH_THRESHOLD or abs(avg_yaw) > config.YAW_THRESHOLD:
-            self.frame_counter += 1
-        else:
-            self.frame_counter = 0
-            self.alarm_on = False
+        return self.alarm_on, (avg_pitch, avg_yaw, avg_roll)
+
+    @staticmethod
+    def get_head_poses(points, camera_matrix=None):
+        """
+        (pitch, yaw, roll) of every face of an (F, N, 3) landmark stack as
+        an (F, 3) array, in one vectorized pass. Fits a scaled orthographic
+        camera to the pose points instead of running PnP per face: no
+        iterations and no solver state.
+
+        With `camera_matrix` each face is first re-projected into a virtual
+        camera looking straight at its nose, and the pose turned back into
+        the real camera. Without it, faces away from the image center come
+        out turned by their viewing angle. Against cold PnP on exact
+        landmarks (benchmarks/head_pose.py: +-35 deg on each axis, depth
+        1500-3000, anywhere in the middle 60% of the frame), the median
+        error is about 0.4 deg pitch / 1.1 deg yaw / 0.6 deg roll, and under
+        4 deg on every axis.
+        """
+        image_points = points[:, POSE_IDXS, :2].astype(np.float64)
+        rotation = None
+        if camera_matrix is not None:
+            # Viewing rays, and the rotation of a camera looking down the nose's ray
+            rays = np.empty(image_points.shape[:2] + (3,))
+            rays[..., :2] = (image_points - camera_matrix[:2, 2]) / camera_matrix[[0, 1], [0, 1]]
+            rays[..., 2] = 1.0
+            z = rays[:, 0] / np.sqrt((rays[:, 0] ** 2).sum(axis=1, keepdims=True))
+            x = np.cross([0.0, 1.0, 0.0], z)
+            x /= np.sqrt((x * x).sum(axis=1, keepdims=True))
+            rotation = np.stack([x, np.cross(z, x)], axis=1)            # (F, 2, 3) rows
+            rotation = np.concatenate([rotation, z[:, None]], axis=1)    # Camera -> virtual
+            virtual = rays @ rotation.transpose(0, 2, 1)
+            image_points = virtual[..., :2] / virtual[..., 2:]
+
+        # Rows of the rotation from the affine fit, made orthonormal
+        affine = MODEL_PINV @ image_points                        # (F, 4, 2)
+        r1 = affine[:, :3, 0]
+        r2 = affine[:, :3, 1]
+        r1 = r1 / np.maximum(np.sqrt((r1 * r1).sum(axis=1, keepdims=True)), 1e-9)
+        r2 = r2 - (r1 * r2).sum(axis=1, keepdims=True) * r1
+        r2 = r2 / np.maximum(np.sqrt((r2 * r2).sum(axis=1, keepdims=True)), 1e-9)
+        r3 = np.cross(r1, r2)
+        if rotation is not None:
+            # Back from the virtual cameras to the real one
+            fitted = np.stack([r1, r2, r3], axis=1)
+            r1, r2, r3 = (rotation.transpose(0, 2, 1) @ fitted).transpose(1, 0, 2)
+
+        # Same Euler angles as RQDecomp3x3 in rotation_to_angles
+        poses = np.empty((len(points), 3))
+        poses[:, 0] = np.arctan2(r3[:, 1], r3[:, 2])
+        poses[:, 1] = np.arcsin(np.clip(-r3[:, 0], -1.0, 1.0))
+        poses[:, 2] = np.arctan2(r2[:, 0], r1[:, 0])
+        poses = np.degrees(poses, out=poses)
+        pitch = poses[:, 0]
+        pitch[pitch > 100] -= 180
+        pitch[pitch < -100] += 180
+        return poses
+
+    def analyze_faces(self, points, rows, ids, frame_w, frame_h, timestamp=None):
+        """
+        analyze() for every face of a frame in one pass (see
+        DrowsinessDetector.analyze_faces for the arguments). Head pose
+        comes from get_head_poses. Returns (is_distracted, poses): an (F,)
+        array and the (F, 3) smoothed (pitch, yaw, roll).
+        """
+        t = time.time() if timestamp is None else timestamp
+        stale_rows, stale_ids = self.face_rows.update(rows, ids)
+        self.events = self.face_tracks.reset(t, stale_rows, stale_ids)
+        self.faces_turned.reset(stale_rows)
+        if len(stale_rows):
+            self.faces_pose_window.clear_columns((stale_rows[:, None] * 4 + np.arange(4)).ravel())
+
+        if points is None or not len(rows):
+            return np.zeros(0, dtype=bool), np.zeros((0, 3))
+
+        with metrics.span("pose"):
+            poses = self.get_head_poses(points, self.get_camera(frame_w, frame_h)[0])
 
-        if self.frame_counter >= config.DISTRACTION_FRAMES:
-            self.alarm_on = True
+        samples = self._face_samples
+        samples[:] = 0
+        samples[rows, :3] = poses
+        samples[rows, 3] = 1
+        self.faces_pose_window.push(t, samples.ravel())
+        # Summed angles over the number of samples each face is present in
+        window = self.faces_pose_window.mean().reshape(-1, 4)[rows]
+        avg = window[:, :3] / window[:, 3:]
 
-        return self.alarm_on, (avg_pitch, avg_yaw, avg_roll)
\ No newline at end of file
+        turn = np.maximum(np.abs(avg[:, 0]) / config.PITCH_THRESHOLD, np.abs(avg[:, 1]) / config.YAW_THRESHOLD)
+        self.events += self.face_tracks.update(t, self.faces_turned.update(turn, rows), rows, ids)
+        return self.face_tracks.active[rows], avg
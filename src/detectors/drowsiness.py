@@ -1,75 +1,129 @@
 #/Users/mohsinniaz/BehaviorDetector/src/detectors/drowsiness.py
-import math
+import time
+import numpy as np
 import src.config as config
+from src.detectors.landmarks import LEFT_EYE_IDXS, RIGHT_EYE_IDXS
+from src.utils.metrics import metrics
+from src.utils.temporal import Hysteresis, HysteresisArray, RowOwners, TimeWindow, Track, TrackArray
 
 class DrowsinessDetector:
     def __init__(self):
         # Mediapipe Landmark Indices for the eyes (Standard 6-point definition)
         # Order: [left_corner, top1, top2, right_corner, bottom2, bottom1]
-        self.LEFT_EYE_IDXS = [362, 385, 387, 263, 373, 380]
-        self.RIGHT_EYE_IDXS = [33, 160, 158, 133, 153, 144]
-        
-        self.frame_counter = 0
+        self.LEFT_EYE_IDXS = LEFT_EYE_IDXS
+        self.RIGHT_EYE_IDXS = RIGHT_EYE_IDXS
+
+        # Both eyes as one (2, 6) index block so EAR is a single array operation
+        self.EYE_IDXS = np.array([self.LEFT_EYE_IDXS, self.RIGHT_EYE_IDXS])
+
+        # Eyes closed (with hysteresis) -> drowsy once closed for DROWSY_SECONDS
+        self.eyes_closed = Hysteresis(config.EAR_THRESHOLD, config.EAR_OPEN_THRESHOLD, below=True)
+        self.track = Track("drowsy", min_on=config.DROWSY_SECONDS)
+        self.closed_window = TimeWindow(config.PERCLOS_WINDOW)
+        self.perclos = 0.0
         self.alarm_on = False
 
-    def _euclidean_dist(self, point1, point2):
-        """Calculates distance between two 2D points"""
-        return math.hypot(point1[0] - point2[0], point1[1] - point2[1])
+        # Start / stop events from the last analyze() / analyze_faces() call
+        self.events = []
+
+        # Multi-face state (analyze_faces): one row per face track, all faces updated together.
+        # The PERCLOS window holds (closed, present) per row.
+        rows = config.MAX_TRACKED_FACES
+        self.face_rows = RowOwners(rows)
+        self.faces_closed = HysteresisArray(rows, config.EAR_THRESHOLD, config.EAR_OPEN_THRESHOLD, below=True)
+        self.face_tracks = TrackArray("drowsy", rows, min_on=config.DROWSY_SECONDS)
+        self.faces_closed_window = TimeWindow(config.PERCLOS_WINDOW, width=2 * rows)
+        self.face_perclos = np.zeros(rows)
+        self._face_samples = np.zeros((2, rows))
 
     def calculate_ear(self, eye_points):
         """
         Calculates Eye Aspect Ratio (EAR)
         EAR = (|p2-p6| + |p3-p5|) / (2 * |p1-p4|)
+        Accepts (6, 2) points for one eye or (..., 6, 2) for several.
         """
+        eye_points = np.asarray(eye_points, dtype=np.float32)
+
         # Vertical distances
-        A = self._euclidean_dist(eye_points[1], eye_points[5])
-        B = self._euclidean_dist(eye_points[2], eye_points[4])
+        A = np.linalg.norm(eye_points[..., 1, :] - eye_points[..., 5, :], axis=-1)
+        B = np.linalg.norm(eye_points[..., 2, :] - eye_points[..., 4, :], axis=-1)
 
         # Horizontal distance
-        C = self._euclidean_dist(eye_points[0], eye_points[3])
+        C = np.linalg.norm(eye_points[..., 0, :] - eye_points[..., 3, :], axis=-1)
 
-        if C == 0:
-            return 0.0
-
-        ear = (A + B) / (2.0 * C)
+        ear = np.divide(A + B, 2.0 * C, out=np.zeros_like(C), where=C != 0)
         return ear
 
-    def analyze(self, landmarks, frame_w, frame_h):
+    def analyze(self, points, frame_w, frame_h, timestamp=None):
         """
+        `points` is the (N, 3) pixel landmark array from FaceMeshDetector.get_points.
+        `timestamp` is the frame's capture time in seconds (default: now).
         Returns: (is_drowsy, ear_score)
         """
-        if landmarks is None:
-            self.frame_counter = 0
+        t = time.time() if timestamp is None else timestamp
+        self.events = []
+        if points is None:
+            self.eyes_closed.reset()
+            event = self.track.reset(t)
+            if event is not None:
+                self.events.append(event)
+            self.alarm_on = False
             return False, 0.0
 
-        # Helper to convert normalized landmark to pixel coordinates (x, y)
-        def get_coords(indices):
-            coords = []
-            for idx in indices:
-                lm = landmarks.landmark[idx]
-                coords.append((int(lm.x * frame_w), int(lm.y * frame_h)))
-            return coords
+        # EAR for both eyes in one pass, then average
+        with metrics.span("ear"):
+            ears = self.calculate_ear(points[self.EYE_IDXS, :2])
+            avg_ear = float(ears.mean())
 
-        # Get coordinates for both eyes
-        left_eye = get_coords(self.LEFT_EYE_IDXS)
-        right_eye = get_coords(self.RIGHT_EYE_IDXS)
+        # Check threshold
+        closed = self.eyes_closed.update(avg_ear)
+        self.closed_window.push(t, closed)
+        self.perclos = self.closed_window.mean()
 
-        # Calculate EAR for both eyes
-        left_ear = self.calculate_ear(left_eye)
-        right_ear = self.calculate_ear(right_eye)
+        # Trigger alarm if eyes closed for long enough
+        event = self.track.update(t, closed)
+        if event is not None:
+            self.events.append(event)
+        self.alarm_on = self.track.active
+        if config.PERCLOS_THRESHOLD is not None and self.perclos >= config.PERCLOS_THRESHOLD:
+            self.alarm_on = True
 
-        # Average EAR
-        avg_ear = (left_ear + right_ear) / 2.0
+        return self.alarm_on, avg_ear
 
-        # Check threshold
-        if avg_ear < config.EAR_THRESHOLD:
-            self.frame_counter += 1
-        else:
-            self.frame_counter = 0
-            self.alarm_on = False
+    def analyze_faces(self, points, rows, ids, frame_w, frame_h, timestamp=None):
+        """
+        analyze() for every face of a frame in one pass.
+        `points` is the (F, N, 3) landmark stack from FaceMeshDetector.get_faces
+        (None or empty without faces), `rows` / `ids` the face tracks from
+        FaceTracks.update. Faces missing from this frame are reset, as with
+        analyze(None). Returns (is_drowsy, ear_scores), two (F,) arrays.
+        """
+        t = time.time() if timestamp is None else timestamp
+        stale_rows, stale_ids = self.face_rows.update(rows, ids)
+        self.events = self.face_tracks.reset(t, stale_rows, stale_ids)
+        self.faces_closed.reset(stale_rows)
+        if len(stale_rows):
+            self.faces_closed_window.clear_columns(np.concatenate([stale_rows, stale_rows + len(self.face_perclos)]))
 
-        # Trigger alarm if eyes closed for enough frames
-        if self.frame_counter >= config.EAR_CONSEC_FRAMES:
-            self.alarm_on = True
+        if points is None or not len(rows):
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=np.float32)
+
+        # EAR of both eyes of every face as one (F, 2, 6, 2) gather
+        with metrics.span("ear"):
+            ears = self.calculate_ear(points[:, self.EYE_IDXS, :2]).mean(axis=1)
+
+        closed = self.faces_closed.update(ears, rows)
+        samples = self._face_samples
+        samples[:] = 0
+        samples[0, rows] = closed
+        samples[1, rows] = 1
+        self.faces_closed_window.push(t, samples.ravel())
+        # Closed samples over present samples, per face
+        closed_mean, present = self.faces_closed_window.mean().reshape(2, -1)
+        self.face_perclos = np.divide(closed_mean, present, out=np.zeros_like(present), where=present > 0)
 
-        return self.alarm_on, avg_ear
\ No newline at end of file
+        self.events += self.face_tracks.update(t, closed, rows, ids)
+        alarm = self.face_tracks.active[rows]
+        if config.PERCLOS_THRESHOLD is not None:
+            alarm = alarm | (self.face_perclos[rows] >= config.PERCLOS_THRESHOLD)
+        return alarm, ears
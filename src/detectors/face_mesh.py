@@ -1,35 +1,105 @@
 #/Users/mohsinniaz/BehaviorDetector/src/detectors/face_mesh.py
 import cv2
-import mediapipe as mp
+import src.config as config
+from src.detectors.landmarks import LandmarkBuffer, LandmarkStack, USED_IDXS
+from src.utils.metrics import metrics
 
 class FaceMeshDetector:
     def __init__(self):
         print("🔄 Initializing Mediapipe Face Mesh...")
+        # Imported here so the import cost is paid by whoever builds the detector
+        # (in the background at startup), not by importing this module
+        import mediapipe as mp
         self.mp_face_mesh = mp.solutions.face_mesh
         # refine_landmarks=True gives us detailed eye/iris points
         self.face_mesh = self.mp_face_mesh.FaceMesh(
             static_image_mode=False,
-            max_num_faces=1,
+            max_num_faces=config.MAX_NUM_FACES,
             refine_landmarks=True,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
+        # Separate still-image instance for face crops (FaceTracker): the one
+        # above tracks across full frames and must not be fed crops in between
+        self.crop_mesh = None
+        # Landmarks are decoded once per frame into this reused array
+        self.buffer = LandmarkBuffer(USED_IDXS if config.LANDMARK_SUBSET else None)
+        self.stack = LandmarkStack(config.MAX_NUM_FACES, USED_IDXS if config.LANDMARK_SUBSET else None)
         print("✅ Face Mesh Ready!")
 
-    def get_landmarks(self, frame):
+    def reset(self):
+        """Drops the video-mode tracking state, so the next frame is treated as a new video."""
+        self.face_mesh.reset()
+
+    def get_landmarks(self, frame, rgb=None):
         """
         Accepts a BGR frame, converts to RGB, and returns 
         the landmarks for the first detected face.
         Returns None if no face is found.
+        Pass `rgb` when the RGB image already exists (see Preprocessor)
+        to skip the conversion; read-only arrays are passed to MediaPipe
+        without a copy.
         """
+        faces = self.get_all_landmarks(frame, rgb)
+        if faces:
+            # Return landmarks for the first face only
+            return faces[0]
+        return None
+
+    def get_all_landmarks(self, frame, rgb=None):
+        """Same as get_landmarks, for every detected face (up to MAX_NUM_FACES). None if there are none."""
         # Mediapipe requires RGB images
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if rgb is None:
+            with metrics.span("color"):
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                rgb.flags.writeable = False
+        rgb_frame = rgb
         
         # Process the image
-        results = self.face_mesh.process(rgb_frame)
+        with metrics.span("face_mesh"):
+            results = self.face_mesh.process(rgb_frame)
         
+        return results.multi_face_landmarks or None
+
+    def get_crop_landmarks(self, rgb):
+        """Landmarks of the first face in an RGB face crop, or None. Built on first use."""
+        if self.crop_mesh is None:
+            self.crop_mesh = self.mp_face_mesh.FaceMesh(
+                static_image_mode=True,
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_detection_confidence=0.5
+            )
+        with metrics.span("face_mesh"):
+            results = self.crop_mesh.process(rgb)
         if results.multi_face_landmarks:
-            # Return landmarks for the first face only
             return results.multi_face_landmarks[0]
-            
-        return None
\ No newline at end of file
+        return None
+
+    def get_points(self, frame, rgb=None):
+        """
+        Same as get_landmarks, but returns the (478, 3) float32 array of
+        pixel coordinates shared by all detectors (see LandmarkBuffer).
+        The array is overwritten by the next call.
+        Returns None if no face is found.
+        """
+        landmarks = self.get_landmarks(frame, rgb)
+        if landmarks is None:
+            return None
+
+        h, w = frame.shape[:2]
+        return self.buffer.fill(landmarks, w, h)
+
+    def get_faces(self, frame, rgb=None):
+        """
+        Multi-face get_points: returns the (F, 478, 3) float32 pixel
+        coordinates of all F detected faces as one stacked array (see
+        LandmarkStack), overwritten by the next call.
+        Returns None if no face is found.
+        """
+        faces = self.get_all_landmarks(frame, rgb)
+        if faces is None:
+            return None
+
+        h, w = frame.shape[:2]
+        return self.stack.fill(faces, w, h)
@@ -0,0 +1,165 @@
+import cv2
+import numpy as np
+import src.config as config
+from src.detectors.landmarks import FACE_BOUND_IDXS, USED_IDXS
+from src.utils.metrics import metrics
+
+# Optical flow settings: small window, 3 pyramid levels (~4x motion range)
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+)
+
+
+class FaceTracker:
+    """
+    Tracking mode for FaceMeshDetector (config.FACE_TRACKING).
+
+    Runs MediaPipe at most every FACE_MESH_EVERY frames, on a crop around
+    the last face when FACE_MESH_CROP is on (with its own still-image mesh,
+    so the video-mode one only ever sees full frames), and moves the USED_IDXS
+    landmarks (the ~20 eye / nose / mouth / outline points the detectors
+    read) with pyramidal Lucas-Kanade optical flow in between.
+
+    A tracked frame is accepted only if every point passes a
+    forward-backward check (TRACK_MAX_FB_ERROR pixels) and the median motion
+    stays below TRACK_MAX_MOTION face widths; otherwise the mesh runs again
+    on that same frame. Fast blinks can be smoothed over between mesh runs,
+    which is fine for EAR_CONSEC_FRAMES-long closures.
+
+    Same get_points API as FaceMeshDetector, and the same shared array.
+    """
+
+    def __init__(self, face_mesh):
+        self.face_mesh = face_mesh
+        self.indices = np.asarray(USED_IDXS, dtype=np.intp)
+        self._bound_rows = np.searchsorted(self.indices, FACE_BOUND_IDXS)
+
+        self.points = None         # Last (478, 3) result (face_mesh.buffer.points)
+        self._tracked = None       # (K, 1, 2) float32 positions of self.indices
+        self._gray = [None, None]  # Ping-pong grayscale buffers
+        self._current = 0
+        self._since_mesh = 0
+
+        # Counters
+        self.mesh_runs = 0
+        self.tracked_frames = 0
+        self.redetections = 0
+
+    def get_landmarks(self, frame, rgb=None):
+        return self.face_mesh.get_landmarks(frame, rgb)
+
+    def reset(self):
+        self.points = None
+        self._tracked = None
+
+    # ------------------------------------------
+    # Helpers
+    # ------------------------------------------
+    def _to_gray(self, frame):
+        h, w = frame.shape[:2]
+        self._current ^= 1
+        gray = self._gray[self._current]
+        if gray is None or gray.shape != (h, w):
+            gray = self._gray[self._current] = np.empty((h, w), dtype=np.uint8)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        return gray
+
+    def _face_width(self):
+        outline = self._tracked[self._bound_rows, 0]
+        return max(float(outline[:, 0].max() - outline[:, 0].min()), 1.0)
+
+    def _crop(self, w, h):
+        """Region around the last face for a cropped mesh run, or None."""
+        if self._tracked is None:
+            return None
+        outline = self._tracked[self._bound_rows, 0]
+        (fx1, fy1), (fx2, fy2) = outline.min(axis=0), outline.max(axis=0)
+        margin = max(fx2 - fx1, fy2 - fy1) * config.FACE_CROP_MARGIN
+        x1, y1 = int(max(0, fx1 - margin)), int(max(0, fy1 - margin))
+        x2, y2 = int(min(w, fx2 + margin)), int(min(h, fy2 + margin))
+        if x2 - x1 < 32 or y2 - y1 < 32:
+            return None
+        return x1, y1, x2, y2
+
+    # ------------------------------------------
+    # Mesh / flow
+    # ------------------------------------------
+    def _run_mesh(self, frame, rgb):
+        h, w = frame.shape[:2]
+        self.mesh_runs += 1
+        self._since_mesh = 0
+
+        points = None
+        crop = self._crop(w, h) if config.FACE_MESH_CROP else None
+        if crop is not None:
+            x1, y1, x2, y2 = crop
+            if rgb is None:
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # MediaPipe needs a contiguous image; the crop is small
+            crop_rgb = np.ascontiguousarray(rgb[y1:y2, x1:x2])
+            longest = max(x2 - x1, y2 - y1)
+            if longest > config.FACE_CROP_SIZE:
+                s = config.FACE_CROP_SIZE / longest
+                crop_rgb = cv2.resize(crop_rgb, (int((x2 - x1) * s), int((y2 - y1) * s)),
+                                      interpolation=cv2.INTER_AREA)
+            landmarks = self.face_mesh.get_crop_landmarks(crop_rgb)
+            # Normalized coordinates do not change with the resize
+            if landmarks is not None:
+                points = self.face_mesh.buffer.fill(landmarks, x2 - x1, y2 - y1, x1, y1)
+
+        # No previous face, or the face left the crop
+        if points is None:
+            points = self.face_mesh.get_points(frame, rgb)
+
+        if points is None:
+            self.reset()
+            return None
+
+        self.points = points
+        self._tracked = points[self.indices, :2].reshape(-1, 1, 2).copy()
+        return points
+
+    def _track(self, prev_gray, gray):
+        """Moves the tracked points to `gray`. Returns False if they are unreliable."""
+        new, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, self._tracked, None, **LK_PARAMS)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, new, None, **LK_PARAMS)
+        if not (status.all() and back_status.all()):
+            return False
+
+        fb_error = np.abs(back - self._tracked).max(axis=(1, 2))
+        if fb_error.max() > config.TRACK_MAX_FB_ERROR:
+            return False
+
+        motion = np.median(np.linalg.norm((new - self._tracked)[:, 0], axis=1))
+        if motion > config.TRACK_MAX_MOTION * self._face_width():
+            return False
+
+        self._tracked = new
+        self.points[self.indices, :2] = new[:, 0]
+        return True
+
+    def get_points(self, frame, rgb=None):
+        """
+        Landmark pixel array for `frame`, from MediaPipe or from optical flow.
+        Only the USED_IDXS rows are valid. Returns None if no face is found.
+        """
+        prev_gray = self._gray[self._current]
+        gray = self._to_gray(frame)
+
+        if self._tracked is None or prev_gray is None or prev_gray.shape != gray.shape:
+            return self._run_mesh(frame, rgb)
+
+        self._since_mesh += 1
+        if self._since_mesh >= config.FACE_MESH_EVERY:
+            return self._run_mesh(frame, rgb)
+
+        with metrics.span("track"):
+            ok = self._track(prev_gray, gray)
+        if not ok:
+            self.redetections += 1
+            return self._run_mesh(frame, rgb)
+
+        self.tracked_frames += 1
+        return self.points
@@ -0,0 +1,87 @@
+import numpy as np
+from src.utils.metrics import metrics
+from src.utils.roi import face_boxes, faces_roi
+from src.utils.tracker import FaceTracks
+
+
+class FaceResults:
+    """
+    Per-face results of one frame (multi-face mode), as arrays in the same
+    order: face track `ids`, face `boxes` (x1, y1, x2, y2), `ears`,
+    `drowsy`, `poses` (pitch, yaw, roll) and `distracted`.
+    Plain arrays, so the face worker process can send it back as is.
+    """
+
+    def __init__(self, ids, boxes, ears, drowsy, poses, distracted):
+        self.ids = ids
+        self.boxes = boxes
+        self.ears = ears
+        self.drowsy = drowsy
+        self.poses = poses
+        self.distracted = distracted
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def primary(self):
+        """Index of the largest (closest) face, or None without faces."""
+        if not len(self.ids):
+            return None
+        sizes = (self.boxes[:, 2] - self.boxes[:, 0]) * (self.boxes[:, 3] - self.boxes[:, 1])
+        return int(np.argmax(sizes))
+
+    def summary(self):
+        """
+        Single-face view for the packet fields: (is_drowsy, ear_score,
+        is_distracted, pose_data). A behavior counts if any face shows it;
+        EAR and pose are the primary face's.
+        """
+        i = self.primary
+        if i is None:
+            return False, 0.0, False, (0, 0, 0)
+        return (bool(self.drowsy.any()), float(self.ears[i]),
+                bool(self.distracted.any()), tuple(float(v) for v in self.poses[i]))
+
+    def ids_where(self, mask):
+        """Face IDs where `mask` (e.g. self.drowsy) is set, as ints."""
+        return [int(i) for i in self.ids[mask]]
+
+    def roi(self, frame_w, frame_h):
+        """YOLO search region around all faces (see faces_roi), or None."""
+        return faces_roi(self.boxes, frame_w, frame_h)
+
+
+class MultiFaceAnalyzer:
+    """
+    Face stage for MAX_NUM_FACES > 1.
+
+    The landmarks of every face are decoded into one stacked array,
+    FaceTracks gives each face a stable ID and a row in the detectors'
+    per-face state arrays, and the detectors update all faces at once
+    (analyze_faces). Cost grows with a few array rows per face instead of
+    a Python detector object and solver run per person.
+    """
+
+    def __init__(self, face_mesh, drowsy_det, distract_det):
+        self.face_mesh = face_mesh
+        self.drowsy_det = drowsy_det
+        self.distract_det = distract_det
+        self.tracks = FaceTracks()
+
+        # Start / stop events from the last analyze() call, tagged with face IDs
+        self.events = []
+
+    def analyze(self, frame, rgb, timestamp):
+        """Analyzes every face of a frame. Returns FaceResults."""
+        h, w = frame.shape[:2]
+        points = self.face_mesh.get_faces(frame, rgb)
+        boxes = face_boxes(points) if points is not None else np.zeros((0, 4))
+        rows, ids = self.tracks.update(boxes, timestamp)
+        metrics.gauge("faces", len(ids))
+
+        # Lost faces are analyzed too, so their running behaviors end with a stop event
+        drowsy, ears = self.drowsy_det.analyze_faces(points, rows, ids, w, h, timestamp)
+        distracted, poses = self.distract_det.analyze_faces(points, rows, ids, w, h, timestamp)
+        self.events = self.drowsy_det.events + self.distract_det.events
+        return FaceResults(ids, boxes.astype(np.int32), ears, drowsy, poses, distracted)
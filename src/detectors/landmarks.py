@@ -0,0 +1,93 @@
+import numpy as np
+
+# Face Mesh with refine_landmarks=True returns 468 face + 10 iris points
+NUM_LANDMARKS = 478
+
+# Eyes (Standard 6-point definition)
+# Order: [left_corner, top1, top2, right_corner, bottom2, bottom1]
+LEFT_EYE_IDXS = [362, 385, 387, 263, 373, 380]
+RIGHT_EYE_IDXS = [33, 160, 158, 133, 153, 144]
+
+# Head pose: Nose tip, Chin, Left eye corner, Right eye corner, Left mouth, Right mouth
+POSE_IDXS = [1, 152, 33, 263, 61, 291]
+
+# Face outline: forehead, chin, left cheek, right cheek
+FACE_BOUND_IDXS = [10, 152, 234, 454]
+
+# Every landmark the detectors read
+USED_IDXS = sorted(set(LEFT_EYE_IDXS + RIGHT_EYE_IDXS + POSE_IDXS + FACE_BOUND_IDXS))
+
+
+class LandmarkBuffer:
+    """
+    Preallocated (NUM_LANDMARKS, 3) float32 array of landmark pixel
+    coordinates (x, y, z), refilled in place once per frame.
+
+    Rows keep their MediaPipe index, so detectors can gather points with
+    plain fancy indexing (points[LEFT_EYE_IDXS]). With a subset of
+    `indices` only those rows are decoded from the protobuf; the other
+    rows are left untouched and must not be read.
+    """
+
+    def __init__(self, indices=None):
+        if indices is None:
+            indices = range(NUM_LANDMARKS)
+        self.indices = np.asarray(sorted(indices), dtype=np.intp)
+        self.points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._scale = np.ones(3, dtype=np.float32)
+        self._offset = np.zeros(3, dtype=np.float32)
+
+    def fill(self, landmarks, frame_w, frame_h, x0=0, y0=0):
+        """
+        Decodes a NormalizedLandmarkList into pixel coordinates. Returns the buffer.
+        For landmarks found on a crop, pass the crop size and its top-left
+        corner (x0, y0) to get full-frame coordinates.
+        """
+        lm = landmarks.landmark
+        self.points[self.indices] = [(lm[i].x, lm[i].y, lm[i].z) for i in self.indices]
+
+        # z is on roughly the same scale as x
+        self._scale[0] = frame_w
+        self._scale[1] = frame_h
+        self._scale[2] = frame_w
+        self._offset[0] = x0
+        self._offset[1] = y0
+        self.points[self.indices] *= self._scale
+        if x0 or y0:
+            self.points[self.indices] += self._offset
+        return self.points
+
+
+class LandmarkStack:
+    """
+    LandmarkBuffer for several faces: a preallocated
+    (max_faces, NUM_LANDMARKS, 3) float32 array, one block per face, so
+    detectors can gather the same points of every face in one operation
+    (points[:, LEFT_EYE_IDXS]).
+    """
+
+    def __init__(self, max_faces, indices=None):
+        if indices is None:
+            indices = range(NUM_LANDMARKS)
+        self.indices = np.asarray(sorted(indices), dtype=np.intp)
+        self.points = np.zeros((max_faces, NUM_LANDMARKS, 3), dtype=np.float32)
+        self._scale = np.ones(3, dtype=np.float32)
+
+    def fill(self, faces, frame_w, frame_h):
+        """
+        Decodes a list of NormalizedLandmarkLists into pixel coordinates.
+        Returns the (F, NUM_LANDMARKS, 3) view of the filled blocks.
+        """
+        faces = faces[:len(self.points)]
+        n = len(faces)
+        decoded = []
+        for face in faces:
+            lm = face.landmark
+            decoded.extend((lm[i].x, lm[i].y, lm[i].z) for i in self.indices)
+
+        self._scale[0] = frame_w
+        self._scale[1] = frame_h
+        self._scale[2] = frame_w
+        stack = self.points[:n]
+        stack[:, self.indices] = np.asarray(decoded, dtype=np.float32).reshape(n, len(self.indices), 3) * self._scale
+        return stack
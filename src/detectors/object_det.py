@@ -1,52 +1,290 @@
 #/Users/mohsinniaz/BehaviorDetector/src/detectors/object_det.py
-import cv2
-import math
-from ultralytics import YOLO
+import threading
+import time
+import numpy as np
 import src.config as config
+from src.detectors.backends import load_backend
+from src.utils.buffers import FrameRing, DROP_OLDEST
+from src.utils.metrics import metrics
+from src.utils.stats import StageStats
 
-class ObjectDetector:
+class DetectionResult:
+    """
+    YOLO output for one frame, tagged with the frame it came from.
+    `timestamp` is the capture time of the source frame (time.time()).
+    """
+    def __init__(self, objects, frame_id, timestamp):
+        self.objects = objects
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+
+    def age(self, now=None):
+        """Seconds since the source frame was captured."""
+        if now is None:
+            now = time.time()
+        return now - self.timestamp
+
+    def is_stale(self, max_age, now=None):
+        return max_age is not None and self.age(now) > max_age
+
+class ResultSlot:
+    """Thread-safe holder for the newest DetectionResult."""
     def __init__(self):
-        print(f"🔄 Loading YOLO model from: {config.YOLO_MODEL_PATH}...")
+        self._result = None
+        self._lock = threading.Lock()
+
+    def publish(self, result):
+        with self._lock:
+            # Never let an older frame overwrite a newer result
+            current = self._result
+            if current is None or result.frame_id is None or current.frame_id is None \
+                    or result.frame_id >= current.frame_id:
+                self._result = result
+
+    def get(self, max_age=None):
+        """
+        Returns the newest result, or None if there is none yet or it is
+        older than `max_age` seconds (default: config.DETECTION_MAX_AGE).
+        """
+        if max_age is None:
+            max_age = config.DETECTION_MAX_AGE
+        with self._lock:
+            result = self._result
+        if result is None or result.is_stale(max_age):
+            return None
+        return result
+
+class BatchDetections:
+    """
+    Detections for a batch of frames, stored as flat arrays:
+      boxes      (N, 4) int32   full-frame [x1, y1, x2, y2]
+      class_ids  (N,)   int32
+      confs      (N,)   float32
+      offsets    (F+1,) int64   frame i owns rows offsets[i]:offsets[i+1]
+    to_dicts(i) gives the classic list-of-dicts view for one frame.
+    """
+    def __init__(self, boxes, class_ids, confs, offsets):
+        self.boxes = boxes
+        self.class_ids = class_ids
+        self.confs = confs
+        self.offsets = offsets
+
+    @classmethod
+    def empty(cls, num_frames):
+        return cls(np.zeros((0, 4), dtype=np.int32), np.zeros(0, dtype=np.int32),
+                   np.zeros(0, dtype=np.float32), np.zeros(num_frames + 1, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def frame(self, i):
+        """(boxes, class_ids, confs) array views for frame i."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.boxes[start:end], self.class_ids[start:end], self.confs[start:end]
+
+    def to_dicts(self, i):
+        boxes, class_ids, confs = self.frame(i)
+        return [
+            {
+                "label": config.CLASS_NAMES.get(cls_id, "Unknown"),
+                "conf": conf,
+                "box": box,
+                "class_id": cls_id
+            }
+            for box, cls_id, conf in zip(boxes.tolist(), class_ids.tolist(), confs.tolist())
+        ]
+
+class ObjectDetector:
+    def __init__(self, model_path=None, backend=None, background=False):
+        """
+        Loads the model (and runs one warm-up inference) right away, or in a
+        background thread with `background=True`. Until then `ready` is
+        False and detect() returns no objects.
+        """
+        self.model_path = model_path or config.YOLO_MODEL_PATH
+        self.backend = backend
+        self.model = None
+        self.load_time = None   # Seconds spent loading + warming up
+        self._loaded = threading.Event()
+
+        # Async worker state (see submit / latest)
+        self.stats = StageStats("object")
+        self._pending = FrameRing(1, DROP_OLDEST, on_drop=self._release)  # Only the newest frame matters
+        self._latest = ResultSlot()
+        self._worker = None
+        self._in_flight = False
+
+        if background:
+            t = threading.Thread(target=self.load, name="yolo-loader")
+            t.daemon = True
+            t.start()
+        else:
+            self.load()
+
+    def load(self):
+        start = time.perf_counter()
+        print(f"🔄 Loading YOLO model from: {self.model_path}...")
         try:
-            # Load the model you trained (best.pt)
-            self.model = YOLO(config.YOLO_MODEL_PATH)
-            print("✅ YOLO Model loaded successfully!")
+            # The model you trained (best.pt) or an export of it (see src/detectors/backends.py)
+            model = load_backend(self.model_path, self.backend)
+            # The first inference allocates buffers / picks kernels; do it before real frames arrive
+            size = config.YOLO_INPUT_SIZE
+            model.predict([np.zeros((size, size, 3), dtype=np.uint8)], config.CONFIDENCE_THRESHOLD, size)
+            self.model = model
+            self.load_time = time.perf_counter() - start
+            print(f"✅ YOLO Model loaded successfully! ({model.name}, {self.load_time:.1f}s incl. warm-up)")
         except Exception as e:
             print(f"❌ Error loading YOLO model: {e}")
             self.model = None
+        self._loaded.set()
+
+    @property
+    def ready(self):
+        """True once the model is loaded and warmed up."""
+        return self.model is not None
 
-    def detect(self, frame):
+    def wait_loaded(self, timeout=None):
+        """Blocks until loading finished (successfully or not)."""
+        return self._loaded.wait(timeout)
+
+    def detect(self, frame, roi=None, scale=1.0):
         """
         Runs YOLO inference on the frame.
+        If `roi` = (x1, y1, x2, y2) is given, only that region is analyzed
+        (at the model's native input size) and boxes are mapped back to
+        full-frame coordinates.
+        `scale` is the size of `frame` relative to the original frame when a
+        downscaled copy is passed (see Preprocessor); boxes are scaled back.
         Returns a list of detections: [{'label': 'phone', 'conf': 0.95, 'box': [x1, y1, x2, y2]}]
         """
-        results = []
-        
-        if self.model is None:
-            return results
-
-        # Run inference (stream=True is faster for video)
-        predictions = self.model(frame, stream=True, verbose=False, conf=config.CONFIDENCE_THRESHOLD)
-
-        for p in predictions:
-            boxes = p.boxes
-            for box in boxes:
-                # Get coordinates
-                x1, y1, x2, y2 = box.xyxy[0]
-                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-
-                # Get class info
-                cls_id = int(box.cls[0])
-                conf = float(box.conf[0])
-                
-                # Get class name from config
-                label = config.CLASS_NAMES.get(cls_id, "Unknown")
-                
-                results.append({
-                    "label": label,
-                    "conf": conf,
-                    "box": [x1, y1, x2, y2],
-                    "class_id": cls_id
-                })
-
-        return results
\ No newline at end of file
+        return self.detect_batch([frame], [roi], [scale]).to_dicts(0)
+
+    def detect_batch(self, frames, rois=None, scales=None):
+        """
+        Runs one YOLO forward pass over several frames (e.g. one per camera,
+        or a chunk of a video). `rois` is an optional list with an
+        (x1, y1, x2, y2) region or None per frame, `scales` an optional list
+        of downscale factors (see detect).
+        Returns a BatchDetections with full-frame boxes as NumPy arrays.
+        """
+        if self.model is None or not frames:
+            return BatchDetections.empty(len(frames))
+
+        if rois is None:
+            rois = [None] * len(frames)
+
+        crops = []
+        shifts = np.zeros((len(frames), 4), dtype=np.int32)
+        for i, (frame, roi) in enumerate(zip(frames, rois)):
+            if roi is not None:
+                x1, y1, x2, y2 = roi
+                frame = frame[y1:y2, x1:x2]
+                shifts[i] = (x1, y1, x1, y1)
+            crops.append(frame)
+
+        with metrics.span("yolo"):
+            predictions = self.model.predict(crops, conf=config.CONFIDENCE_THRESHOLD,
+                                             imgsz=config.YOLO_INPUT_SIZE)
+        metrics.inc("yolo_frames_total", len(crops))
+
+        boxes, class_ids, confs = [], [], []
+        counts = np.zeros(len(frames), dtype=np.int64)
+        for i, (xyxy, cls, conf) in enumerate(predictions):
+            counts[i] = len(xyxy)
+            if counts[i] == 0:
+                continue
+            xyxy = xyxy + shifts[i]
+            if scales is not None and scales[i] != 1.0:
+                xyxy = xyxy / scales[i]
+            boxes.append(xyxy.astype(np.int32))
+            class_ids.append(cls)
+            confs.append(conf)
+
+        if not boxes:
+            return BatchDetections.empty(len(frames))
+
+        offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        class_ids = np.concatenate(class_ids)
+        for cls_id, n in zip(*np.unique(class_ids, return_counts=True)):
+            metrics.inc("detections_total", int(n), label=config.CLASS_NAMES.get(int(cls_id), int(cls_id)))
+        return BatchDetections(np.concatenate(boxes), class_ids,
+                               np.concatenate(confs), offsets)
+
+    # ==========================================
+    # ASYNC API (non-blocking)
+    # ==========================================
+    def start(self):
+        """Starts the background inference thread (called automatically by submit)."""
+        if self._worker is not None:
+            return
+        self._worker = threading.Thread(target=self._worker_loop, name="object-detector")
+        self._worker.daemon = True
+        self._worker.start()
+
+    def stop(self):
+        self._pending.close()
+        if self._worker is not None:
+            self._worker.join(timeout=2.0)
+            self._worker = None
+
+    def submit(self, frame, frame_id=None, timestamp=None, roi=None, scale=1.0, hold=None):
+        """
+        Queues a frame for background inference and returns immediately.
+        If the worker is still busy, a previously queued frame is replaced.
+        The caller must not modify `frame` afterwards (pass a read-only view).
+        `hold` (e.g. a PreparedFrame reference) is released once the frame
+        is no longer needed: after inference, or when it is replaced.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        self.start()
+        item = (frame, frame_id, timestamp, roi, scale, hold)
+        if not self._pending.put(item):
+            self._release(item)
+            return False
+        return True
+
+    @staticmethod
+    def _release(item):
+        hold = item[-1]
+        if hold is not None:
+            hold.release()
+
+    @property
+    def busy(self):
+        """True while a frame is queued or being processed."""
+        return self._pending.depth > 0 or self._in_flight
+
+    def queue_stats(self):
+        return self._pending.snapshot()
+
+    def latest(self, max_age=None):
+        """
+        Returns the most recent DetectionResult, or None if there is none yet
+        or it is older than `max_age` seconds (default: config.DETECTION_MAX_AGE).
+        """
+        return self._latest.get(max_age)
+
+    def _worker_loop(self):
+        while True:
+            item = self._pending.get(timeout=0.5)
+            if item is None:
+                if self._pending.closed:
+                    break
+                continue
+
+            frame, frame_id, timestamp, roi, scale, _ = item
+            self._in_flight = True
+            start = time.perf_counter()
+            try:
+                objects = self.detect(frame, roi, scale)
+            except Exception as e:
+                print(f"❌ YOLO inference failed: {e}")
+                objects = []
+            finally:
+                self._release(item)
+            self.stats.record(time.perf_counter() - start)
+
+            self._latest.publish(DetectionResult(objects, frame_id, timestamp))
+            self._in_flight = False
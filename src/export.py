@@ -0,0 +1,104 @@
+import argparse
+import os
+import cv2
+import numpy as np
+import src.config as config
+from src.detectors.backends import ExportedBackend
+
+FORMATS = ("onnx", "onnx-int8", "openvino", "openvino-int8", "torchscript")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# ==========================================
+# CALIBRATION DATA (INT8)
+# ==========================================
+def calibration_images(directory, limit):
+    """First `limit` images of a directory (e.g. data/valid/images)."""
+    if not directory or not os.path.isdir(directory):
+        return []
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith(IMAGE_EXTENSIONS))
+    return [os.path.join(directory, n) for n in names[:limit]]
+
+def make_calibration_reader(input_name, paths, imgsz):
+    """ONNX Runtime calibration reader feeding letterboxed images one at a time."""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(paths)
+
+        def get_next(self):
+            for path in self.paths:
+                image = cv2.imread(path)
+                if image is None:
+                    continue
+                padded, _, _ = ExportedBackend.letterbox(image, imgsz)
+                blob = padded[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255
+                return {input_name: blob}
+            return None
+
+    return Reader()
+
+# ==========================================
+# EXPORT
+# ==========================================
+def quantize_onnx(onnx_path, images, imgsz):
+    """
+    INT8 ONNX model next to `onnx_path` (best.int8.onnx). Uses static
+    quantization calibrated on `images` when there are any, otherwise
+    dynamic (weights-only) quantization.
+    """
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    out_path = onnx_path[:-len(".onnx")] + ".int8.onnx"
+    if images:
+        input_name = onnx.load(onnx_path).graph.input[0].name
+        print(f"🔄 Calibrating INT8 on {len(images)} images...")
+        quantize_static(onnx_path, out_path, make_calibration_reader(input_name, images, imgsz),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    else:
+        print("⚠️  No calibration images, falling back to dynamic quantization.")
+        quantize_dynamic(onnx_path, out_path, weight_type=QuantType.QUInt8)
+    return out_path
+
+def export_model(weights, fmt, imgsz, images_dir=None, data_yaml=None, calibration=200):
+    """Exports `weights` (best.pt) to `fmt`. Returns the path of the exported model."""
+    from ultralytics import YOLO
+    model = YOLO(weights)
+
+    if fmt in ("onnx", "onnx-int8"):
+        # Dynamic axes, so the multi-stream server can batch frames
+        path = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if fmt == "onnx-int8":
+            path = quantize_onnx(path, calibration_images(images_dir, calibration), imgsz)
+        return path
+    if fmt == "openvino":
+        return model.export(format="openvino", imgsz=imgsz)
+    if fmt == "openvino-int8":
+        # NNCF post-training quantization, calibrated on the dataset in data_yaml
+        return model.export(format="openvino", imgsz=imgsz, int8=True, data=data_yaml)
+    if fmt == "torchscript":
+        return model.export(format="torchscript", imgsz=imgsz)
+    raise ValueError(f"Unknown format '{fmt}'")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the YOLO model for the CPU backends")
+    parser.add_argument("formats", nargs="+", choices=FORMATS)
+    parser.add_argument("--weights", default=config.YOLO_MODEL_PATH, help="PyTorch weights to export")
+    parser.add_argument("--imgsz", type=int, default=config.YOLO_INPUT_SIZE)
+    parser.add_argument("--images", default=os.path.join(config.ROOT_DIR, "data", "valid", "images"),
+                        help="Calibration images for onnx-int8")
+    parser.add_argument("--data", default=os.path.join(config.ROOT_DIR, "data", "data.yaml"),
+                        help="Dataset yaml for openvino-int8 calibration")
+    parser.add_argument("--calibration", type=int, default=200, help="Max calibration images")
+    args = parser.parse_args()
+
+    for fmt in args.formats:
+        print(f"📦 Exporting {args.weights} -> {fmt}")
+        path = export_model(args.weights, fmt, args.imgsz, args.images, args.data, args.calibration)
+        print(f"✅ {fmt}: {path}")
+    print("ℹ️  Compare accuracy and latency with: python -m benchmarks.backends <models...>")
+
+if __name__ == "__main__":
+    main()
@@ -1,128 +1,255 @@
 import cv2
 import time
+from concurrent.futures import ThreadPoolExecutor
 import src.config as config
 
 # Import Custom Modules
 from src.detectors.face_mesh import FaceMeshDetector
+from src.detectors.face_tracker import FaceTracker
 from src.detectors.drowsiness import DrowsinessDetector
 from src.detectors.distraction import DistractionDetector
 from src.detectors.object_det import ObjectDetector
-from src.utils.alerts import AudioAlert
+from src.multiproc import ProcessPipeline
+from src.pipeline import BehaviorPipeline
+from src.utils.alerts import AlertDispatcher, create_sinks
+from src.utils.metrics import metrics, start_exporters, stop_exporters
+from src.utils.recorder import RecordSink, SessionRecorder
+from src.utils.sources import open_source
+from src.utils.startup import StartupTimer
+from src.utils.temporal import PresenceTracks
+from src.utils.tracker import ObjectTracker
 from src.utils.visualizer import Visualizer
 
+def print_report(report):
+    print("📊 Pipeline stages:")
+    for name, entry in report.items():
+        line = (f"   {name:<8} n={entry['count']:<6} "
+                f"avg={entry['avg_ms']:.1f}ms max={entry['max_ms']:.1f}ms")
+        if "depth" in entry:
+            line += f" | queue={entry['depth']} (max {entry['max_depth']}) dropped={entry['dropped']}"
+        print(line)
+
+def current_objects_for(packet, detections, tracker=None):
+    """
+    Objects to draw and alert on for this frame: the tracked objects with
+    boxes predicted to the frame's time, or the latest detections as-is
+    without a tracker. Track start / stop events go to packet.events.
+    """
+    if tracker is None:
+        return detections.objects if detections else []
+    packet.events.extend(tracker.observe(detections, packet.timestamp))
+    return tracker.objects(packet.timestamp)
+
+def handle_packet(packet, current_objects, alerter, viz=None, presence=None):
+    """
+    Alert logic + HUD for one analyzed frame (phases 3 and 4).
+    Draws on packet.frame unless `viz` is None. With `presence` (PresenceTracks)
+    object alerts are debounced over time, otherwise they follow each frame.
+    Phone alerts name the phone tracks that raised them (with OBJECT_TRACKING),
+    and in multi-face mode (packet.faces) face alerts name the faces.
+    Returns the active alert messages.
+    """
+    frame = packet.frame
+    is_drowsy = packet.is_drowsy
+    is_distracted = packet.is_distracted
+    ear_score = packet.ear_score
+    pose_data = packet.pose_data
+    active_alerts = []
+
+    # ==========================================
+    # PHASE 3: ALERTS & LOGIC
+    # ==========================================
+    # Check Objects
+    labels = {obj['label'] for obj in current_objects}
+    if presence is not None:
+        packet.events.extend(presence.update(packet.timestamp, labels))
+        phone_present = presence.active('phone')
+    else:
+        phone_present = 'phone' in labels
+
+    if phone_present:
+        # With tracking on, one alert per tracked phone, each with its own cooldown
+        track_ids = [obj['track_id'] for obj in current_objects
+                     if obj['label'] == 'phone' and obj.get('track_id') is not None]
+        metrics.inc("alert_frames_total", reason="phone")
+        if track_ids:
+            active_alerts.append(f"!!! PHONE DETECTED (#{', #'.join(map(str, track_ids))}) !!!")
+            for track_id in track_ids:
+                alerter.trigger("danger", "phone", subject=f"track {track_id}")
+        else:
+            active_alerts.append("!!! PHONE DETECTED !!!")
+            alerter.trigger("danger", "phone")
+
+    # Check Face
+    faces = packet.faces
+    if is_drowsy:
+        metrics.inc("alert_frames_total", reason="drowsy")
+        if faces is not None:
+            # One alert per drowsy face, each with its own cooldown
+            face_ids = faces.ids_where(faces.drowsy)
+            active_alerts.append(f"!!! WAKE UP (face #{', #'.join(map(str, face_ids))}) !!!")
+            for face_id in face_ids:
+                alerter.trigger("danger", "drowsy", subject=f"face {face_id}")
+        else:
+            active_alerts.append("!!! WAKE UP !!!")
+            alerter.trigger("danger", "drowsy")
+
+    if is_distracted:
+        metrics.inc("alert_frames_total", reason="distracted")
+        if faces is not None:
+            for face_id in faces.ids_where(faces.distracted):
+                alerter.trigger("warning", "distracted", subject=f"face {face_id}")
+        else:
+            alerter.trigger("warning", "distracted")
+
+    for event in packet.events:
+        metrics.inc("events_total", event=event.name, kind=event.kind)
+
+    # ==========================================
+    # PHASE 4: VISUALIZATION
+    # ==========================================
+    if viz is None or viz.headless:
+        return active_alerts
+
+    # A. Draw Objects (and every face in multi-face mode)
+    viz.draw_objects(frame, current_objects)
+    viz.draw_faces(frame, faces)
+
+    # B. Draw Face Status
+    drowsy_color = (0, 0, 255) if is_drowsy else (0, 255, 0)
+    viz.draw_status(frame, "Status", "DROWSY" if is_drowsy else "Awake", (20, 40), drowsy_color)
+    viz.draw_status(frame, "EAR", f"{ear_score:.2f}", (20, 70), drowsy_color)
+
+    # --- UPDATED DEBUG SECTION START ---
+    distract_color = (0, 0, 255) if is_distracted else (0, 255, 0)
+    focus_status = "DISTRACTED" if is_distracted else "Focused"
+
+    # Show Pitch (P) and Yaw (Y) on screen so we can tune config
+    pitch = int(pose_data[0])
+    yaw = int(pose_data[1])
+    debug_text = f"{focus_status} (P:{pitch} Y:{yaw})"
+
+    viz.draw_status(frame, "Focus", debug_text, (20, 110), distract_color)
+    # --- UPDATED DEBUG SECTION END ---
+
+    # D. Draw Big Alerts
+    if active_alerts:
+        viz.draw_alerts(frame, active_alerts)
+
+    return active_alerts
+
+def open_camera():
+    """CAMERA_SOURCE, read ahead in the background (newest frame wins for cameras and streams)."""
+    return open_source(config.CAMERA_SOURCE, config.FRAME_WIDTH, config.FRAME_HEIGHT)
+
 def main():
     # 1. Initialize System
     print("🚀 Initializing Behavior Detector...")
-    cap = cv2.VideoCapture(config.CAMERA_INDEX)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, config.FRAME_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.FRAME_HEIGHT)
+    startup = StartupTimer()
+    headless = config.HEADLESS
 
     # 2. Load Modules
-    face_mesh = FaceMeshDetector()
-    drowsy_det = DrowsinessDetector()
-    distract_det = DistractionDetector()
-    object_det = ObjectDetector()
-    alerter = AudioAlert()
-    viz = Visualizer()
-
-    print("\n✅ SYSTEM READY. Monitoring Started...")
-    print(f"ℹ️  Object Detection running every {config.DETECTION_INTERVAL} frames.")
+    recorder = SessionRecorder() if config.RECORD_SESSIONS else None
+    sinks = create_sinks()
+    if recorder is not None:
+        sinks.append(RecordSink({None: recorder}))
+    alerter = AlertDispatcher(sinks)
+    viz = Visualizer(headless=headless)
+    presence = PresenceTracks(config.CLASS_NAMES.values())
+    tracker = ObjectTracker() if config.OBJECT_TRACKING else None
+
+    if config.EXECUTION_MODE == "processes":
+        # Face analysis and YOLO load and run in their own worker processes
+        source = startup.timed("camera", open_camera)
+        pipeline = ProcessPipeline(source)
+        object_det = pipeline.object_det
+    else:
+        # YOLO loads and warms up in its own thread and switches on when ready.
+        # The face mesh (the fast path) loads while the camera opens.
+        object_det = ObjectDetector(background=True)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            face_future = pool.submit(startup.timed, "face_mesh", FaceMeshDetector)
+            source = startup.timed("camera", open_camera)
+            drowsy_det = DrowsinessDetector()
+            distract_det = DistractionDetector()
+            face_mesh = face_future.result()
+        if config.FACE_TRACKING and config.MAX_NUM_FACES == 1:
+            face_mesh = FaceTracker(face_mesh)
+
+        # Capture, face analysis and YOLO run in background threads
+        pipeline = BehaviorPipeline(source, face_mesh, drowsy_det, distract_det, object_det)
+    pipeline.start()
+    startup.mark("fast_path")
+    exporters = start_exporters(headless=headless)
+
+    print(f"\n✅ SYSTEM READY. Monitoring Started... ({startup.summary()})")
+    if not object_det.ready:
+        print("ℹ️  Object Detection starts once the YOLO model has loaded.")
+    if config.ADAPTIVE_DETECTION:
+        print(f"ℹ️  Object Detection running every {config.DETECTION_MIN_INTERVAL}-{config.DETECTION_MAX_INTERVAL}s (adaptive).")
+    else:
+        print(f"ℹ️  Object Detection running every {config.DETECTION_INTERVAL} frames.")
+    if headless:
+        print("ℹ️  Headless: no window, press Ctrl+C to stop.")
 
     # 3. Runtime Variables
     prev_time = 0
-    frame_count = 0
-    current_objects = [] 
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("❌ Camera Error")
-            break
-
-        frame = cv2.flip(frame, 1)
-        h, w, _ = frame.shape
-        frame_count += 1
-        active_alerts = []
-
-        # ==========================================
-        # PHASE 1: FAST CHECKS (Face)
-        # ==========================================
-        landmarks = face_mesh.get_landmarks(frame)
-        
-        is_drowsy = False
-        is_distracted = False
-        ear_score = 0
-        pose_data = (0,0,0)
-
-        if landmarks:
-            # Drowsiness
-            is_drowsy, ear_score = drowsy_det.analyze(landmarks, w, h)
-            # Distraction
-            is_distracted, pose_data = distract_det.analyze(landmarks, w, h)
-
-        # ==========================================
-        # PHASE 2: SLOW CHECKS (YOLO)
-        # ==========================================
-        if frame_count % config.DETECTION_INTERVAL == 0:
-            current_objects = object_det.detect(frame)
-        
-        # ==========================================
-        # PHASE 3: ALERTS & LOGIC
-        # ==========================================
-        # Check Objects
-        for obj in current_objects:
-            if obj['label'] == 'phone':
-                active_alerts.append("!!! PHONE DETECTED !!!")
-                alerter.trigger("danger")
-
-        # Check Face
-        if is_drowsy:
-            active_alerts.append("!!! WAKE UP !!!")
-            alerter.trigger("danger")
-        
-        if is_distracted:
-            alerter.trigger("warning")
-
-        # ==========================================
-        # PHASE 4: VISUALIZATION
-        # ==========================================
-        # A. Draw Objects
-        viz.draw_objects(frame, current_objects)
-
-        # B. Draw Face Status
-        drowsy_color = (0, 0, 255) if is_drowsy else (0, 255, 0)
-        viz.draw_status(frame, "Status", "DROWSY" if is_drowsy else "Awake", (20, 40), drowsy_color)
-        viz.draw_status(frame, "EAR", f"{ear_score:.2f}", (20, 70), drowsy_color)
-
-        # --- UPDATED DEBUG SECTION START ---
-        distract_color = (0, 0, 255) if is_distracted else (0, 255, 0)
-        focus_status = "DISTRACTED" if is_distracted else "Focused"
-        
-        # Show Pitch (P) and Yaw (Y) on screen so we can tune config
-        pitch = int(pose_data[0])
-        yaw = int(pose_data[1])
-        debug_text = f"{focus_status} (P:{pitch} Y:{yaw})"
-        
-        viz.draw_status(frame, "Focus", debug_text, (20, 110), distract_color)
-        # --- UPDATED DEBUG SECTION END ---
-
-        # D. Draw Big Alerts
-        if active_alerts:
-            viz.draw_alerts(frame, active_alerts)
-
-        # E. FPS
-        curr_time = time.time()
-        fps = 1 / (curr_time - prev_time) if prev_time else 0
-        prev_time = curr_time
-        viz.draw_fps(frame, fps)
-
-        cv2.imshow("Behavior Detector AI", frame)
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
-    cap.release()
-    cv2.destroyAllWindows()
+    last_report = time.time()
+
+    try:
+        while True:
+            packet = pipeline.read(timeout=1.0, canvas=not headless)
+            if packet is None:
+                if pipeline.finished:
+                    break
+                continue
+
+            render_start = time.perf_counter()
+            frame = packet.frame
+            if "first_frame" not in startup.marks:
+                print(f"⏱️  First frame after {startup.mark('first_frame'):.1f}s")
+            if "object_detection" not in startup.marks and object_det.ready:
+                print(f"⏱️  Object Detection active after {startup.mark('object_detection'):.1f}s")
+            # Expired results (older than DETECTION_MAX_AGE) are neither drawn nor alerted on
+            detections = pipeline.latest_detections()
+            current_objects = current_objects_for(packet, detections, tracker)
+
+            with metrics.span("draw"):
+                handle_packet(packet, current_objects, alerter, viz, presence)
+                if recorder is not None:
+                    recorder.record_packet(packet, detections)
+
+                # E. FPS
+                curr_time = time.time()
+                fps = 1 / (curr_time - prev_time) if prev_time else 0
+                prev_time = curr_time
+                viz.draw_fps(frame, fps)
+
+            key = None
+            if not headless:
+                with metrics.span("display"):
+                    cv2.imshow("Behavior Detector AI", frame)
+                    key = cv2.waitKey(1) & 0xFF
+            pipeline.record_render(time.perf_counter() - render_start)
+
+            if config.STATS_INTERVAL and curr_time - last_report >= config.STATS_INTERVAL:
+                print_report(pipeline.report())
+                last_report = curr_time
+
+            if key == ord('q'):
+                break
+    except KeyboardInterrupt:
+        pass
+
+    pipeline.stop()
+    alerter.close()
+    if recorder is not None:
+        recorder.close()
+    stop_exporters(exporters)
+    print_report(pipeline.report())
+    source.release()
+    if not headless:
+        cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
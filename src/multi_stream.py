@@ -0,0 +1,163 @@
+import argparse
+import time
+import cv2
+import src.config as config
+
+from src.detectors.face_mesh import FaceMeshDetector
+from src.detectors.face_tracker import FaceTracker
+from src.detectors.drowsiness import DrowsinessDetector
+from src.detectors.distraction import DistractionDetector
+from src.detectors.object_det import ObjectDetector
+from src.detectors.batch_det import BatchDetectionServer
+from src.main import current_objects_for, handle_packet
+from src.pipeline import BehaviorPipeline
+from src.utils.alerts import AlertDispatcher, create_sinks
+from src.utils.metrics import metrics, start_exporters, stop_exporters
+from src.utils.recorder import RecordSink, SessionRecorder
+from src.utils.sources import open_source
+from src.utils.stats import StageStats
+from src.utils.temporal import PresenceTracks
+from src.utils.tracker import ObjectTracker
+from src.utils.visualizer import Visualizer
+
+class StreamAlerter:
+    """Prefixes console alerts with the stream name and shares one alert dispatcher."""
+    def __init__(self, name, alerter):
+        self.name = name
+        self.alerter = alerter
+        self.last_alerts = ()
+
+    def trigger(self, alert_type="warning", reason=None, subject=None):
+        self.alerter.trigger(alert_type, reason, source=self.name, subject=subject)
+
+    def report(self, alerts):
+        alerts = tuple(alerts)
+        if alerts and alerts != self.last_alerts:
+            print(f"🚨 [{self.name}] {' | '.join(alerts)}")
+        self.last_alerts = alerts
+
+class Stream:
+    """One source with its own capture, face-analysis state and counters."""
+    def __init__(self, name, source, server, alerter):
+        self.name = name
+        self.source = open_source(source, config.FRAME_WIDTH, config.FRAME_HEIGHT)
+
+        # MediaPipe and the detectors are stateful, so every stream gets its own
+        face_mesh = FaceMeshDetector()
+        if config.FACE_TRACKING and config.MAX_NUM_FACES == 1:
+            face_mesh = FaceTracker(face_mesh)
+        self.pipeline = BehaviorPipeline(
+            self.source, face_mesh, DrowsinessDetector(), DistractionDetector(),
+            server.client(name)
+        )
+        self.alerter = StreamAlerter(name, alerter)
+        self.presence = PresenceTracks(config.CLASS_NAMES.values())
+        self.tracker = ObjectTracker() if config.OBJECT_TRACKING else None
+        self.recorder = SessionRecorder(name) if config.RECORD_SESSIONS else None
+
+        # Capture -> rendered latency, and frames rendered since the last report
+        self.latency = StageStats(name)
+        self.frames = 0
+        self.fps = 0.0
+
+def print_stream_report(streams, server, elapsed):
+    print(f"📊 Streams (YOLO: {server.batches} batches, avg size {server.avg_batch_size:.1f}, "
+          f"avg {server.stats.snapshot()['avg_ms']:.1f}ms)")
+    for stream in streams:
+        stream.fps = stream.frames / elapsed if elapsed > 0 else 0.0
+        stream.frames = 0
+        latency = stream.latency.snapshot()
+        report = stream.pipeline.report()
+        print(f"   {stream.name:<10} fps={stream.fps:5.1f} latency avg={latency['avg_ms']:.1f}ms "
+              f"max={latency['max_ms']:.1f}ms | face={report['face']['avg_ms']:.1f}ms "
+              f"yolo={report['object']['avg_ms']:.1f}ms dropped={report['face']['dropped']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor several cameras / videos / RTSP streams at once")
+    parser.add_argument("--source", action="append", required=True,
+                        help="Camera index or /dev/video*, video file, image folder, RTSP URL or GStreamer pipeline (repeat for each stream)")
+    parser.add_argument("--show", action="store_true", help="Open a window per stream")
+    args = parser.parse_args()
+
+    print(f"🚀 Initializing Behavior Detector for {len(args.source)} streams...")
+
+    # One YOLO model shared by every stream, fed in batches
+    object_det = ObjectDetector(background=True)  # Streams start before YOLO is warm
+    server = BatchDetectionServer(object_det)
+    # Each stream records its own session; alerts reach it by their source
+    recorders = {}
+    sinks = create_sinks()
+    if config.RECORD_SESSIONS:
+        sinks.append(RecordSink(recorders))
+    alerter = AlertDispatcher(sinks)
+    viz = Visualizer(headless=not args.show)
+
+    streams = [
+        Stream(f"cam{i}", source, server, alerter)
+        for i, source in enumerate(args.source)
+    ]
+    recorders.update((stream.name, stream.recorder) for stream in streams)
+    server.start()
+    for stream in streams:
+        stream.pipeline.start()
+    # Without windows the HTTP endpoint is the way to watch the streams
+    exporters = start_exporters(headless=not args.show)
+
+    print("\n✅ SYSTEM READY. Monitoring Started...")
+
+    last_report = time.time()
+    try:
+        while True:
+            idle = True
+            for stream in streams:
+                packet = stream.pipeline.read(timeout=0, canvas=args.show)
+                if packet is None:
+                    continue
+                idle = False
+
+                detections = stream.pipeline.latest_detections()
+                current_objects = current_objects_for(packet, detections, stream.tracker)
+                alerts = handle_packet(packet, current_objects, stream.alerter, viz,
+                                       stream.presence)
+                stream.alerter.report(alerts)
+                if stream.recorder is not None:
+                    stream.recorder.record_packet(packet, detections)
+
+                stream.frames += 1
+                latency = time.time() - packet.timestamp
+                stream.latency.record(latency)
+                metrics.observe("end_to_end", latency)
+                if args.show:
+                    cv2.imshow(f"Behavior Detector AI - {stream.name}", packet.frame)
+
+            if all(stream.pipeline.finished for stream in streams):
+                break
+
+            now = time.time()
+            if config.STATS_INTERVAL and now - last_report >= config.STATS_INTERVAL:
+                print_stream_report(streams, server, now - last_report)
+                last_report = now
+
+            if args.show:
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+            elif idle:
+                time.sleep(0.002)
+    except KeyboardInterrupt:
+        pass
+
+    for stream in streams:
+        stream.pipeline.stop()
+        stream.source.release()
+    server.stop()
+    alerter.close()
+    for stream in streams:
+        if stream.recorder is not None:
+            stream.recorder.close()
+    stop_exporters(exporters)
+    print_stream_report(streams, server, time.time() - last_report)
+    if args.show:
+        cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    main()
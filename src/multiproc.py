@@ -0,0 +1,563 @@
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+import src.config as config
+from src.detectors.object_det import DetectionResult, ResultSlot
+from src.pipeline import FramePacket
+from src.utils.metrics import metrics
+from src.utils.preprocess import read_only
+from src.utils.roi import face_roi
+from src.utils.scheduler import DetectionScheduler
+from src.utils.stats import StageStats
+
+
+# ==========================================
+# SHARED FRAME RING
+# ==========================================
+class SharedFrameRing:
+    """
+    `slots` frames of `shape` in one shared memory block.
+
+    The process that creates the ring hands out slots and counts their
+    references (acquire / retain / release); a slot is reused once nobody
+    holds it. Worker processes attach by name and only read.
+    """
+
+    def __init__(self, slots, shape, name=None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.owner = name is None
+        size = slots * int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+        self._refs = np.zeros(slots, dtype=np.int32)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def acquire(self):
+        """A free slot, now holding one reference, or None if every slot is in use."""
+        with self._lock:
+            for i in range(self.slots):
+                slot = (self._next + i) % self.slots
+                if self._refs[slot] == 0:
+                    self._refs[slot] = 1
+                    self._next = (slot + 1) % self.slots
+                    return slot
+        return None
+
+    def retain(self, slot):
+        with self._lock:
+            self._refs[slot] += 1
+
+    def release(self, slot):
+        with self._lock:
+            self._refs[slot] -= 1
+
+    def in_use(self):
+        with self._lock:
+            return int(np.count_nonzero(self._refs))
+
+    def close(self):
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # Views of a frame are still alive; the mapping goes away with the process
+        if self.owner:
+            self.shm.unlink()
+
+
+# ==========================================
+# WORKER PROCESSES
+# ==========================================
+def pin_to_cpus(cpus):
+    """Restricts the calling process to `cpus` (Linux only). Returns True if pinned."""
+    if not cpus:
+        return False
+    if not hasattr(os, "sched_setaffinity"):
+        print("ℹ️  CPU pinning is not supported on this platform.")
+        return False
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as e:
+        print(f"⚠️  Cannot pin to CPUs {list(cpus)}: {e}")
+        return False
+    return True
+
+def _init_worker(cpus):
+    # Ctrl+C reaches the whole process group; the parent shuts workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if pin_to_cpus(cpus):
+        cv2.setNumThreads(len(cpus))
+
+def face_worker(conn, ring_name, slots, shape, cpus=None):
+    """
+    Face mesh + drowsiness + distraction, one frame per request.
+    Request: (slot, timestamp). Reply: (face, is_drowsy, ear, is_distracted,
+    pose, events, roi, faces, seconds); `face` is whether a face was found,
+    `faces` the FaceResults of every face in multi-face mode, None otherwise.
+    """
+    from src.detectors.face_mesh import FaceMeshDetector
+    from src.detectors.faces import MultiFaceAnalyzer
+    from src.detectors.face_tracker import FaceTracker
+    from src.detectors.drowsiness import DrowsinessDetector
+    from src.detectors.distraction import DistractionDetector
+
+    _init_worker(cpus)
+    ring = SharedFrameRing(slots, shape, ring_name)
+    face_mesh = FaceMeshDetector()
+    if config.FACE_TRACKING and config.MAX_NUM_FACES == 1:
+        face_mesh = FaceTracker(face_mesh)
+    drowsy_det = DrowsinessDetector()
+    distract_det = DistractionDetector()
+    multi_face = MultiFaceAnalyzer(face_mesh, drowsy_det, distract_det) if config.MAX_NUM_FACES > 1 else None
+    h, w = shape[:2]
+    rgb = np.empty(shape, dtype=np.uint8)
+    conn.send(("ready", True))
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        slot, timestamp = request
+        start = time.perf_counter()
+        frame = read_only(ring.frames[slot])
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        faces = None
+        if multi_face is not None:
+            faces = multi_face.analyze(frame, rgb, timestamp)
+            face = len(faces) > 0
+            is_drowsy, ear, is_distracted, pose = faces.summary()
+            events = multi_face.events
+            roi = faces.roi(w, h) if config.ROI_DETECTION else None
+        else:
+            points = face_mesh.get_points(frame, rgb)
+            face = points is not None
+            is_drowsy, ear = drowsy_det.analyze(points, w, h, timestamp)
+            is_distracted, pose = distract_det.analyze(points, w, h, timestamp)
+            events = drowsy_det.events + distract_det.events
+            roi = face_roi(points, w, h) if config.ROI_DETECTION else None
+        conn.send((face, is_drowsy, float(ear), is_distracted, tuple(float(v) for v in pose),
+                   events, roi, faces, time.perf_counter() - start))
+    frame = None
+    ring.close()
+
+def object_worker(conn, ring_name, slots, shape, cpus=None):
+    """
+    YOLO, one frame per request. Request: (slot, roi). Reply: (objects, seconds).
+    The ready message says whether the model loaded.
+    """
+    from src.detectors.object_det import ObjectDetector
+
+    _init_worker(cpus)
+    ring = SharedFrameRing(slots, shape, ring_name)
+    object_det = ObjectDetector()
+    conn.send(("ready", object_det.ready))
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        slot, roi = request
+        start = time.perf_counter()
+        try:
+            objects = object_det.detect(read_only(ring.frames[slot]), roi)
+        except Exception as e:
+            print(f"❌ YOLO inference failed: {e}")
+            objects = []
+        conn.send((objects, time.perf_counter() - start))
+    ring.close()
+
+class WorkerProcess:
+    """
+    Parent-side handle of one worker process, serving one request at a
+    time over a Pipe. A worker that dies is restarted after
+    WORKER_RESTART_DELAY seconds; the request it was working on is lost.
+    """
+
+    def __init__(self, name, target, args, cpus=None):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.cpus = cpus
+        self.process = None
+        self.conn = None
+        self.started = False   # Sent its ready message
+        self.usable = False    # ...and could load its models
+        self.restarts = 0
+        self.failed_starts = 0  # Deaths in a row before the ready message
+        self.failed = False     # Gave up after WORKER_MAX_FAILED_STARTS of them
+        # Spawned, not forked: the parent runs threads and may hold model state
+        self._ctx = mp.get_context("spawn")
+
+    @property
+    def ready(self):
+        return self.started and self.usable
+
+    def start(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        self.process = self._ctx.Process(target=self.target, args=(child_conn,) + self.args + (self.cpus,),
+                                         name=f"behavior-{self.name}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.started = False
+
+    def wait_ready(self, stop_event):
+        """Waits for the ready message. False if stopped, or the worker died (restarted unless `failed`)."""
+        while not stop_event.is_set() and not self.failed:
+            try:
+                if self.conn.poll(0.5):
+                    _, self.usable = self.conn.recv()
+                    self.started = True
+                    self.failed_starts = 0
+                    return True
+            except (EOFError, OSError):
+                pass
+            else:
+                if self.process.is_alive():
+                    continue
+            self.restart(stop_event)
+            return False
+        return False
+
+    def call(self, request):
+        """Sends a request and returns the reply, or None if the worker died."""
+        try:
+            self.conn.send(request)
+            return self.conn.recv()
+        except (EOFError, OSError):
+            return None
+
+    def restart(self, stop_event):
+        """
+        Starts a dead worker again after WORKER_RESTART_DELAY. One that keeps
+        dying before it is ready (e.g. a missing package) is given up on.
+        """
+        self.process.join(timeout=1.0)
+        self.conn.close()
+        if not self.started:
+            self.failed_starts += 1
+            if self.failed_starts >= config.WORKER_MAX_FAILED_STARTS:
+                print(f"❌ {self.name} worker died {self.failed_starts} times before it was ready "
+                      f"(exit code {self.process.exitcode}), giving up. Check its error output above.")
+                self.failed = True
+                return
+        print(f"❌ {self.name} worker died (exit code {self.process.exitcode}), restarting...")
+        metrics.inc("worker_restarts_total", worker=self.name)
+        self.restarts += 1
+        if not stop_event.wait(config.WORKER_RESTART_DELAY):
+            self.start()
+
+    def stop(self, timeout=3.0):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (EOFError, OSError):
+            pass
+        self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=1.0)
+        self.conn.close()
+
+
+# ==========================================
+# PIPELINE
+# ==========================================
+class ProcessPipeline:
+    """
+    BehaviorPipeline with face analysis and YOLO in worker processes, each
+    with its own interpreter (and GIL):
+
+        capture thread -> [shared frame ring] -> face process -> render (caller)
+                                  |                    | roi
+                                  +----------> object process -> latest_detections()
+
+    Frames are mirrored once into a shared memory ring of SHARED_RING_SLOTS
+    frames of FRAME_WIDTH x FRAME_HEIGHT; only slot indices, ROIs and small
+    result tuples go through the pipes. Each worker keeps at most one frame
+    waiting (a newer frame replaces it). One thread per worker in this
+    process sends its requests and collects the replies.
+
+    Same API as BehaviorPipeline (start / stop / read / latest_detections /
+    record_render / report / finished).
+    """
+
+    STAGES = ("capture", "face", "object", "render")
+
+    def __init__(self, source, slots=None, cpus=None):
+        self.source = source  # Started ReadAhead (src/utils/sources.py)
+        self.shape = (config.FRAME_HEIGHT, config.FRAME_WIDTH, 3)
+        self.ring = SharedFrameRing(slots or config.SHARED_RING_SLOTS, self.shape)
+        self.cpus = config.WORKER_CPUS if cpus is None else cpus
+
+        args = (self.ring.name, self.ring.slots, self.shape)
+        self.face_worker = WorkerProcess("face", face_worker, args, self.cpus.get("face"))
+        self.object_worker = WorkerProcess("object", object_worker, args, self.cpus.get("object"))
+        self.object_det = self.object_worker  # main() checks object_det.ready
+
+        self.stats = {name: StageStats(name) for name in self.STAGES}
+        self.scheduler = DetectionScheduler()
+        self._latest = ResultSlot()
+
+        # Frames waiting for each worker: (slot, frame_id, timestamp[, roi]) or None
+        self._face_pending = None
+        self._object_pending = None
+        self._object_busy = False
+        self._render = deque()
+        self._held = None  # Slot of the packet last returned by read()
+        self._counts = {name: {"put": 0, "dropped": 0, "max_depth": 0} for name in ("face", "object", "render")}
+        self._cond = threading.Condition()
+        self._capture_done = False
+        self._face_done = False
+
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._canvas = None
+
+    # ------------------------------------------
+    # Lifecycle
+    # ------------------------------------------
+    def start(self):
+        pin_to_cpus(self.cpus.get("main"))
+        self.face_worker.start()
+        self.object_worker.start()
+        workers = (
+            ("capture", self._capture_loop),
+            ("face", self._face_loop),
+            ("object", self._object_loop),
+        )
+        for name, target in workers:
+            t = threading.Thread(target=target, name=f"pipeline-{name}")
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=5.0)
+        self._threads = []
+        for worker in (self.face_worker, self.object_worker):
+            worker.stop()
+        with self._cond:
+            self._render.clear()
+        self.ring.close()
+
+    @property
+    def finished(self):
+        """True once the source ended and every analyzed frame was read."""
+        with self._cond:
+            return self._face_done and not self._render
+
+    # ------------------------------------------
+    # Render stage API (called from the main thread)
+    # ------------------------------------------
+    def read(self, timeout=None, canvas=True):
+        """
+        Returns the next analyzed FramePacket, or None. Its `frame` is a
+        writable copy (reused by the next read), or with `canvas=False` a
+        read-only view of the shared slot, valid until the next read.
+        """
+        with self._cond:
+            if self._held is not None:
+                self.ring.release(self._held)
+                self._held = None
+            if not self._cond.wait_for(lambda: self._render or self._face_done or self._stop_event.is_set(),
+                                       timeout) or not self._render:
+                return None
+            packet = self._render.popleft()
+
+        if not canvas:
+            self._held = packet.slot
+            return packet
+        if self._canvas is None or self._canvas.shape != packet.frame.shape:
+            self._canvas = np.empty(packet.frame.shape, dtype=np.uint8)
+        np.copyto(self._canvas, packet.frame)
+        packet.frame = self._canvas
+        self.ring.release(packet.slot)
+        return packet
+
+    def latest_detections(self):
+        """Newest non-expired DetectionResult, or None."""
+        return self._latest.get()
+
+    def record_render(self, elapsed):
+        self.stats["render"].record(elapsed)
+
+    def report(self):
+        """Per-stage latency counters merged with the queue depth of each stage's input."""
+        with self._cond:
+            depths = {"face": int(self._face_pending is not None),
+                      "object": int(self._object_pending is not None),
+                      "render": len(self._render)}
+            report = {}
+            for name in self.STAGES:
+                entry = self.stats[name].snapshot()
+                if name in depths:
+                    entry.update(self._counts[name], depth=depths[name])
+                report[name] = entry
+        metrics.gauge("shared_slots_in_use", self.ring.in_use())
+        return report
+
+    # ------------------------------------------
+    # Worker threads
+    # ------------------------------------------
+    def _queue(self, name, attr, item):
+        """Makes `item` the frame waiting for a worker; a frame it replaces is dropped."""
+        replaced = getattr(self, attr)
+        setattr(self, attr, item)
+        counts = self._counts[name]
+        counts["put"] += 1
+        counts["max_depth"] = 1
+        if replaced is not None:
+            self.ring.release(replaced[0])
+            counts["dropped"] += 1
+        self._cond.notify_all()
+
+    def _capture_loop(self):
+        frame_id = 0
+        h, w = self.shape[:2]
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            with metrics.span("capture"):
+                ret, raw, timestamp = self.source.read(timeout=0.5)
+            if not ret:
+                if self.source.finished:
+                    print(f"ℹ️  End of {self.source.name}")
+                    break
+                continue
+
+            slot = self.ring.acquire()
+            if slot is None:
+                # Every slot is still queued or being analyzed
+                metrics.inc("frames_dropped_total", stage="capture")
+                continue
+            if raw.shape[:2] != (h, w):
+                raw = cv2.resize(raw, (w, h))
+            cv2.flip(raw, 1, dst=self.ring.frames[slot])  # Mirror view, straight into shared memory
+
+            frame_id += 1
+            self.stats["capture"].record(time.perf_counter() - start)
+            with self._cond:
+                self._queue("face", "_face_pending", (slot, frame_id, timestamp))
+
+        with self._cond:
+            self._capture_done = True
+            self._cond.notify_all()
+
+    def _take(self, attr, done=lambda: False):
+        """Waits for the frame queued in `attr`; None when stopping or `done()`."""
+        with self._cond:
+            while not self._stop_event.is_set():
+                item = getattr(self, attr)
+                if item is not None:
+                    setattr(self, attr, None)
+                    return item
+                if done():
+                    return None
+                self._cond.wait(0.5)
+        return None
+
+    def _face_loop(self):
+        worker = self.face_worker
+        while not self._stop_event.is_set():
+            with self._cond:
+                if self._capture_done and self._face_pending is None:
+                    break
+            if not worker.started and not worker.wait_ready(self._stop_event):
+                if worker.failed:
+                    break  # No faces without the worker: end the run
+                continue
+            item = self._take("_face_pending", lambda: self._capture_done)
+            if item is None:
+                break
+            slot, frame_id, timestamp = item
+
+            start = time.perf_counter()
+            reply = worker.call((slot, timestamp))
+            if reply is None:
+                self.ring.release(slot)
+                worker.restart(self._stop_event)
+                continue
+            face, is_drowsy, ear, is_distracted, pose, events, roi, faces, elapsed = reply
+            self.stats["face"].record(time.perf_counter() - start)
+            metrics.observe("face_worker", elapsed)
+
+            frame = read_only(self.ring.frames[slot])
+            packet = FramePacket(frame_id, timestamp, frame)
+            packet.slot = slot
+            packet.face = face
+            packet.is_drowsy, packet.ear_score = is_drowsy, ear
+            packet.is_distracted, packet.pose_data = is_distracted, pose
+            packet.events = events
+            packet.faces = faces
+            self._schedule(packet, roi)
+
+            with self._cond:
+                if len(self._render) >= config.RENDER_BUFFER_SIZE:
+                    self.ring.release(self._render.popleft().slot)
+                    self._counts["render"]["dropped"] += 1
+                self._render.append(packet)
+                self._counts["render"]["put"] += 1
+                self._counts["render"]["max_depth"] = max(self._counts["render"]["max_depth"], len(self._render))
+                self._cond.notify_all()
+
+        with self._cond:
+            self._face_done = True
+            self._cond.notify_all()
+
+    def _schedule(self, packet, roi):
+        """Sends the frame to the object worker if the DetectionScheduler picks it."""
+        detections = self._latest.get()
+        self.scheduler.record_result(detections.objects if detections else None)
+        with self._cond:
+            busy = self._object_busy or self._object_pending is not None
+        if self.object_worker.ready and self.scheduler.should_run(packet.frame, packet.timestamp, busy=busy):
+            self.ring.retain(packet.slot)
+            with self._cond:
+                self._queue("object", "_object_pending", (packet.slot, packet.frame_id, packet.timestamp, roi))
+
+    def _object_loop(self):
+        worker = self.object_worker
+        while not self._stop_event.is_set():
+            if not worker.started and not worker.wait_ready(self._stop_event):
+                if worker.failed:
+                    break  # Runs on without object detection
+                continue
+            item = self._take("_object_pending")
+            if item is None:
+                break
+            slot, frame_id, timestamp, roi = item
+
+            with self._cond:
+                self._object_busy = True
+            start = time.perf_counter()
+            reply = worker.call((slot, roi))
+            self.ring.release(slot)
+            if reply is None:
+                with self._cond:
+                    self._object_busy = False
+                worker.restart(self._stop_event)
+                continue
+            objects, elapsed = reply
+            self.stats["object"].record(time.perf_counter() - start)
+            self.scheduler.record_inference(elapsed)
+            metrics.observe("yolo_worker", elapsed)
+            self._latest.publish(DetectionResult(objects, frame_id, timestamp))
+            with self._cond:
+                self._object_busy = False
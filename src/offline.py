@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+import src.config as config
+
+from src.detectors.drowsiness import DrowsinessDetector
+from src.detectors.distraction import DistractionDetector
+from src.detectors.face_tracker import FaceTracker
+from src.utils.sources import ReadAhead, VideoFileSource
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm")
+
+# One row per decoded frame
+METRICS_DTYPE = np.dtype([
+    ("frame", np.int32),
+    ("time", np.float64),       # Seconds since the start of the video
+    ("face", np.bool_),
+    ("ear", np.float32),
+    ("pitch", np.float32),
+    ("yaw", np.float32),
+    ("roll", np.float32),
+    ("drowsy", np.bool_),
+    ("distracted", np.bool_),
+    ("detected", np.bool_),     # YOLO ran on this frame
+])
+
+# One row per YOLO box
+DETECTIONS_DTYPE = np.dtype([
+    ("frame", np.int32),
+    ("class_id", np.int16),
+    ("conf", np.float32),
+    ("box", np.int32, (4,)),
+])
+
+# ==========================================
+# INPUT
+# ==========================================
+def list_videos(paths):
+    """Expands files and directories into a sorted list of video files."""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    videos.append(os.path.join(path, name))
+        else:
+            videos.append(path)
+    # A video listed twice (directly and via its folder) is analyzed once
+    unique = {}
+    for path in videos:
+        unique.setdefault(os.path.abspath(path), path)
+    return list(unique.values())
+
+def video_info(path):
+    """Returns (frame_count, fps) for a video file."""
+    cap = cv2.VideoCapture(path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or config.FPS
+    cap.release()
+    return frame_count, fps
+
+class VideoReader:
+    """
+    Decodes a frame range in a background thread, OFFLINE_READ_AHEAD frames
+    ahead of the consumer. A file source never drops frames: offline
+    analysis must see every frame, so the decoder waits instead. Frames are
+    not recycled, since YOLO batches keep several of them.
+    """
+    def __init__(self, path, start=0, end=None, mirror=False):
+        self.path = path
+        self.start = start
+        self.mirror = mirror
+        source = VideoFileSource(path, start, end)
+        if not source.open():
+            raise IOError(f"Cannot open {path}")
+        self.fps = source.fps
+        self._reader = ReadAhead(source, config.OFFLINE_READ_AHEAD, reuse=False)
+
+    def __iter__(self):
+        self._reader.start()
+        index = self.start
+        while True:
+            ret, frame, _ = self._reader.read(timeout=1.0)
+            if not ret:
+                if self._reader.finished:
+                    break
+                continue
+            yield index, cv2.flip(frame, 1) if self.mirror else frame
+            index += 1
+        self._reader.release()
+
+    def close(self):
+        self._reader.release()
+
+# ==========================================
+# ANALYSIS (runs in worker processes)
+# ==========================================
+_models = {}
+
+def _load_models():
+    """FaceMesh and YOLO are loaded once per process and reused across jobs."""
+    if not _models:
+        from src.detectors.face_mesh import FaceMeshDetector
+        from src.detectors.object_det import ObjectDetector
+        _models["face_mesh"] = FaceMeshDetector()
+        _models["object_det"] = ObjectDetector()
+    return _models["face_mesh"], _models["object_det"]
+
+def analyze_range(path, start, end, detect_every, batch_size, mirror):
+    """
+    Runs the full pipeline over frames [start, end) of one video.
+    YOLO runs on every `detect_every`-th frame, `batch_size` frames per call.
+    Returns (metrics, detections) structured arrays.
+
+    Every job starts from a clean state, whichever jobs the process ran
+    before: the face mesh tracking is reset and the detectors are new.
+    So a chunk boundary (--chunk-seconds) acts like the face being lost:
+    behaviors in progress end, and must last their minimum duration again
+    before they show in the next chunk.
+    """
+    face_mesh, object_det = _load_models()
+    # Tracking state must not carry over from another video / chunk
+    face_mesh.reset()
+    if config.FACE_TRACKING:
+        face_mesh = FaceTracker(face_mesh)
+    drowsy_det = DrowsinessDetector()
+    distract_det = DistractionDetector()
+
+    reader = VideoReader(path, start, end, mirror)
+    rows = []
+    detections = []
+    pending_frames, pending_ids = [], []
+
+    def flush():
+        if not pending_frames:
+            return
+        batch = object_det.detect_batch(pending_frames)
+        for i, frame_idx in enumerate(pending_ids):
+            boxes, class_ids, confs = batch.frame(i)
+            for box, cls_id, conf in zip(boxes, class_ids, confs):
+                detections.append((frame_idx, cls_id, conf, box))
+        pending_frames.clear()
+        pending_ids.clear()
+
+    for index, frame in reader:
+        h, w, _ = frame.shape
+        points = face_mesh.get_points(frame)
+
+        # Video time, so the time-based decisions match real playback speed
+        t = index / reader.fps
+        is_drowsy, ear = drowsy_det.analyze(points, w, h, t)
+        is_distracted, (pitch, yaw, roll) = distract_det.analyze(points, w, h, t)
+
+        run_yolo = (index - start) % detect_every == 0
+        if run_yolo:
+            pending_frames.append(frame)
+            pending_ids.append(index)
+            if len(pending_frames) >= batch_size:
+                flush()
+
+        rows.append((index, t, points is not None, ear, pitch, yaw, roll,
+                     is_drowsy, is_distracted, run_yolo))
+    flush()
+
+    return np.array(rows, dtype=METRICS_DTYPE), np.array(detections, dtype=DETECTIONS_DTYPE)
+
+# ==========================================
+# EVENTS
+# ==========================================
+def find_runs(mask):
+    """Returns [(start, end), ...] index ranges (end exclusive) where mask is True."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return list(zip(edges[::2], edges[1::2]))
+
+def coalesce_events(metrics, detections, max_gap):
+    """
+    Turns per-frame flags into events: drowsy / distracted runs, and one
+    event per object class present on consecutive YOLO frames. Runs less
+    than `max_gap` seconds apart are merged.
+    """
+    if len(metrics) == 0:
+        return []
+
+    times = metrics["time"]
+    series = {
+        "drowsy": metrics["drowsy"],
+        "distracted": metrics["distracted"],
+    }
+
+    # Object presence is held from one YOLO frame to the next, like the live loop
+    last_sample = np.maximum.accumulate(
+        np.where(metrics["detected"], np.arange(len(metrics)), -1)
+    )
+    valid = last_sample >= 0
+    for cls_id, label in config.CLASS_NAMES.items():
+        seen = np.zeros(len(metrics), dtype=bool)
+        cls_frames = detections["frame"][detections["class_id"] == cls_id]
+        seen[np.searchsorted(metrics["frame"], cls_frames)] = True
+        present = np.zeros(len(metrics), dtype=bool)
+        present[valid] = seen[last_sample[valid]]
+        series[label] = present
+
+    events = []
+    for kind, mask in series.items():
+        merged = []
+        for start, end in find_runs(mask):
+            if merged and times[start] - times[merged[-1][1] - 1] <= max_gap:
+                merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+
+        for start, end in merged:
+            events.append({
+                "type": kind,
+                "start": round(float(times[start]), 3),
+                "end": round(float(times[end - 1]), 3),
+                "start_frame": int(metrics["frame"][start]),
+                "end_frame": int(metrics["frame"][end - 1]),
+            })
+
+    events.sort(key=lambda e: (e["start"], e["type"]))
+    return events
+
+def output_names(videos):
+    """
+    Output file stem per video: its file name, prefixed with its folder when
+    another video has the same name (cam1/clip.mp4 and cam2/clip.mp4 ->
+    cam1_clip, cam2_clip). Returns None if that still leaves a clash.
+    """
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in videos]
+    names = [stem if stems.count(stem) == 1
+             else f"{os.path.basename(os.path.dirname(os.path.abspath(path)))}_{stem}"
+             for path, stem in zip(videos, stems)]
+    return names if len(set(names)) == len(names) else None
+
+def write_results(out_dir, name, video_path, metrics, detections, events):
+    metrics_path = os.path.join(out_dir, f"{name}.metrics.npz")
+    np.savez_compressed(metrics_path, metrics=metrics, detections=detections)
+    with open(os.path.join(out_dir, f"{name}.events.json"), "w") as f:
+        json.dump({"video": video_path, "events": events}, f, indent=2)
+    return metrics_path
+
+# ==========================================
+# ENTRY POINT
+# ==========================================
+def plan_jobs(videos, chunk_seconds):
+    """Splits each video into (path, start, end) frame ranges."""
+    jobs = []
+    for path in videos:
+        frame_count, fps = video_info(path)
+        if not chunk_seconds or frame_count <= 0:
+            jobs.append((path, 0, None))
+            continue
+        chunk = max(int(chunk_seconds * fps), 1)
+        for start in range(0, frame_count, chunk):
+            jobs.append((path, start, min(start + chunk, frame_count)))
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded videos without display or audio")
+    parser.add_argument("inputs", nargs="+", help="Video files or directories")
+    parser.add_argument("--out", default="output", help="Directory for metrics and event files")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (1 = in-process)")
+    parser.add_argument("--chunk-seconds", type=float, default=0,
+                        help="Split videos into chunks of this length across workers (0 = by file). "
+                             "Each chunk starts from a clean state, like the face being lost")
+    parser.add_argument("--detect-every", type=int, default=config.DETECTION_INTERVAL,
+                        help="Run YOLO on every N-th frame")
+    parser.add_argument("--batch", type=int, default=config.OFFLINE_BATCH_SIZE,
+                        help="Frames per YOLO call")
+    parser.add_argument("--mirror", action="store_true", help="Flip frames like the live view")
+    args = parser.parse_args()
+
+    videos = list_videos(args.inputs)
+    if not videos:
+        print("❌ No videos found.")
+        return
+    names = output_names(videos)
+    if names is None:
+        print("❌ Some videos would overwrite each other's results (same folder and file name); "
+              "process them in separate runs.")
+        return
+    os.makedirs(args.out, exist_ok=True)
+
+    jobs = plan_jobs(videos, args.chunk_seconds)
+    print(f"🎞️  {len(videos)} videos, {len(jobs)} jobs, {args.workers} workers")
+    job_args = [(path, start, end, args.detect_every, args.batch, args.mirror) for path, start, end in jobs]
+
+    started = time.time()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(analyze_range, *zip(*job_args)))
+    else:
+        results = [analyze_range(*a) for a in job_args]
+
+    # Chunks come back in job order, so concatenating restores each video
+    total_frames = 0
+    for path, name in zip(videos, names):
+        parts = [r for (p, _, _), r in zip(jobs, results) if p == path]
+        metrics = np.concatenate([m for m, _ in parts])
+        detections = np.concatenate([d for _, d in parts])
+        events = coalesce_events(metrics, detections, config.OFFLINE_EVENT_GAP)
+        out_path = write_results(args.out, name, path, metrics, detections, events)
+        total_frames += len(metrics)
+        print(f"✅ {path}: {len(metrics)} frames, {len(events)} events -> {out_path}")
+
+    elapsed = time.time() - started
+    print(f"⏱️  {total_frames} frames in {elapsed:.1f}s ({total_frames / max(elapsed, 1e-6):.1f} fps)")
+
+if __name__ == "__main__":
+    main()
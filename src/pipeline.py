@@ -0,0 +1,252 @@
+import threading
+import time
+import src.config as config
+from src.detectors.faces import MultiFaceAnalyzer
+from src.utils.buffers import FrameRing
+from src.utils.metrics import metrics
+from src.utils.preprocess import Preprocessor
+from src.utils.roi import face_roi
+from src.utils.scheduler import DetectionScheduler
+from src.utils.stats import StageStats
+
+
+class FramePacket:
+    """A captured frame plus everything the fast path computed for it."""
+
+    def __init__(self, frame_id, timestamp, frame, rgb=None, model_input=None, model_scale=1.0, hold=None):
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.frame = frame
+
+        # Optional views from the Preprocessor (read-only, shared with YOLO),
+        # and the PreparedFrame reference that keeps them from being reused
+        self.rgb = rgb
+        self.model_input = model_input
+        self.model_scale = model_scale
+        self.hold = hold
+
+        # Filled in by the face stage
+        self.face = False  # The face mesh found a face (multi-face mode: any)
+        self.is_drowsy = False
+        self.ear_score = 0.0
+        self.is_distracted = False
+        self.pose_data = (0, 0, 0)
+        self.events = []  # Behavior start / stop Events (src/utils/temporal.py)
+        self.faces = None  # FaceResults of every face (multi-face mode)
+
+    def release(self):
+        """Gives the Preprocessor buffers back; the views must not be used afterwards."""
+        if self.hold is not None:
+            self.hold.release()
+            self.hold = None
+
+
+class BehaviorPipeline:
+    """
+    Threaded version of the monitoring loop:
+
+        capture -> [capture ring] -> face analysis -> [render ring] -> render (caller)
+                                           |
+                                           +-> ObjectDetector.submit() -> YOLO worker -> latest()
+
+    Capture and face analysis each run in their own thread, YOLO runs in the
+    ObjectDetector's worker thread. Rendering stays on the caller's thread
+    because cv2.imshow must run there. The fast path never waits on YOLO:
+    it submits the frames picked by the DetectionScheduler and the render
+    stage reads the newest result that is not older than config.DETECTION_MAX_AGE.
+
+    Frames are mirrored and color-converted once by the Preprocessor into
+    pooled buffers; every stage reads the same read-only views, and only the
+    renderer gets a writable copy (read() -> packet.frame). Each packet and
+    each frame submitted to YOLO holds a reference on its buffers, released
+    when the packet is dropped or read, or once inference is done.
+    """
+
+    STAGES = ("capture", "face", "render")
+
+    def __init__(self, source, face_mesh, drowsy_det, distract_det, object_det):
+        self.source = source  # Started ReadAhead (src/utils/sources.py)
+        self.face_mesh = face_mesh
+        self.drowsy_det = drowsy_det
+        self.distract_det = distract_det
+        self.object_det = object_det
+        # Every face in one batched pass when more than one is monitored
+        self.multi_face = (MultiFaceAnalyzer(face_mesh, drowsy_det, distract_det)
+                           if config.MAX_NUM_FACES > 1 else None)
+
+        policy = config.PIPELINE_QUEUE_POLICY
+        self.capture_ring = FrameRing(config.CAPTURE_BUFFER_SIZE, policy, on_drop=FramePacket.release)
+        self.render_ring = FrameRing(config.RENDER_BUFFER_SIZE, policy, on_drop=FramePacket.release)
+        self._reading = None  # Packet returned by the last read()
+
+        self.preprocessor = Preprocessor()
+        self.stats = {name: StageStats(name) for name in self.STAGES}
+        self.scheduler = DetectionScheduler()
+        self._seen_inferences = 0
+
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    # ------------------------------------------
+    # Lifecycle
+    # ------------------------------------------
+    def start(self):
+        workers = (
+            ("capture", self._capture_loop),
+            ("face", self._face_loop),
+        )
+        for name, target in workers:
+            t = threading.Thread(target=target, name=f"pipeline-{name}")
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop_event.set()
+        for ring in (self.capture_ring, self.render_ring):
+            ring.close()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self._threads = []
+        self.object_det.stop()
+        if self._reading is not None:
+            self._reading.release()
+            self._reading = None
+
+    @property
+    def finished(self):
+        """True once the render ring is closed and fully drained."""
+        return self.render_ring.closed and self.render_ring.depth == 0
+
+    # ------------------------------------------
+    # Render stage API (called from the main thread)
+    # ------------------------------------------
+    def read(self, timeout=None, canvas=True):
+        """
+        Returns the next analyzed FramePacket, or None. Its `frame` is a
+        writable canvas (reused by the next read) that the HUD can draw on,
+        or the read-only captured frame with `canvas=False` (headless).
+        Either way it is valid until the next read().
+        """
+        if self._reading is not None:
+            self._reading.release()
+            self._reading = None
+        packet = self.render_ring.get(timeout)
+        if packet is not None:
+            if canvas:
+                packet.frame = self.preprocessor.canvas(packet.frame)
+                packet.release()
+            else:
+                self._reading = packet
+        return packet
+
+    def latest_detections(self):
+        """Newest non-expired DetectionResult, or None."""
+        return self.object_det.latest()
+
+    def record_render(self, elapsed):
+        self.stats["render"].record(elapsed)
+
+    def report(self):
+        """Per-stage latency counters merged with the queue depth of each stage's input."""
+        inputs = {
+            "face": self.capture_ring.snapshot(),
+            "object": self.object_det.queue_stats(),
+            "render": self.render_ring.snapshot(),
+        }
+        stages = dict(self.stats)
+        stages["object"] = self.object_det.stats
+
+        report = {}
+        for name in ("capture", "face", "object", "render"):
+            entry = stages[name].snapshot()
+            if name in inputs:
+                entry.update(inputs[name])
+            report[name] = entry
+        return report
+
+    # ------------------------------------------
+    # Worker stages
+    # ------------------------------------------
+    def _capture_loop(self):
+        frame_id = 0
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            with metrics.span("capture"):
+                # Newest frame from the read-ahead thread, timestamped when it was grabbed
+                ret, raw, timestamp = self.source.read(timeout=0.5)
+            if not ret:
+                if self.source.finished:
+                    print(f"ℹ️  End of {self.source.name}")
+                    break
+                continue
+
+            prepared = self.preprocessor.process(raw)
+            frame_id += 1
+            self.stats["capture"].record(time.perf_counter() - start)
+            packet = FramePacket(frame_id, timestamp, prepared.frame, prepared.rgb,
+                                 prepared.model_input, prepared.model_scale, prepared)
+            if not self.capture_ring.put(packet):
+                packet.release()
+
+        self.capture_ring.close()
+
+    def _face_loop(self):
+        while True:
+            packet = self.capture_ring.get(timeout=0.5)
+            if packet is None:
+                if self.capture_ring.closed:
+                    break
+                continue
+
+            start = time.perf_counter()
+            metrics.gauge("queue_depth", self.capture_ring.depth, queue="capture")
+            h, w, _ = packet.frame.shape
+            ts = packet.timestamp
+            if self.multi_face is not None:
+                faces = packet.faces = self.multi_face.analyze(packet.frame, packet.rgb, ts)
+                packet.face = len(faces) > 0
+                packet.is_drowsy, packet.ear_score, packet.is_distracted, packet.pose_data = faces.summary()
+                packet.events = list(self.multi_face.events)
+            else:
+                points = self.face_mesh.get_points(packet.frame, packet.rgb)
+                packet.face = points is not None
+
+                # Lost faces are analyzed too, so running behaviors end with a stop event
+                packet.is_drowsy, packet.ear_score = self.drowsy_det.analyze(points, w, h, ts)
+                packet.is_distracted, packet.pose_data = self.distract_det.analyze(points, w, h, ts)
+                packet.events = self.drowsy_det.events + self.distract_det.events
+
+            # Feed the scheduler with what YOLO last saw and how long it took
+            detections = self.object_det.latest()
+            self.scheduler.record_result(detections.objects if detections else None)
+            yolo_stats = self.object_det.stats.snapshot()
+            if yolo_stats["count"] != self._seen_inferences:
+                self._seen_inferences = yolo_stats["count"]
+                self.scheduler.record_inference(yolo_stats["last_ms"] / 1000)
+
+            # Object detection switches on once the model has loaded and warmed up
+            if self.object_det.ready and self.scheduler.should_run(packet.frame, packet.timestamp,
+                                                                   busy=self.object_det.busy):
+                # Search around the face/upper body only; full frame if no face was found
+                roi = None
+                if config.ROI_DETECTION:
+                    roi = packet.faces.roi(w, h) if packet.faces is not None else face_roi(points, w, h)
+                # Crops come from the full-resolution view, whole frames from the
+                # downscaled one. Both are read-only and shared, not copied: the
+                # detector holds its own reference until inference is done.
+                hold = packet.hold.retain() if packet.hold is not None else None
+                if roi is None and packet.model_input is not None:
+                    self.object_det.submit(packet.model_input, packet.frame_id, packet.timestamp,
+                                           scale=packet.model_scale, hold=hold)
+                else:
+                    self.object_det.submit(packet.frame, packet.frame_id, packet.timestamp, roi, hold=hold)
+
+            elapsed = time.perf_counter() - start
+            self.stats["face"].record(elapsed)
+            self.scheduler.record_fast_path(elapsed)
+            if not self.render_ring.put(packet):
+                packet.release()
+            metrics.gauge("queue_depth", self.render_ring.depth, queue="render")
+
+        self.render_ring.close()
@@ -0,0 +1,92 @@
+import argparse
+import os
+import time
+
+from src.utils.recorder import (SCHEMA_FILE, SessionReader, closed_eye_minutes, event_counts,
+                                flag_minutes)
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_duration(text):
+    """'3600', '15m', '8h' or '1d' -> seconds."""
+    if text[-1] in UNITS:
+        return float(text[:-1]) * UNITS[text[-1]]
+    return float(text)
+
+def parse_time(text):
+    """Epoch seconds or local 'YYYY-mm-dd HH:MM' -> epoch seconds."""
+    if text is None:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return time.mktime(time.strptime(text, "%Y-%m-%d %H:%M"))
+
+def bucket_origin(started, shift_start):
+    """Local midnight of the session's first day plus `shift_start` hours."""
+    day = time.localtime(started)
+    return time.mktime((day.tm_year, day.tm_mon, day.tm_mday, int(shift_start), 0, 0, 0, 0, -1))
+
+def find_sessions(paths):
+    """Session directories among `paths` and their direct subdirectories."""
+    sessions = []
+    for path in paths:
+        if os.path.exists(os.path.join(path, SCHEMA_FILE)):
+            sessions.append(path)
+        elif os.path.isdir(path):
+            sessions.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                            if os.path.exists(os.path.join(path, name, SCHEMA_FILE)))
+    return sessions
+
+def summarize(reader, every, start=None, end=None, origin=0.0):
+    """Per-bucket totals as {bucket_start: {column: value}}."""
+    series = {
+        "frames": reader.aggregate("frames", every, None, None, start, end, origin),
+        "closed_min": closed_eye_minutes(reader, every, start, end, origin),
+        "drowsy_min": flag_minutes(reader, "drowsy", every, start, end, origin),
+        "distracted_min": flag_minutes(reader, "distracted", every, start, end, origin),
+        "phone_events": event_counts(reader, "phone", every, start, end, origin),
+        "alerts": reader.aggregate("alerts", every, None, None, start, end, origin),
+    }
+    rows = {}
+    for column, (buckets, values) in series.items():
+        for bucket, value in zip(buckets.tolist(), values.tolist()):
+            rows.setdefault(bucket, dict.fromkeys(series, 0.0))[column] = value
+    return dict(sorted(rows.items()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize recorded sessions per hour, shift or day")
+    parser.add_argument("sessions", nargs="+", help="Session directories (or RECORD_DIR)")
+    parser.add_argument("--every", default="1h", help="Bucket size: seconds or 15m / 1h / 8h / 1d")
+    parser.add_argument("--shift-start", type=float, default=0,
+                        help="Local hour the buckets are aligned to (e.g. 6 for 06-14-22 shifts with --every 8h)")
+    parser.add_argument("--from", dest="start", help="Start time (epoch or 'YYYY-mm-dd HH:MM')")
+    parser.add_argument("--to", dest="end", help="End time (epoch or 'YYYY-mm-dd HH:MM')")
+    args = parser.parse_args()
+
+    sessions = find_sessions(args.sessions)
+    if not sessions:
+        print("❌ No sessions found.")
+        return
+    every = parse_duration(args.every)
+    start, end = parse_time(args.start), parse_time(args.end)
+
+    for path in sessions:
+        reader = SessionReader(path)
+        rows = summarize(reader, every, start, end, bucket_origin(reader.started, args.shift_start))
+        print(f"📼 {reader.name} ({path})")
+        if not rows:
+            print("   no frames in range")
+            continue
+        print(f"   {'from':<16} {'frames':>8} {'closed':>8} {'drowsy':>8} {'distract':>8} {'phone':>6} {'alerts':>6}")
+        for bucket, row in rows.items():
+            print(f"   {time.strftime('%Y-%m-%d %H:%M', time.localtime(bucket)):<16} "
+                  f"{int(row['frames']):>8} {row['closed_min']:>7.1f}m {row['drowsy_min']:>7.1f}m "
+                  f"{row['distracted_min']:>7.1f}m {int(row['phone_events']):>6} {int(row['alerts']):>6}")
+        totals = {column: sum(row[column] for row in rows.values()) for column in next(iter(rows.values()))}
+        print(f"   {'total':<16} {int(totals['frames']):>8} {totals['closed_min']:>7.1f}m "
+              f"{totals['drowsy_min']:>7.1f}m {totals['distracted_min']:>7.1f}m "
+              f"{int(totals['phone_events']):>6} {int(totals['alerts']):>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+import argparse
+import csv
+import os
+from abc import ABC, abstractmethod
+import numpy as np
+import src.config as config
+from src.sessions import find_sessions
+from src.utils.recorder import SCHEMA_FILE, SessionReader
+
+# ==========================================
+# TRACES
+# ==========================================
+class Trace:
+    """
+    Per-frame series of one recording: time (seconds from its first frame),
+    face present, EAR, smoothed pitch / yaw and, per object label, the best
+    confidence in the YOLO result in use (0 when the label is absent).
+    """
+    def __init__(self, name, time, face, ear, pitch, yaw, conf):
+        self.name = name
+        self.time = np.asarray(time, dtype=np.float64) - (time[0] if len(time) else 0.0)
+        self.face = np.asarray(face, dtype=bool)
+        self.ear = np.asarray(ear)
+        self.pitch = np.asarray(pitch)
+        self.yaw = np.asarray(yaw)
+        self.conf = conf
+
+    @property
+    def duration(self):
+        return float(self.time[-1]) if len(self.time) else 0.0
+
+def result_confidences(result, rows, detections, results):
+    """
+    Per object label, the best confidence of the YOLO result each frame
+    uses. `result` is that result's index per frame (-1 = none), `rows` the
+    result index of each detection and `results` the number of results.
+    """
+    conf = {}
+    for cls_id, label in config.CLASS_NAMES.items():
+        # One spare slot, read through index -1 by frames without a result
+        best = np.zeros(results + 1, dtype=np.float32)
+        mask = detections["class_id"] == cls_id
+        np.maximum.at(best, rows[mask], detections["conf"][mask])
+        conf[label] = best[result]
+    return conf
+
+def load_metrics(path):
+    """Trace of an offline .metrics.npz (python -m src.offline)."""
+    with np.load(path) as data:
+        metrics, detections = data["metrics"], data["detections"]
+
+    # Results are held from one YOLO frame to the next, like the live loop
+    result = np.maximum.accumulate(np.where(metrics["detected"], np.arange(len(metrics)), -1))
+    rows = np.searchsorted(metrics["frame"], detections["frame"])
+    conf = result_confidences(result, rows, detections, len(metrics))
+    name = os.path.basename(path)[:-len(".metrics.npz")]
+    return Trace(name, metrics["time"], metrics["face"], metrics["ear"], metrics["pitch"], metrics["yaw"], conf)
+
+def load_session(path):
+    """Trace of a recorded session (RECORD_SESSIONS)."""
+    reader = SessionReader(path)
+    frames = reader.query("frames")
+    if "detection" in frames.dtype.names:
+        detections = reader.query("detections", columns=["frame", "class_id", "conf"])
+        results, rows = np.unique(detections["frame"], return_inverse=True)
+        pos = np.minimum(np.searchsorted(results, frames["detection"]), max(len(results) - 1, 0))
+        found = (frames["detection"] >= 0) & (results[pos] == frames["detection"]) if len(results) else False
+        conf = result_confidences(np.where(found, pos, -1), rows, detections, len(results))
+    else:
+        # Recorded before the frames table named its YOLO result
+        conf = {label: np.zeros(len(frames), dtype=np.float32) for label in config.CLASS_NAMES.values()}
+    return Trace(os.path.basename(os.path.normpath(path)), frames["time"], frames["faces"] > 0, frames["ear"],
+                 frames["pitch"], frames["yaw"], conf)
+
+def find_traces(paths):
+    """Traces of .metrics.npz files and session directories among `paths` (directories are searched one level deep)."""
+    traces = []
+    for path in paths:
+        if path.endswith(".metrics.npz"):
+            traces.append(load_metrics(path))
+        elif os.path.exists(os.path.join(path, SCHEMA_FILE)):
+            traces.append(load_session(path))
+        elif os.path.isdir(path):
+            traces.extend(load_metrics(os.path.join(path, name)) for name in sorted(os.listdir(path))
+                          if name.endswith(".metrics.npz"))
+            traces.extend(load_session(session) for session in find_sessions([path]))
+    return traces
+
+def load_labels(path):
+    """
+    Labeled intervals from a CSV with columns trace,type,start,end: the
+    video or session name, the behavior (drowsy, distracted or an object
+    label) and seconds from the trace's first frame. Traces are named after
+    the video (clip.metrics.npz -> clip) or the session directory.
+    Returns {(trace, type): [(start, end), ...]}.
+    """
+    labels = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            key = (row["trace"].strip(), row["type"].strip())
+            labels.setdefault(key, []).append((float(row["start"]), float(row["end"])))
+    return {key: sorted(intervals) for key, intervals in labels.items()}
+
+# ==========================================
+# REPLAY
+# ==========================================
+# The decision logic of src/utils/temporal.py over whole (combinations, frames)
+# arrays: each state is a function of the latest event before each frame, so
+# a forward fill of event indices replaces the frame-by-frame loop.
+
+def latch(on, off):
+    """
+    State per row that turns on where `on`, off where `off` and otherwise
+    holds, as Hysteresis does (off wins where both are set).
+    """
+    last = np.maximum.accumulate(np.where(on | off, np.arange(on.shape[1]), -1), axis=1)
+    return np.take_along_axis(on & ~off, np.maximum(last, 0), axis=1) & (last >= 0)
+
+def held_seconds(raw, times):
+    """Seconds the current run of True has lasted, per row and frame (-1 where False), as Track measures it."""
+    starts = raw.copy()
+    starts[:, 1:] &= ~raw[:, :-1]
+    first = np.maximum.accumulate(np.where(starts, np.arange(raw.shape[1]), 0), axis=1)
+    return np.where(raw, times - times[first], -1.0)
+
+class Sweep(ABC):
+    """
+    One behavior's grid: every row of `grid` (the parameters of the raw
+    signal) with every minimum duration in `durations` (config units,
+    `per_second` of them per second).
+    """
+    columns = ()
+
+    def __init__(self, name, grid, durations, per_second=1.0):
+        self.name = name
+        self.grid = np.atleast_2d(np.asarray(grid, dtype=np.float64))
+        self.durations = np.asarray(durations, dtype=np.float64)
+        self.seconds = self.durations / per_second
+
+    def __len__(self):
+        return len(self.grid) * len(self.durations)
+
+    @property
+    def params(self):
+        """(combinations, columns) table, in the order replay() returns its rows."""
+        return np.column_stack([np.repeat(self.grid, len(self.durations), axis=0),
+                                np.tile(self.durations, len(self.grid))])
+
+    @abstractmethod
+    def raw(self, trace, grid):
+        """(len(grid), frames) raw signal."""
+
+    def replay(self, trace, grid):
+        """(len(grid) * durations, frames) behavior states: raw held for the minimum duration (Track, min_off=0)."""
+        held = held_seconds(self.raw(trace, grid), trace.time)
+        return (held[:, None, :] >= self.seconds[None, :, None]).reshape(-1, len(trace.time))
+
+class DrowsySweep(Sweep):
+    columns = ("EAR_THRESHOLD", "EAR_CONSEC_FRAMES")
+
+    def raw(self, trace, grid):
+        on = grid[:, :1]
+        off = on + (config.EAR_OPEN_THRESHOLD - config.EAR_THRESHOLD)
+        ear, face = trace.ear[None], trace.face[None]
+        return latch(face & (ear < on), ~face | (ear > off))
+
+class DistractionSweep(Sweep):
+    columns = ("PITCH_THRESHOLD", "YAW_THRESHOLD", "DISTRACTION_FRAMES")
+
+    def raw(self, trace, grid):
+        turn = np.maximum(np.abs(trace.pitch)[None] / grid[:, :1], np.abs(trace.yaw)[None] / grid[:, 1:2])
+        face = trace.face[None]
+        return latch(face & (turn > 1.0), ~face | (turn < config.DISTRACTION_RELEASE))
+
+class ObjectSweep(Sweep):
+    columns = ("CONFIDENCE_THRESHOLD", "OBJECT_MIN_SECONDS")
+
+    def raw(self, trace, grid):
+        return trace.conf[self.name][None] >= grid[:, :1]
+
+    def replay(self, trace, grid):
+        # PresenceTracks: on after OBJECT_MIN_SECONDS, off after OBJECT_RELEASE_SECONDS absent
+        present = self.raw(trace, grid)
+        seen = held_seconds(present, trace.time)
+        gone = held_seconds(~present, trace.time) >= config.OBJECT_RELEASE_SECONDS
+        on = (seen[:, None, :] >= self.seconds[None, :, None]).reshape(-1, len(trace.time))
+        return latch(on, np.repeat(gone, len(self.durations), axis=0))
+
+# ==========================================
+# SCORING
+# ==========================================
+def score(active, times, intervals, tolerance):
+    """
+    Scores (combinations, frames) behavior states against labeled
+    (start, end) intervals. An interval is caught by a state that is on
+    between its start and `tolerance` seconds after its end, an alert is
+    right when it overlaps such a window. Returns (latency, alerts, right):
+    seconds from each interval's start to the first state on (NaN if
+    missed) as a (combinations, intervals) array, then alert counts.
+    """
+    count, frames = active.shape
+    latency = np.full((count, len(intervals)), np.nan)
+    labeled = np.zeros(frames, dtype=bool)
+    for j, (start, end) in enumerate(intervals):
+        i0 = np.searchsorted(times, start)
+        i1 = np.searchsorted(times, end + tolerance, side="right")
+        if i0 >= i1:
+            continue
+        labeled[i0:i1] = True
+        window = active[:, i0:i1]
+        first = window.argmax(axis=1)
+        caught = window[np.arange(count), first]
+        latency[caught, j] = times[i0 + first[caught]] - start
+
+    # Alerts are runs of True: (start, end) pairs in the flattened, padded rows
+    padded = np.zeros((count, frames + 2), dtype=np.int8)
+    padded[:, 1:-1] = active
+    edges = np.diff(padded, axis=1)
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    alerts = np.bincount(starts // (frames + 1), minlength=count)
+
+    hits = np.zeros((count, frames + 1), dtype=bool)
+    hits[:, :-1] = active & labeled
+    if len(starts):
+        good = np.logical_or.reduceat(hits.ravel(), np.column_stack([starts, ends]).ravel())[::2]
+    else:
+        good = np.zeros(0, dtype=bool)
+    right = np.bincount(starts[good] // (frames + 1), minlength=count)
+    return latency, alerts, right
+
+def run_sweep(sweep, traces, labels, tolerance, max_cells=None):
+    """
+    Replays and scores every combination of `sweep` over `traces`, in
+    blocks of about `max_cells` combinations x frames. Returns a dict of
+    per-combination result columns.
+    """
+    max_cells = max_cells or config.TUNE_MAX_CELLS
+    count, per_row = len(sweep), len(sweep.durations)
+    alerts, right = np.zeros(count), np.zeros(count)
+    latencies, hours = [], 0.0
+    for trace in traces:
+        intervals = labels.get((trace.name, sweep.name), [])
+        latency = np.empty((count, len(intervals)))
+        block = max(1, max_cells // max(len(trace.time) * per_row, 1))
+        for r0 in range(0, len(sweep.grid), block):
+            rows = slice(r0 * per_row, min(r0 + block, len(sweep.grid)) * per_row)
+            active = sweep.replay(trace, sweep.grid[r0:r0 + block])
+            latency[rows], block_alerts, block_right = score(active, trace.time, intervals, tolerance)
+            alerts[rows] += block_alerts
+            right[rows] += block_right
+        latencies.append(latency)
+        hours += trace.duration / 3600
+
+    latency = np.hstack(latencies) if latencies else np.empty((count, 0))
+    caught = np.count_nonzero(~np.isnan(latency), axis=1)
+    # Median of the caught intervals' latencies (NaNs sort last)
+    ordered = np.sort(latency, axis=1)
+    lo, hi = np.maximum(caught - 1, 0) // 2, caught // 2
+    pick = np.minimum(np.column_stack([lo, hi]), max(latency.shape[1] - 1, 0))
+    median = ordered[np.arange(count)[:, None], pick].mean(axis=1) if latency.shape[1] else np.full(count, np.nan)
+    median[caught == 0] = np.nan
+
+    recall = caught / latency.shape[1] if latency.shape[1] else np.full(count, np.nan)
+    precision = np.divide(right, alerts, out=np.full(count, np.nan), where=alerts > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall,
+                   out=np.zeros(count), where=(precision + recall) > 0)
+    return {
+        "labels": np.full(count, latency.shape[1]),
+        "caught": caught,
+        "alerts": alerts.astype(int),
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "latency": median,
+        "false_per_hour": (alerts - right) / hours if hours else np.full(count, np.nan),
+    }
+
+# ==========================================
+# ENTRY POINT
+# ==========================================
+def parse_values(text):
+    """'0.2,0.25,0.3' or 'start:stop:step' (stop included) -> sorted values."""
+    if ":" in text:
+        start, stop, step = (float(v) for v in text.split(":"))
+        return np.round(np.arange(start, stop + step / 2, step), 6)
+    return np.array(sorted(float(v) for v in text.split(",")))
+
+def with_config(values, current):
+    """`values` plus the current config value, so the config's own row is always scored."""
+    return np.union1d(parse_values(values), [current])
+
+def grid(*axes):
+    """Cartesian product of value arrays as a (combinations, len(axes)) table."""
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(axes))
+
+def make_sweeps(args, types):
+    sweeps = []
+    if "drowsy" in types:
+        sweeps.append(DrowsySweep("drowsy", with_config(args.ear, config.EAR_THRESHOLD)[:, None],
+                                  with_config(args.ear_frames, config.EAR_CONSEC_FRAMES), config.FPS))
+    if "distracted" in types:
+        sweeps.append(DistractionSweep("distracted",
+                                       grid(with_config(args.pitch, config.PITCH_THRESHOLD),
+                                            with_config(args.yaw, config.YAW_THRESHOLD)),
+                                       with_config(args.distraction_frames, config.DISTRACTION_FRAMES),
+                                       config.FPS))
+    for label in config.CLASS_NAMES.values():
+        if label in types:
+            sweeps.append(ObjectSweep(label, with_config(args.conf, config.CONFIDENCE_THRESHOLD)[:, None],
+                                      with_config(args.object_seconds, config.OBJECT_MIN_SECONDS)))
+    return sweeps
+
+def config_row(sweep):
+    """Index of the combination matching the current config."""
+    current = [getattr(config, column) for column in sweep.columns]
+    return int(np.flatnonzero(np.isclose(sweep.params, current).all(axis=1))[0])
+
+def print_results(sweep, results, top):
+    f1 = results["f1"]
+    latency = np.nan_to_num(results["latency"], nan=np.inf)
+    order = np.lexsort((latency, -f1))
+    current = config_row(sweep)
+    rows = list(order[:top]) + ([current] if current not in order[:top] else [])
+
+    params = sweep.params
+    header = " ".join(f"{column:>20}" for column in sweep.columns)
+    print(f"   {header} {'prec':>6} {'recall':>6} {'f1':>6} {'latency':>8} {'false/h':>8}")
+    for row in rows:
+        values = " ".join(f"{value:>20g}" for value in params[row])
+        print(f"   {values} {results['precision'][row]:>6.2f} {results['recall'][row]:>6.2f} "
+              f"{f1[row]:>6.2f} {results['latency'][row]:>7.2f}s {results['false_per_hour'][row]:>8.1f}"
+              + ("  <- config" if row == current else ""))
+
+def write_results(path, sweeps, all_results):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["behavior", "parameters", *next(iter(all_results)).keys()])
+        for sweep, results in zip(sweeps, all_results):
+            for row, params in enumerate(sweep.params):
+                described = " ".join(f"{column}={value:g}" for column, value in zip(sweep.columns, params))
+                writer.writerow([sweep.name, described, *(column[row] for column in results.values())])
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded traces against labeled intervals "
+                                                 "for many threshold combinations at once")
+    parser.add_argument("inputs", nargs="+", help=".metrics.npz files (src.offline), session directories "
+                                                  "(RECORD_SESSIONS) or directories holding them")
+    parser.add_argument("--labels", required=True, help="CSV with columns trace,type,start,end")
+    parser.add_argument("--ear", default="0.15:0.35:0.01", help="EAR_THRESHOLD values (a,b,c or start:stop:step)")
+    parser.add_argument("--ear-frames", default="3:45:3", help="EAR_CONSEC_FRAMES values")
+    parser.add_argument("--pitch", default="10:45:5", help="PITCH_THRESHOLD values")
+    parser.add_argument("--yaw", default="10:50:5", help="YAW_THRESHOLD values")
+    parser.add_argument("--distraction-frames", default="3:30:3", help="DISTRACTION_FRAMES values")
+    parser.add_argument("--conf", default="0.3:0.9:0.05",
+                        help="CONFIDENCE_THRESHOLD values (only those above the one used when recording mean anything)")
+    parser.add_argument("--object-seconds", default="0:1:0.1", help="OBJECT_MIN_SECONDS values")
+    parser.add_argument("--tolerance", type=float, default=config.TUNE_TOLERANCE,
+                        help="Seconds an alert may come after a labeled interval ends")
+    parser.add_argument("--top", type=int, default=10, help="Best combinations shown per behavior")
+    parser.add_argument("--out", help="CSV file for every combination's results")
+    args = parser.parse_args()
+
+    labels = load_labels(args.labels)
+    annotated = {trace for trace, _ in labels}
+    # Only annotated traces are scored: anything they alert on outside a label is a false alert
+    traces = [trace for trace in find_traces(args.inputs) if trace.name in annotated]
+    if not traces:
+        print("❌ No traces matching the labels found.")
+        return
+    sweeps = make_sweeps(args, {kind for _, kind in labels})
+    if not sweeps:
+        print("❌ No known behavior in the labels (drowsy, distracted, " + ", ".join(config.CLASS_NAMES.values()) + ").")
+        return
+
+    hours = sum(trace.duration for trace in traces) / 3600
+    frames = sum(len(trace.time) for trace in traces)
+    print(f"📼 {len(traces)} traces, {frames} frames, {hours:.2f} h")
+    all_results = []
+    for sweep in sweeps:
+        results = run_sweep(sweep, traces, labels, args.tolerance)
+        all_results.append(results)
+        print(f"📊 {sweep.name}: {len(sweep)} combinations, {results['labels'][0]} labeled intervals")
+        print_results(sweep, results, args.top)
+
+    if args.out:
+        write_results(args.out, sweeps, all_results)
+        print(f"✅ Results saved to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,303 @@
-#/Users/mohsinniaz/BehaviorDetector/src/utils/alerts.py
-import os
+import heapq
+import itertools
+import json
+import socket
 import threading
 import time
+import urllib.request
+from abc import ABC, abstractmethod
+import numpy as np
 import src.config as config
+from src.utils.metrics import metrics
 
-class AudioAlert:
-    def __init__(self):
-        self.last_alert_time = 0
-        self.cooldown = 3.0  # Wait 3 seconds between beeps
 
-    def trigger(self, alert_type="warning"):
+# ==========================================
+# SINKS
+# ==========================================
+class AlertSink(ABC):
+    """
+    Base class: receives every dispatched alert on the dispatcher's worker
+    thread. Sinks that wait on the network set `network = True` and get a
+    worker thread and queue of their own, so they never delay the others.
+    """
+    name = "sink"
+    network = False
+
+    @abstractmethod
+    def emit(self, alert):
+        """Delivers one alert dict (ts, type, reason, source, subject, priority)."""
+
+    def close(self):
+        pass
+
+
+class AudioSink(AlertSink):
+    """
+    Plays a preloaded sound per alert type through pygame's mixer (no
+    subprocess per beep). A more urgent alert cuts off a less urgent sound
+    that is still playing; one of the same or lower urgency is skipped.
+    Falls back to the terminal bell without pygame or an audio device.
+    """
+    name = "audio"
+
+    def __init__(self, sounds=None):
+        self.sounds = {}
+        self._channel = None
+        self._playing = None   # Priority of the sound on self._channel
+        try:
+            import pygame
+            pygame.mixer.init()
+            for alert_type, path in (sounds or config.ALERT_SOUNDS).items():
+                self.sounds[alert_type] = (pygame.mixer.Sound(path) if path
+                                           else self._tone(pygame, alert_type))
+            self.pygame = pygame
+        except Exception as e:  # ImportError or pygame.error (no audio device)
+            print(f"⚠️  Audio alerts fall back to the terminal bell: {e}")
+            self.pygame = None
+
+    @staticmethod
+    def _tone(pygame, alert_type):
+        """Generated beep in the mixer's format: three short high beeps for danger, one for the rest."""
+        rate, size, channels = pygame.mixer.get_init()
+        freq, beeps = (880.0, 3) if alert_type == "danger" else (660.0, 1)
+        t = np.arange(int(rate * 0.12)) / rate
+        beep = np.sin(2 * np.pi * freq * t) * np.minimum(1.0, np.minimum(t, t[::-1]) / 0.01)
+        gap = np.zeros(int(rate * 0.06))
+        wave = np.concatenate([np.concatenate([beep, gap]) for _ in range(beeps)])
+        wave *= 0.5
+        if size == 32:
+            samples = wave.astype(np.float32)
+        elif abs(size) == 16:
+            samples = (wave * 32767).astype(np.int16)
+        else:
+            samples = (wave * 127 + (0 if size < 0 else 128)).astype(np.int8 if size < 0 else np.uint8)
+        samples = np.repeat(samples[:, None], channels, axis=1)
+        return pygame.mixer.Sound(buffer=np.ascontiguousarray(samples).tobytes())
+
+    def emit(self, alert):
+        if self.pygame is None:
+            print('\a', end="", flush=True)
+            return
+        sound = self.sounds.get(alert["type"])
+        if sound is None:
+            return
+        busy = self._channel is not None and self._channel.get_busy()
+        if busy and alert["priority"] >= self._playing:
+            return
+        if busy:
+            self._channel.stop()
+        self._channel = sound.play()
+        self._playing = alert["priority"]
+
+    def close(self):
+        if self.pygame is not None:
+            self.pygame.mixer.quit()
+
+
+class JsonlSink(AlertSink):
+    """Appends one JSON line per alert to ALERT_LOG_PATH."""
+    name = "jsonl"
+
+    def __init__(self, path=None):
+        self.path = path or config.ALERT_LOG_PATH
+        self._file = open(self.path, "a", buffering=1)
+
+    def emit(self, alert):
+        self._file.write(json.dumps(alert) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class SocketSink(AlertSink):
+    """Sends each alert as a JSON UDP datagram to ALERT_SOCKET_ADDRESS (fire and forget)."""
+    name = "socket"
+    network = True
+
+    def __init__(self, address=None):
+        self.address = tuple(address or config.ALERT_SOCKET_ADDRESS)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def emit(self, alert):
+        self._sock.sendto(json.dumps(alert).encode(), self.address)
+
+    def close(self):
+        self._sock.close()
+
+
+class WebhookSink(AlertSink):
+    """POSTs each alert as JSON to ALERT_WEBHOOK_URL."""
+    name = "webhook"
+    network = True
+
+    def __init__(self, url=None, timeout=None):
+        self.url = url or config.ALERT_WEBHOOK_URL
+        self.timeout = timeout or config.ALERT_WEBHOOK_TIMEOUT
+
+    def emit(self, alert):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(alert).encode(),
+            headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+SINKS = {
+    "audio": AudioSink,
+    "jsonl": JsonlSink,
+    "socket": SocketSink,
+    "webhook": WebhookSink,
+}
+
+
+def create_sinks(names=None):
+    """Sinks listed in ALERT_SINKS (none with ENABLE_ALERTS off); audio only when ENABLE_AUDIO is on."""
+    if not config.ENABLE_ALERTS:
+        return []
+    names = config.ALERT_SINKS if names is None else names
+    return [SINKS[name]() for name in names if name != "audio" or config.ENABLE_AUDIO]
+
+
+# ==========================================
+# DISPATCHER
+# ==========================================
+class AlertQueue:
+    """
+    Bounded priority queue (lowest priority value first, FIFO within one).
+    When full, a new alert evicts the least urgent queued one if it is more
+    urgent itself, otherwise it is dropped.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, priority, item):
+        """Returns the alert that was dropped (the new or an evicted one), or None."""
+        entry = (priority, next(self._seq), item)
+        with self._cond:
+            dropped = None
+            if len(self._heap) >= self.maxsize:
+                worst = max(self._heap)
+                if entry > worst:
+                    return item
+                self._heap.remove(worst)
+                heapq.heapify(self._heap)
+                dropped = worst[2]
+            heapq.heappush(self._heap, entry)
+            self._cond.notify()
+            return dropped
+
+    def get(self):
+        """Blocks for the most urgent alert; None once closed and drained."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._heap or self._closed)
+            return heapq.heappop(self._heap)[2] if self._heap else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class AlertDispatcher:
+    """
+    Non-blocking alerts. trigger() only checks the cooldown and queues the
+    alert; one long-lived worker thread hands it to the local sinks (audio,
+    JSONL log), most urgent first. Each network sink (socket, webhook) has
+    its own worker and ALERT_NETWORK_QUEUE_SIZE queue, so a slow endpoint
+    only drops its own alerts and never holds up the sound.
+
+    Cooldowns (ALERT_COOLDOWNS, seconds per alert type) apply per
+    (type, reason, source, subject), so a phone alert does not silence a
+    drowsiness alert, nor one stream or one person another.
+
+    With ENABLE_ALERTS off nothing is dispatched, to any sink.
+    """
+
+    def __init__(self, sinks=None):
+        self.sinks = create_sinks() if sinks is None else sinks
+        if not config.ENABLE_ALERTS:
+            for sink in self.sinks:
+                sink.close()
+            self.sinks = []
+        self.cooldowns = config.ALERT_COOLDOWNS
+        self.priorities = config.ALERT_PRIORITIES
+        self._last = {}
+        self._lock = threading.Lock()
+        self._errors = set()
+
+        # (queue, thread) per worker: the local sinks share one
+        local = [sink for sink in self.sinks if not sink.network]
+        groups = [("alerts", local, config.ALERT_QUEUE_SIZE)] if local else []
+        groups += [(f"alerts-{sink.name}", [sink], config.ALERT_NETWORK_QUEUE_SIZE)
+                   for sink in self.sinks if sink.network]
+        self._lanes = []
+        for name, sinks, size in groups:
+            lane_queue = AlertQueue(size)
+            thread = threading.Thread(target=self._worker, args=(lane_queue, sinks), name=name)
+            thread.daemon = True
+            thread.start()
+            self._lanes.append((lane_queue, thread))
+
+    def trigger(self, alert_type="warning", reason=None, source=None, subject=None):
         """
-        Plays a sound in a background thread so video doesn't freeze.
+        Queues an alert unless its cooldown is running. Never blocks.
+        `subject` names who triggered it, e.g. "face 3" in multi-face mode.
+        Returns True if the alert was queued.
         """
-        if not config.ENABLE_AUDIO:
-            return
+        if not self._lanes:
+            return False
 
-        current_time = time.time()
-        
-        # Prevent sound from spamming (playing too fast)
-        if current_time - self.last_alert_time > self.cooldown:
-            self.last_alert_time = current_time
-            
-            # Run sound in separate thread
-            t = threading.Thread(target=self._play_sound, args=(alert_type,))
-            t.daemon = True
-            t.start()
-
-    def _play_sound(self, alert_type):
-        try:
-            # Mac-specific system sounds
-            if alert_type == "danger":
-                # Louder/More urgent sound
-                os.system('afplay /System/Library/Sounds/Sosumi.aiff')
-            else:
-                # Softer warning sound
-                os.system('afplay /System/Library/Sounds/Tink.aiff')
-        except:
-            # Fallback for non-Mac (Standard System Beep)
-            print('\a')
\ No newline at end of file
+        now = time.monotonic()
+        key = (alert_type, reason, source, subject)
+        with self._lock:
+            if now - self._last.get(key, -np.inf) < self.cooldowns.get(alert_type, 3.0):
+                return False
+            self._last[key] = now
+
+        priority = self.priorities.get(alert_type, max(self.priorities.values(), default=0) + 1)
+        alert = {"ts": round(time.time(), 3), "type": alert_type, "reason": reason,
+                 "source": source, "subject": subject, "priority": priority}
+        metrics.inc("alerts_fired_total", type=alert_type)
+        queued = False
+        for lane_queue, _ in self._lanes:
+            dropped = lane_queue.put(priority, alert)
+            if dropped is not None:
+                metrics.inc("alerts_dropped_total", type=dropped["type"])
+            queued = queued or dropped is not alert
+        return queued
+
+    def _worker(self, lane_queue, sinks):
+        while True:
+            alert = lane_queue.get()
+            if alert is None:
+                break
+            for sink in sinks:
+                try:
+                    sink.emit(alert)
+                except Exception as e:
+                    metrics.inc("alert_sink_errors_total", sink=sink.name)
+                    if sink.name not in self._errors:  # Report each failing sink once
+                        self._errors.add(sink.name)
+                        print(f"❌ Alert sink '{sink.name}' failed: {e}")
+
+    def close(self, timeout=2.0):
+        """Delivers the queued alerts, then stops the workers and closes the sinks."""
+        deadline = time.monotonic() + timeout
+        for lane_queue, _ in self._lanes:
+            lane_queue.close()
+        for _, thread in self._lanes:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        for sink in self.sinks:
+            sink.close()
+
+
+# Old name, same trigger() API
+AudioAlert = AlertDispatcher
@@ -0,0 +1,113 @@
+import threading
+from collections import deque
+
+# Queue policies
+DROP_OLDEST = "drop_oldest"   # Producer never waits, oldest item is thrown away
+BLOCK = "block"               # Producer waits for space (backpressure)
+
+
+class FrameRing:
+    """
+    Bounded FIFO used to hand frames from one pipeline stage to the next.
+
+    With DROP_OLDEST a full ring evicts its oldest item so the consumer
+    always sees the newest frames. With BLOCK the producer waits until the
+    consumer makes room, which slows the whole pipeline down to the pace
+    of its slowest stage.
+
+    `on_drop` is called with every item the ring throws away (evicted, or
+    refused by a timed-out put), e.g. to release buffers the item holds.
+    """
+
+    def __init__(self, capacity=1, policy=DROP_OLDEST, on_drop=None):
+        if capacity < 1:
+            raise ValueError("FrameRing capacity must be at least 1")
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown queue policy: {policy}")
+
+        self.capacity = capacity
+        self.policy = policy
+        self.on_drop = on_drop
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Counters
+        self.put_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        with self._cond:
+            return len(self._items)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def put(self, item, timeout=None):
+        """
+        Adds an item. Returns False if the item was not queued
+        (ring closed, or BLOCK policy timed out); a closed ring leaves the
+        item to the caller.
+        """
+        evicted, queued = [], True
+        with self._cond:
+            if self._closed:
+                return False
+
+            if len(self._items) >= self.capacity:
+                if self.policy == DROP_OLDEST:
+                    evicted.append(self._items.popleft())
+                    self.dropped += 1
+                else:
+                    has_room = self._cond.wait_for(
+                        lambda: self._closed or len(self._items) < self.capacity,
+                        timeout
+                    )
+                    if self._closed:
+                        return False
+                    if not has_room:
+                        self.dropped += 1
+                        evicted.append(item)
+                        queued = False
+
+            if queued:
+                self._items.append(item)
+                self.put_count += 1
+                self.max_depth = max(self.max_depth, len(self._items))
+                self._cond.notify_all()
+
+        if self.on_drop is not None:
+            for dropped in evicted:
+                self.on_drop(dropped)
+        return queued
+
+    def get(self, timeout=None):
+        """
+        Removes and returns the oldest item.
+        Returns None on timeout, or once the ring is closed and empty.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed, timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Wakes up every waiting producer/consumer. Queued items can still be read."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "depth": len(self._items),
+                "max_depth": self.max_depth,
+                "put": self.put_count,
+                "dropped": self.dropped,
+            }
@@ -0,0 +1,187 @@
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+import src.config as config
+
+IMAGE_EXTENSION = ".jpg"
+
+# Set bits per byte value (np.bitwise_count needs NumPy 2)
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# ==========================================
+# NEAR-DUPLICATES
+# ==========================================
+def dhash(image):
+    """
+    64-bit difference hash of a BGR or grayscale image: one bit per pixel
+    of a 9x8 thumbnail, set where it is brighter than its left neighbour.
+    Near-identical images differ in only a few bits.
+    """
+    # A bilinear pass to 8x the thumbnail first: INTER_AREA straight from
+    # full size takes ~30x longer for the same bits
+    small = cv2.resize(image, (72, 64), interpolation=cv2.INTER_LINEAR)
+    small = cv2.resize(small, (9, 8), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return np.packbits(small[:, 1:] > small[:, :-1]).view(">u8")[0].astype(np.uint64)
+
+class HashIndex:
+    """dHashes of the images kept so far, in a growing array scanned in one pass."""
+
+    def __init__(self, distance=None):
+        self.distance = config.COLLECT_DEDUP_DISTANCE if distance is None else distance
+        self._hashes = np.zeros(1024, dtype=np.uint64)
+        self.count = 0
+
+    def nearest(self, h):
+        """Bits differing from the closest indexed hash (65 when empty)."""
+        if not self.count:
+            return 65
+        diff = (self._hashes[:self.count] ^ h).view(np.uint8).reshape(self.count, 8)
+        return int(POPCOUNT[diff].sum(axis=1).min())
+
+    def is_duplicate(self, h):
+        return self.distance >= 0 and self.nearest(h) <= self.distance
+
+    def add(self, h):
+        if self.count == len(self._hashes):
+            self._hashes = np.concatenate([self._hashes, np.zeros_like(self._hashes)])
+        self._hashes[self.count] = h
+        self.count += 1
+
+    def add_folder(self, directory):
+        """Indexes the images already in `directory`. Returns how many."""
+        added = 0
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith(IMAGE_EXTENSION):
+                # Decoded at 1/8 size: plenty for a 9x8 hash, and much faster
+                image = cv2.imread(os.path.join(directory, name), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+                if image is not None:
+                    self.add(dhash(image))
+                    added += 1
+        return added
+
+# ==========================================
+# WRITING
+# ==========================================
+def write_yolo_labels(path, boxes, class_ids, shape):
+    """Writes `class cx cy w h` lines, normalized to the image size."""
+    h, w = shape[:2]
+    with open(path, "w") as f:
+        for (x1, y1, x2, y2), cls_id in zip(boxes.tolist(), class_ids.tolist()):
+            f.write(f"{cls_id} {(x1 + x2) / 2 / w:.6f} {(y1 + y2) / 2 / h:.6f} "
+                    f"{(x2 - x1) / w:.6f} {(y2 - y1) / h:.6f}\n")
+
+class DatasetWriter:
+    """
+    Saves captures in the background so the capture loop never waits for
+    the disk: `workers` threads encode and write the JPEGs (cv2.imencode
+    releases the GIL). A full queue drops the capture (counted in
+    `dropped`) instead of blocking.
+
+    With a `detector` (ObjectDetector) one more thread pre-labels the
+    written frames in batches and saves the boxes as a YOLO label file
+    next to each image. Frames without detections get no label file.
+    """
+
+    def __init__(self, directory, workers=None, detector=None, quality=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.quality = quality or config.COLLECT_JPEG_QUALITY
+        self.detector = detector
+        self.saved = 0
+        self.labeled = 0
+        self.dropped = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(config.COLLECT_QUEUE)
+        self._label_queue = queue.Queue(config.COLLECT_QUEUE)
+
+        self._writers = [threading.Thread(target=self._write_loop, name=f"dataset-writer-{i}")
+                         for i in range(workers or config.COLLECT_WRITERS)]
+        self._labeler = threading.Thread(target=self._label_loop, name="dataset-labeler") if detector else None
+        for t in self._writers + [self._labeler]:
+            if t is not None:
+                t.daemon = True
+                t.start()
+
+    def next_name(self, label, timestamp=None):
+        """Unique file stem: label, capture time (ms) and a sequence number."""
+        t = time.time() if timestamp is None else timestamp
+        self._seq += 1
+        return f"{label}_{time.strftime('%Y%m%d-%H%M%S', time.localtime(t))}-{int(t * 1000) % 1000:03d}_{self._seq:05d}"
+
+    def save(self, frame, label, timestamp=None):
+        """
+        Queues a copy of `frame` for writing as `label`. Returns the file
+        stem, or None if the writers are too far behind.
+        """
+        if self._queue.full():
+            self.dropped += 1
+            return None
+        stem = self.next_name(label, timestamp)
+        self._queue.put((frame.copy(), stem))
+        return stem
+
+    @property
+    def pending(self):
+        return self._queue.qsize() + self._label_queue.qsize()
+
+    def _write_loop(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, stem = item
+            ok, data = cv2.imencode(IMAGE_EXTENSION, frame, params)
+            if not ok:
+                print(f"❌ Could not encode {stem}")
+                continue
+            # Written under a temporary name so no half-written image is ever visible
+            path = os.path.join(self.directory, stem + IMAGE_EXTENSION)
+            with open(path + ".tmp", "wb") as f:
+                data.tofile(f)
+            os.replace(path + ".tmp", path)
+            with self._lock:
+                self.saved += 1
+            if self.detector is not None:
+                try:
+                    self._label_queue.put_nowait((frame, stem))
+                except queue.Full:
+                    pass
+
+    def _label_loop(self):
+        self.detector.wait_loaded()
+        done = False
+        while not done:
+            batch = [self._label_queue.get()]
+            while len(batch) < config.COLLECT_LABEL_BATCH:
+                try:
+                    batch.append(self._label_queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = None in batch
+            batch = [item for item in batch if item is not None]
+            if not batch or not self.detector.ready:
+                continue
+
+            detections = self.detector.detect_batch([frame for frame, _ in batch])
+            for i, (frame, stem) in enumerate(batch):
+                boxes, class_ids, _ = detections.frame(i)
+                if len(boxes):
+                    write_yolo_labels(os.path.join(self.directory, stem + ".txt"), boxes, class_ids, frame.shape)
+                    self.labeled += 1
+
+    def close(self):
+        """Waits until every queued frame is written (and labeled)."""
+        for _ in self._writers:
+            self._queue.put(None)
+        for t in self._writers:
+            t.join()
+        if self._labeler is not None:
+            self._label_queue.put(None)
+            self._labeler.join()
@@ -0,0 +1,323 @@
+import json
+import sys
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import src.config as config
+
+# Histogram bucket upper bounds (seconds)
+BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.035, 0.05, 0.075,
+           0.1, 0.15, 0.25, 0.5, 1.0, 2.5)
+
+
+class RollingHistogram:
+    """
+    Fixed-bucket latency histogram.
+
+    Keeps lifetime bucket counts (for Prometheus) plus two rotating windows
+    of METRICS_WINDOW seconds, so percentiles reflect the last one to two
+    windows instead of the whole run. observe() is a bisect and a few
+    integer increments.
+    """
+
+    def __init__(self, window=None):
+        self.window = window or config.METRICS_WINDOW
+        n = len(BUCKETS) + 1  # Last slot = +Inf
+        self.counts = [0] * n
+        self.count = 0
+        self.sum = 0.0
+        self._windows = [[0] * n, [0] * n]
+        self._current = 0
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(BUCKETS, value)
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._current ^= 1
+                self._windows[self._current] = [0] * len(self.counts)
+                self._window_start = now
+            self._windows[self._current][i] += 1
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Approximate q-quantile (seconds) over the recent windows."""
+        with self._lock:
+            recent = [a + b for a, b in zip(*self._windows)]
+        total = sum(recent)
+        if total == 0:
+            return 0.0
+
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(recent):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                # Interpolate linearly inside the bucket
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-1]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+        }
+
+
+class _Span:
+    """Context manager that times a block into a histogram."""
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+class MetricsRegistry:
+    """
+    Process-wide stage timings, counters and gauges.
+
+        with metrics.span("face_mesh"): ...
+        metrics.inc("alerts_fired_total", type="danger")
+        metrics.gauge("queue_depth", 2, queue="capture")
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = config.METRICS_ENABLED if enabled is None else enabled
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, RollingHistogram())
+        return histogram
+
+    def span(self, stage):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.histogram(stage))
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self.histogram(stage).observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def gauge(self, name, value, **labels):
+        if self.enabled:
+            self._gauges[_key(name, labels)] = value
+
+    # ------------------------------------------
+    # Export formats
+    # ------------------------------------------
+    @staticmethod
+    def _label_text(labels):
+        return ",".join(f'{k}="{v}"' for k, v in labels)
+
+    def snapshot(self):
+        def flat(key):
+            name, labels = key
+            return f"{name}{{{self._label_text(labels)}}}" if labels else name
+
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+        gauges = dict(self._gauges)
+        return {
+            "stages": {stage: h.snapshot() for stage, h in sorted(histograms.items())},
+            "counters": {flat(k): v for k, v in sorted(counters.items())},
+            "gauges": {flat(k): v for k, v in sorted(gauges.items())},
+        }
+
+    def prometheus_text(self, prefix="behavior"):
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        for stage, h in histograms:
+            with h._lock:
+                counts, total, count = list(h.counts), h.sum, h.count
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {count}')
+
+        for kind, items in (("counter", counters), ("gauge", sorted(self._gauges.items()))):
+            typed = set()
+            for (name, labels), value in items:
+                if name not in typed:
+                    lines.append(f"# TYPE {prefix}_{name} {kind}")
+                    typed.add(name)
+                label_text = self._label_text(labels)
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every module
+metrics = MetricsRegistry()
+
+
+# ==========================================
+# EXPORTERS
+# ==========================================
+class Exporter:
+    """Base class: publishes a registry somewhere until stopped."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class JsonLogExporter(Exporter):
+    """Writes one JSON line with the full snapshot every METRICS_INTERVAL seconds."""
+
+    def __init__(self, registry, interval=None, path=None):
+        super().__init__(registry)
+        self.interval = interval or config.METRICS_INTERVAL
+        self.path = path if path is not None else config.METRICS_LOG_PATH
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="metrics-json")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.write()
+
+    def write(self):
+        line = json.dumps({"ts": round(time.time(), 3), **self.registry.snapshot()})
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+        else:
+            print(line, file=sys.stdout, flush=True)
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.write()
+
+
+class PrometheusExporter(Exporter):
+    """Serves the registry in Prometheus text format on http://HOST:PORT/metrics."""
+
+    def __init__(self, registry, host=None, port=None):
+        super().__init__(registry)
+        self.host = host or config.METRICS_HTTP_HOST
+        self.port = port or config.METRICS_HTTP_PORT
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:  # Port taken, e.g. by a second instance
+            print(f"⚠️  Prometheus metrics disabled: cannot listen on {self.host}:{self.port} ({e})")
+            return
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http")
+        self._thread.daemon = True
+        self._thread.start()
+        print(f"📈 Metrics at http://{self.host}:{self._server.server_port}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+EXPORTERS = {
+    "json": JsonLogExporter,
+    "prometheus": PrometheusExporter,
+}
+
+
+def start_exporters(headless=False, registry=None):
+    """Starts the exporters listed in config (METRICS_HEADLESS_EXPORTERS when headless)."""
+    registry = registry or metrics
+    if not registry.enabled:
+        return []
+    names = config.METRICS_HEADLESS_EXPORTERS if headless else config.METRICS_EXPORTERS
+    exporters = []
+    for name in names:
+        exporter = EXPORTERS[name](registry)
+        exporter.start()
+        exporters.append(exporter)
+    return exporters
+
+
+def stop_exporters(exporters):
+    for exporter in exporters:
+        exporter.stop()
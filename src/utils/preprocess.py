@@ -0,0 +1,150 @@
+import threading
+import cv2
+import numpy as np
+import src.config as config
+from src.utils.metrics import metrics
+
+
+def read_only(array):
+    """A view of `array` that raises on writes; the data is shared, not copied."""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class FrameBuffers:
+    """One set of preallocated images for a single frame at one resolution."""
+
+    def __init__(self, w, h, model_size):
+        self.refs = 0  # Holders of the views below (Preprocessor lock)
+        self.bgr = np.empty((h, w, 3), dtype=np.uint8)
+        self.rgb = np.empty((h, w, 3), dtype=np.uint8)
+
+        # Downscaled YOLO input, only if the frame is larger than the model input
+        self.scale = min(model_size / max(w, h), 1.0)
+        self.small = None
+        if self.scale < 1.0:
+            size = (max(int(round(h * self.scale)), 1), max(int(round(w * self.scale)), 1), 3)
+            self.small = np.empty(size, dtype=np.uint8)
+
+        # Views handed to consumers are created once and stay read-only
+        self.bgr_view = read_only(self.bgr)
+        self.rgb_view = read_only(self.rgb)
+        self.small_view = read_only(self.small) if self.small is not None else None
+
+
+class PreparedFrame:
+    """
+    Read-only views produced by Preprocessor.process for one frame. It
+    comes with one reference; retain() adds one per extra holder (e.g. the
+    YOLO worker) and each holder calls release() once it is done with the
+    views, after which the buffers may be overwritten.
+    """
+
+    def __init__(self, buffers, owner):
+        self.frame = buffers.bgr_view         # BGR, mirrored
+        self.rgb = buffers.rgb_view           # Same image in RGB (MediaPipe)
+        self.model_input = buffers.small_view # Downscaled BGR for YOLO, or None
+        self.model_scale = buffers.scale      # model_input size / frame size
+        self._buffers = buffers
+        self._owner = owner
+
+    def retain(self):
+        self._owner._retain(self._buffers)
+        return self
+
+    def release(self):
+        self._owner._release(self._buffers)
+
+
+class Preprocessor:
+    """
+    Owns every per-frame image allocation of the live pipeline.
+
+    A raw camera frame is flipped and color-converted once, straight into
+    preallocated buffers (cv2 `dst=`), and the downscaled YOLO input is made
+    from the same pass. Consumers get read-only views, so the face stage,
+    the YOLO worker and the renderer can share them without copies.
+
+    Buffers are reference counted (see PreparedFrame) and a set is only
+    reused once every holder released it, so a frame waiting long for YOLO
+    is never overwritten by a newer one. The pool starts with `pool_size`
+    sets and grows when all of them are held. Pools are kept per
+    resolution, so a source that changes size just gets a new pool.
+    """
+
+    def __init__(self, pool_size=None, mirror=True, model_size=None):
+        self.pool_size = pool_size or (config.CAPTURE_BUFFER_SIZE + config.RENDER_BUFFER_SIZE
+                                       + config.PREPROCESS_SPARE_BUFFERS)
+        self.mirror = mirror
+        self.model_size = model_size or config.YOLO_INPUT_SIZE
+        self._pools = {}
+        self._next = {}
+        self._canvas = {}
+        self._lock = threading.Lock()
+
+    def _take(self, w, h):
+        key = (w, h)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = [FrameBuffers(w, h, self.model_size) for _ in range(self.pool_size)]
+                self._pools[key] = pool
+                self._next[key] = 0
+            # Next free set, round-robin; a new one if every set is held
+            start = self._next[key]
+            for i in range(len(pool)):
+                buffers = pool[(start + i) % len(pool)]
+                if buffers.refs == 0:
+                    self._next[key] = (start + i + 1) % len(pool)
+                    break
+            else:
+                buffers = FrameBuffers(w, h, self.model_size)
+                pool.append(buffers)
+                metrics.inc("preprocess_buffers_grown_total")
+            buffers.refs = 1
+        return buffers
+
+    def _retain(self, buffers):
+        with self._lock:
+            buffers.refs += 1
+
+    def _release(self, buffers):
+        with self._lock:
+            buffers.refs -= 1
+
+    def in_use(self):
+        """Buffer sets currently held, over every resolution."""
+        with self._lock:
+            return sum(b.refs > 0 for pool in self._pools.values() for b in pool)
+
+    def process(self, raw):
+        """
+        Mirror + BGR->RGB + downscale `raw` into a free buffer set. The
+        caller owns the returned PreparedFrame's reference and releases it.
+        """
+        h, w = raw.shape[:2]
+        buffers = self._take(w, h)
+
+        with metrics.span("preprocess"):
+            if self.mirror:
+                cv2.flip(raw, 1, dst=buffers.bgr)
+            else:
+                np.copyto(buffers.bgr, raw)
+            cv2.cvtColor(buffers.bgr, cv2.COLOR_BGR2RGB, dst=buffers.rgb)
+            if buffers.small is not None:
+                cv2.resize(buffers.bgr, (buffers.small.shape[1], buffers.small.shape[0]),
+                           dst=buffers.small, interpolation=cv2.INTER_AREA)
+        return PreparedFrame(buffers, self)
+
+    def canvas(self, frame):
+        """
+        Writable copy of `frame` for drawing the HUD, reusing one buffer per
+        resolution. Call from a single (render) thread only.
+        """
+        h, w = frame.shape[:2]
+        canvas = self._canvas.get((w, h))
+        if canvas is None:
+            canvas = self._canvas[(w, h)] = np.empty((h, w, 3), dtype=np.uint8)
+        np.copyto(canvas, frame)
+        return canvas
@@ -0,0 +1,431 @@
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+import src.config as config
+from src.utils.alerts import AlertSink
+from src.utils.metrics import metrics
+
+# ==========================================
+# TABLES
+# ==========================================
+# Fixed-width rows; every table starts with its time column (seconds, epoch)
+TABLES = {
+    # One row per analyzed frame (primary face in multi-face mode)
+    "frames": np.dtype([
+        ("time", np.float64),
+        ("frame", np.int64),
+        ("faces", np.uint8),
+        ("ear", np.float32),
+        ("pitch", np.float32),
+        ("yaw", np.float32),
+        ("roll", np.float32),
+        ("drowsy", np.bool_),
+        ("distracted", np.bool_),
+        ("detection", np.int64),  # Frame of the YOLO result in use, -1 if none
+    ]),
+    # One row per face and frame (multi-face mode only)
+    "faces": np.dtype([
+        ("time", np.float64),
+        ("frame", np.int64),
+        ("face_id", np.int32),
+        ("ear", np.float32),
+        ("pitch", np.float32),
+        ("yaw", np.float32),
+        ("roll", np.float32),
+        ("drowsy", np.bool_),
+        ("distracted", np.bool_),
+    ]),
+    # One row per YOLO box, once per inference
+    "detections": np.dtype([
+        ("time", np.float64),
+        ("frame", np.int64),
+        ("class_id", np.int16),
+        ("conf", np.float32),
+        ("box", np.int32, (4,)),
+    ]),
+    # Behavior start / stop Events (src/utils/temporal.py)
+    "events": np.dtype([
+        ("time", np.float64),
+        ("name", "S16"),
+        ("kind", "S8"),
+        ("duration", np.float32),
+        ("track_id", np.int32),   # Object / face track, -1 if none
+    ]),
+    # Alerts that passed their cooldown (AlertDispatcher)
+    "alerts": np.dtype([
+        ("time", np.float64),
+        ("type", "S16"),
+        ("reason", "S16"),
+        ("subject", "S32"),
+        ("priority", np.int8),
+    ]),
+}
+
+# Tables whose rows do not arrive in time order: tracker events carry the
+# (older) YOLO frame's time, and alerts are reordered by priority. Their
+# rows may land in the chunk after their time, and are filtered by mask.
+UNORDERED_TABLES = ("events", "alerts")
+
+SCHEMA_FILE = "schema.json"
+
+
+def chunk_name(start):
+    return f"{int(start):010d}"
+
+
+# ==========================================
+# WRITER
+# ==========================================
+class TableBuffer:
+    """Rows of one table collected on the hot path, handed to the writer in batches."""
+
+    def __init__(self, dtype, size):
+        self.dtype = dtype
+        self.size = size
+        self._rows = np.empty(size, dtype=dtype)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def append(self, row):
+        """Adds one row (tuple). Returns True once the batch is full."""
+        with self._lock:
+            self._rows[self._count] = row
+            self._count += 1
+            return self._count >= self.size
+
+    def take(self):
+        """The collected rows (or None), starting a new batch."""
+        with self._lock:
+            if not self._count:
+                return None
+            rows = self._rows[:self._count]
+            self._rows = np.empty(self.size, dtype=self.dtype)
+            self._count = 0
+            return rows
+
+
+class SessionRecorder:
+    """
+    Records a session as chunked columnar binary files:
+
+        <RECORD_DIR>/<started>_<name>/schema.json
+                                     /<table>/<chunk start>/<column>.bin
+
+    Each column is a raw fixed-width array (dtype in schema.json), so the
+    reader can np.memmap it. Chunks cover RECORD_CHUNK_SECONDS of wall
+    time and are named after their start, which is the time index: a
+    query opens only the chunks of its range and binary-searches their
+    time column. Each batch is written sorted by time, and appends only
+    move forward: a late row goes to the table's current chunk rather
+    than reopening a closed one (see UNORDERED_TABLES).
+
+    record_*() only copies a row into an in-memory batch. Batches go to
+    a writer thread every RECORD_FLUSH_SECONDS (or when RECORD_BATCH_ROWS
+    fill up) and are written with one append per column, so there is no
+    write per frame. If the disk falls behind by RECORD_QUEUE_BATCHES
+    batches, new batches are dropped (recorder_dropped_rows_total).
+    """
+
+    def __init__(self, name="main", root=None):
+        self.name = name
+        self.path = os.path.join(root or config.RECORD_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{name}")
+        self.chunk_seconds = config.RECORD_CHUNK_SECONDS
+        os.makedirs(self.path, exist_ok=True)
+        schema = {
+            "name": name,
+            "started": time.time(),
+            "chunk_seconds": self.chunk_seconds,
+            "tables": {table: [[column, dtype[column].base.str, list(dtype[column].shape)]
+                               for column in dtype.names]
+                       for table, dtype in TABLES.items()},
+        }
+        with open(os.path.join(self.path, SCHEMA_FILE), "w") as f:
+            json.dump(schema, f, indent=2)
+
+        self._buffers = {table: TableBuffer(dtype, config.RECORD_BATCH_ROWS) for table, dtype in TABLES.items()}
+        self._last_flush = time.monotonic()
+        self._last_detection = None
+        self._files = {}      # (table, column) -> (chunk start, open file)
+        self._chunks = {}     # table -> start of the chunk last written
+        self._dropped = False
+        self._queue = queue.Queue(config.RECORD_QUEUE_BATCHES)
+        self._thread = threading.Thread(target=self._writer, name=f"recorder-{name}")
+        self._thread.daemon = True
+        self._thread.start()
+        print(f"📼 Recording session to {self.path}")
+
+    # ------------------------------------------
+    # Hot path
+    # ------------------------------------------
+    def record(self, table, row):
+        if self._buffers[table].append(row):
+            self._hand_over(table)
+
+    def record_packet(self, packet, detections=None):
+        """
+        Records one analyzed FramePacket: its frame row, per-face rows,
+        events, and the DetectionResult `detections` if it is a new one.
+        """
+        t = packet.timestamp
+        pitch, yaw, roll = packet.pose_data
+        faces = packet.faces
+        count = len(faces) if faces is not None else int(packet.face)
+        self.record("frames", (t, packet.frame_id, count, packet.ear_score, pitch, yaw, roll,
+                               packet.is_drowsy, packet.is_distracted,
+                               -1 if detections is None else detections.frame_id))
+
+        if faces is not None:
+            for i, face_id in enumerate(faces.ids):
+                p, y, r = faces.poses[i]
+                self.record("faces", (t, packet.frame_id, face_id, faces.ears[i], p, y, r,
+                                      faces.drowsy[i], faces.distracted[i]))
+
+        for event in packet.events:
+            track_id = -1 if event.track_id is None else event.track_id
+            self.record("events", (event.time, event.name.encode(), event.kind.encode(),
+                                   event.duration, track_id))
+
+        if detections is not None and detections.frame_id != self._last_detection:
+            self._last_detection = detections.frame_id
+            for obj in detections.objects:
+                self.record("detections", (detections.timestamp, detections.frame_id,
+                                           obj.get('class_id', -1), obj['conf'], obj['box']))
+
+        if time.monotonic() - self._last_flush >= config.RECORD_FLUSH_SECONDS:
+            self.flush()
+
+    def record_alert(self, alert):
+        self.record("alerts", (alert["ts"], alert["type"].encode(), (alert["reason"] or "").encode(),
+                               (alert.get("subject") or "").encode(), alert["priority"]))
+
+    def flush(self, block=False):
+        """Hands every pending batch to the writer thread (waiting for room with `block`)."""
+        self._last_flush = time.monotonic()
+        for table in self._buffers:
+            self._hand_over(table, block)
+
+    def _hand_over(self, table, block=False):
+        rows = self._buffers[table].take()
+        if rows is None:
+            return
+        try:
+            self._queue.put((table, rows), block)
+        except queue.Full:
+            metrics.inc("recorder_dropped_rows_total", len(rows), table=table)
+            if not self._dropped:
+                self._dropped = True
+                print("⚠️  Session recorder is falling behind, dropping rows")
+
+    def close(self):
+        """Writes what is pending and closes the files."""
+        self.flush(block=True)
+        self._queue.put((None, None))
+        self._thread.join(timeout=10.0)
+
+    # ------------------------------------------
+    # Writer thread
+    # ------------------------------------------
+    def _writer(self):
+        while True:
+            table, rows = self._queue.get()
+            if table is None:
+                break
+            try:
+                self._write(table, rows)
+            except OSError as e:
+                metrics.inc("recorder_dropped_rows_total", len(rows), table=table)
+                print(f"❌ Session recorder failed to write {table}: {e}")
+        for _, f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def _write(self, table, rows):
+        rows = rows[np.argsort(rows["time"], kind="stable")]
+        starts = np.floor(rows["time"] / self.chunk_seconds) * self.chunk_seconds
+        # Rows older than the open chunk stay in it: chunks are never reopened
+        if table in self._chunks:
+            starts = np.maximum(starts, self._chunks[table])
+        self._chunks[table] = starts[-1]
+
+        # Split the batch where it crosses into the next chunk
+        cuts = np.flatnonzero(np.diff(starts)) + 1
+        for part, start in zip(np.split(rows, cuts), starts[np.r_[0, cuts]]):
+            for column in rows.dtype.names:
+                self._file(table, column, start).write(np.ascontiguousarray(part[column]).tobytes())
+        for _, f in self._files.values():
+            f.flush()
+        metrics.inc("recorder_rows_total", len(rows), table=table)
+
+    def _file(self, table, column, start):
+        key = (table, column)
+        current = self._files.get(key)
+        if current is not None and current[0] == start:
+            return current[1]
+        if current is not None:
+            current[1].close()
+        directory = os.path.join(self.path, table, chunk_name(start))
+        os.makedirs(directory, exist_ok=True)
+        f = open(os.path.join(directory, f"{column}.bin"), "ab")
+        self._files[key] = (start, f)
+        return f
+
+
+class RecordSink(AlertSink):
+    """Alert sink writing every dispatched alert to the recorder of its source."""
+    name = "record"
+
+    def __init__(self, recorders):
+        self.recorders = recorders   # alert["source"] -> SessionRecorder (None for the main loop)
+
+    def emit(self, alert):
+        recorder = self.recorders.get(alert.get("source"))
+        if recorder is not None:
+            recorder.record_alert(alert)
+
+
+# ==========================================
+# READER
+# ==========================================
+class SessionReader:
+    """
+    Memory-mapped view of a recorded session. Column files are mapped on
+    first use, and a query only touches the chunks, and within them the
+    rows, of its time range, so sessions of any length can be queried
+    without loading them. A chunk still being written is read up to its
+    last complete row.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE)) as f:
+            schema = json.load(f)
+        self.name = schema["name"]
+        self.started = schema["started"]
+        self.chunk_seconds = schema["chunk_seconds"]
+        self.tables = {
+            table: np.dtype([(column, dtype, tuple(shape)) for column, dtype, shape in columns])
+            for table, columns in schema["tables"].items()
+        }
+
+    def chunks(self, table, start=None, end=None):
+        """Start times of the chunks of `table` that overlap [start, end)."""
+        directory = os.path.join(self.path, table)
+        if not os.path.isdir(directory):
+            return []
+        starts = sorted(int(name) for name in os.listdir(directory) if name.isdigit())
+        return [s for s in starts
+                if (start is None or s + self.chunk_seconds > start) and (end is None or s < end)]
+
+    def _map(self, table, chunk, columns):
+        """{column: memmap} of one chunk, cut to the rows every column has."""
+        dtype = self.tables[table]
+        directory = os.path.join(self.path, table, chunk_name(chunk))
+        sizes = {}
+        for column in set(columns) | {"time"}:
+            path = os.path.join(directory, f"{column}.bin")
+            sizes[column] = os.path.getsize(path) // dtype[column].itemsize if os.path.exists(path) else 0
+        rows = min(sizes.values())
+        if not rows:
+            return None
+        return {column: np.memmap(os.path.join(directory, f"{column}.bin"), dtype=dtype[column].base,
+                                  mode="r", shape=(rows,) + dtype[column].shape)
+                for column in sizes}
+
+    def iter_chunks(self, table, start=None, end=None, columns=None):
+        """
+        Yields {column: array} per chunk for the rows with start <= time < end.
+        The arrays are memmap slices; nothing is read until they are used.
+        UNORDERED_TABLES are filtered by a mask instead (so their matching
+        rows are read), including the chunk after the range for late rows.
+        """
+        columns = list(columns or self.tables[table].names)
+        ordered = table not in UNORDERED_TABLES
+        last = end if ordered or end is None else end + self.chunk_seconds
+        for chunk in self.chunks(table, start, last):
+            mapped = self._map(table, chunk, columns)
+            if mapped is None:
+                continue
+            times = mapped["time"]
+            if ordered:
+                i0 = 0 if start is None else int(np.searchsorted(times, start, "left"))
+                i1 = len(times) if end is None else int(np.searchsorted(times, end, "left"))
+                if i1 > i0:
+                    yield {column: mapped[column][i0:i1] for column in columns + ["time"]}
+                continue
+            mask = np.ones(len(times), dtype=bool)
+            if start is not None:
+                mask &= times >= start
+            if end is not None:
+                mask &= times < end
+            if mask.any():
+                yield {column: mapped[column][mask] for column in columns + ["time"]}
+
+    def query(self, table, start=None, end=None, columns=None):
+        """Rows with start <= time < end as one structured array (only those rows are read)."""
+        columns = list(columns or self.tables[table].names)
+        dtype = np.dtype([(c, self.tables[table][c]) for c in columns])
+        parts = []
+        for chunk in self.iter_chunks(table, start, end, columns):
+            part = np.empty(len(chunk["time"]), dtype=dtype)
+            for column in columns:
+                part[column] = chunk[column]
+            parts.append(part)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    def aggregate(self, table, every, value=None, columns=None, start=None, end=None, origin=0.0):
+        """
+        Sums `value` over time buckets of `every` seconds aligned to
+        `origin` (e.g. local midnight for hours or shifts), chunk by chunk.
+        `value(chunk)` gets {column: array} for `columns` and returns one
+        number per row; the default counts rows.
+        Returns (bucket_starts, sums), only for non-empty buckets.
+        """
+        totals = {}
+        for chunk in self.iter_chunks(table, start, end, columns or ["time"]):
+            buckets = np.floor((chunk["time"] - origin) / every).astype(np.int64)
+            weights = None if value is None else np.asarray(value(chunk), dtype=np.float64)
+            first = buckets.min()  # Unordered tables are not sorted by time
+            sums = np.bincount(buckets - first, weights=weights)
+            for i in np.flatnonzero(sums):
+                totals[first + i] = totals.get(first + i, 0.0) + float(sums[i])
+        keys = sorted(totals)
+        return (np.array([origin + k * every for k in keys], dtype=np.float64),
+                np.array([totals[k] for k in keys], dtype=np.float64))
+
+
+def frame_durations(times, max_gap=None):
+    """Seconds each frame stands for (until the next one), gaps capped at RECORD_MAX_FRAME_GAP."""
+    max_gap = config.RECORD_MAX_FRAME_GAP if max_gap is None else max_gap
+    return np.clip(np.diff(times, append=times[-1:]), 0, max_gap)
+
+
+def closed_eye_minutes(reader, every=3600, start=None, end=None, origin=0.0, threshold=None):
+    """Minutes with the eyes closed (EAR below EAR_THRESHOLD) per time bucket."""
+    threshold = config.EAR_THRESHOLD if threshold is None else threshold
+    return reader.aggregate(
+        "frames", every, lambda c: frame_durations(c["time"]) * ((c["faces"] > 0) & (c["ear"] < threshold)) / 60,
+        ["faces", "ear"], start, end, origin)
+
+
+def flag_minutes(reader, column, every=3600, start=None, end=None, origin=0.0):
+    """Minutes a frame flag ("drowsy", "distracted") was set per time bucket."""
+    return reader.aggregate("frames", every, lambda c: frame_durations(c["time"]) * c[column] / 60,
+                            [column], start, end, origin)
+
+
+def event_counts(reader, name, every=3600, start=None, end=None, origin=0.0):
+    """
+    Number of `name` behaviors that started (e.g. "phone" events per shift)
+    per time bucket. Objects are counted by their presence periods (the
+    events without a track ID), not once more per tracked object.
+    """
+    objects = name in config.CLASS_NAMES.values()
+    name = name.encode()
+
+    def starts(c):
+        started = (c["name"] == name) & (c["kind"] == b"start")
+        return started & (c["track_id"] < 0) if objects else started
+    return reader.aggregate("events", every, starts, ["name", "kind", "track_id"], start, end, origin)
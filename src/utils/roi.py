@@ -0,0 +1,68 @@
+import numpy as np
+import src.config as config
+from src.detectors.landmarks import FACE_BOUND_IDXS
+
+
+def face_roi(points, frame_w, frame_h):
+    """
+    Derives the YOLO search region from the face landmarks.
+
+    The face box is widened by ROI_MARGIN face widths on each side, raised
+    by ROI_MARGIN_UP face heights and extended ROI_MARGIN_DOWN face heights
+    below the chin to cover the hands and upper body, where phones, food
+    and drinks show up. The result is never smaller than ROI_MIN_SIZE.
+
+    `points` is the pixel landmark array from FaceMeshDetector.get_points.
+    Returns (x1, y1, x2, y2) in pixels, or None if there are no landmarks.
+    """
+    if points is None:
+        return None
+
+    outline = points[FACE_BOUND_IDXS, :2]
+    fx1, fy1 = outline.min(axis=0)
+    fx2, fy2 = outline.max(axis=0)
+    return expand_face_box(fx1, fy1, fx2, fy2, frame_w, frame_h)
+
+
+def face_boxes(points):
+    """(F, 4) float face boxes (x1, y1, x2, y2) of an (F, N, 3) landmark stack."""
+    outline = points[:, FACE_BOUND_IDXS, :2]
+    return np.concatenate([outline.min(axis=1), outline.max(axis=1)], axis=1)
+
+
+def faces_roi(boxes, frame_w, frame_h):
+    """face_roi for several faces: one region around all (F, 4) face boxes, or None."""
+    if boxes is None or not len(boxes):
+        return None
+    fx1, fy1 = boxes[:, :2].min(axis=0)
+    fx2, fy2 = boxes[:, 2:].max(axis=0)
+    return expand_face_box(fx1, fy1, fx2, fy2, frame_w, frame_h)
+
+
+def expand_face_box(fx1, fy1, fx2, fy2, frame_w, frame_h):
+    """Applies the ROI margins to a face box and clips it to the frame."""
+    face_w = max(fx2 - fx1, 1.0)
+    face_h = max(fy2 - fy1, 1.0)
+
+    x1 = fx1 - face_w * config.ROI_MARGIN
+    x2 = fx2 + face_w * config.ROI_MARGIN
+    y1 = fy1 - face_h * config.ROI_MARGIN_UP
+    y2 = fy2 + face_h * config.ROI_MARGIN_DOWN
+
+    # Grow small regions around their center up to the minimum size
+    min_size = config.ROI_MIN_SIZE
+    if x2 - x1 < min_size:
+        cx = (x1 + x2) / 2
+        x1, x2 = cx - min_size / 2, cx + min_size / 2
+    if y2 - y1 < min_size:
+        cy = (y1 + y2) / 2
+        y1, y2 = cy - min_size / 2, cy + min_size / 2
+
+    x1 = int(max(0, x1))
+    y1 = int(max(0, y1))
+    x2 = int(min(frame_w, x2))
+    y2 = int(min(frame_h, y2))
+
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return (x1, y1, x2, y2)
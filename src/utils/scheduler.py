@@ -0,0 +1,121 @@
+import time
+import cv2
+import numpy as np
+import src.config as config
+
+
+class DetectionScheduler:
+    """
+    Decides on which frames YOLO should run.
+
+    The gap between two detections is picked from:
+      - the measured YOLO latency and fast-path time, so YOLO only uses the
+        part of each frame budget (1 / TARGET_FPS) the fast path leaves idle,
+      - scene activity: a cheap frame-difference motion score, and whether
+        the last detection found anything.
+    Busy scenes (moving hands, a phone/food/drink in view) are checked every
+    DETECTION_MIN_INTERVAL seconds; static, empty scenes back off towards
+    DETECTION_MAX_INTERVAL.
+
+    With config.ADAPTIVE_DETECTION = False it falls back to the fixed
+    "every DETECTION_INTERVAL frames" rule.
+    """
+
+    MOTION_SIZE = (64, 36)  # Thumbnail used for the motion score
+
+    def __init__(self):
+        self.adaptive = config.ADAPTIVE_DETECTION
+        self.min_interval = config.DETECTION_MIN_INTERVAL
+        self.max_interval = config.DETECTION_MAX_INTERVAL
+        self.frame_budget = 1.0 / config.TARGET_FPS
+
+        self.inference_time = None   # EMA of YOLO latency (s)
+        self.fast_path_time = None   # EMA of per-frame face analysis time (s)
+        self.motion = 0.0
+        self.objects_present = False
+
+        self.frame_count = 0
+        self.last_run = None
+        self.last_active = None      # Last time motion or objects were seen
+        self._prev_thumb = None
+
+    # ------------------------------------------
+    # Measurements
+    # ------------------------------------------
+    @staticmethod
+    def _ema(old, new, alpha=0.2):
+        return new if old is None else old + alpha * (new - old)
+
+    def record_inference(self, elapsed):
+        if elapsed:
+            self.inference_time = self._ema(self.inference_time, elapsed)
+
+    def record_fast_path(self, elapsed):
+        if elapsed:
+            self.fast_path_time = self._ema(self.fast_path_time, elapsed)
+
+    def record_result(self, objects):
+        """Feed in the latest detections (list of dicts, may be empty)."""
+        self.objects_present = bool(objects)
+
+    def motion_score(self, frame):
+        """Mean absolute difference (0-1) between this and the previous thumbnail."""
+        small = cv2.resize(frame, self.MOTION_SIZE, interpolation=cv2.INTER_NEAREST)
+        thumb = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        if self._prev_thumb is None:
+            score = 0.0
+        else:
+            score = float(cv2.absdiff(thumb, self._prev_thumb).mean()) / 255.0
+
+        self._prev_thumb = thumb
+        self.motion = score
+        return score
+
+    # ------------------------------------------
+    # Decision
+    # ------------------------------------------
+    def latency_floor(self):
+        """Shortest gap (s) that keeps YOLO inside the idle share of the frame budget."""
+        if self.inference_time is None:
+            return 0.0
+        busy_share = (self.fast_path_time or 0.0) / self.frame_budget
+        idle_share = float(np.clip(1.0 - busy_share, config.DETECTION_MIN_SHARE, 1.0))
+        return self.inference_time / idle_share
+
+    def current_interval(self, now):
+        """Target gap (s) between two detections for the current scene."""
+        active = self.objects_present or self.motion >= config.MOTION_THRESHOLD
+        if active:
+            self.last_active = now
+
+        if self.last_active is not None and now - self.last_active <= config.ACTIVITY_HOLD:
+            interval = self.min_interval
+        else:
+            # Scale between the two bounds with the (sub-threshold) motion level
+            activity = min(self.motion / config.MOTION_THRESHOLD, 1.0)
+            interval = self.max_interval - activity * (self.max_interval - self.min_interval)
+
+        return max(interval, self.latency_floor())
+
+    def should_run(self, frame, now=None, busy=False):
+        """
+        Call once per frame. Returns True if this frame should go to YOLO.
+        `busy` = the detector is still working on an earlier frame.
+        """
+        self.frame_count += 1
+
+        if not self.adaptive:
+            return self.frame_count % config.DETECTION_INTERVAL == 0
+
+        if now is None:
+            now = time.time()
+        self.motion_score(frame)
+
+        if busy:
+            return False
+        if self.last_run is not None and now - self.last_run < self.current_interval(now):
+            return False
+
+        self.last_run = now
+        return True
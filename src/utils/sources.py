@@ -0,0 +1,369 @@
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+import cv2
+import src.config as config
+from src.utils.metrics import metrics
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+STREAM_PREFIXES = ("rtsp://", "rtsps://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+
+# ==========================================
+# SOURCES
+# ==========================================
+class FrameSource(ABC):
+    """
+    Base class for everything frames come from.
+
+    read(out) returns (ok, frame, timestamp), the timestamp being the
+    wall-clock time the frame was grabbed. `out` is an array the frame may
+    be decoded into. Live sources (cameras, streams) that stop delivering
+    are reopened with a growing delay until they come back or stop() is
+    called; finite sources (files, folders) just end.
+    """
+    live = True
+
+    def __init__(self, name):
+        self.name = name
+        self.fps = config.FPS
+        self.reconnects = 0
+        self._released = threading.Event()
+
+    @abstractmethod
+    def open(self):
+        """(Re)opens the source. Returns True on success."""
+
+    def close(self):
+        pass
+
+    @abstractmethod
+    def _read(self, out):
+        """One read attempt: (ok, frame, timestamp), without reconnecting."""
+
+    def read(self, out=None):
+        while not self._released.is_set():
+            ok, frame, timestamp = self._read(out)
+            if ok:
+                return True, frame, timestamp
+            if not self.live or not self._reconnect():
+                break
+        return False, None, None
+
+    def _reconnect(self):
+        delay = config.SOURCE_RECONNECT_DELAY
+        print(f"🔄 Lost {self.name}, reconnecting...")
+        while not self._released.is_set():
+            self.close()
+            if self._released.wait(delay):
+                break
+            if self.open():
+                self.reconnects += 1
+                metrics.inc("source_reconnects_total", source=self.name)
+                print(f"✅ Reconnected to {self.name}")
+                return True
+            delay = min(delay * 2, config.SOURCE_RECONNECT_MAX_DELAY)
+        return False
+
+    def stop(self):
+        """Makes a pending or later read() give up instead of reconnecting."""
+        self._released.set()
+
+    def release(self):
+        self.stop()
+        self.close()
+
+
+class CaptureSource(FrameSource):
+    """A cv2.VideoCapture. grab() is timestamped before the frame is decoded by retrieve()."""
+
+    def __init__(self, name, target, api=cv2.CAP_ANY):
+        super().__init__(name)
+        self.target = target
+        self.api = api
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.target, self.api)
+        if not self.cap.isOpened():
+            self.cap.release()
+            self.cap = None
+            return False
+        self.configure(self.cap)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or config.FPS
+        return True
+
+    def configure(self, cap):
+        """Sets capture properties right after opening."""
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def _read(self, out):
+        if self.cap is None or not self.cap.grab():
+            return False, None, None
+        timestamp = time.time()
+        ok, frame = self.cap.retrieve(out)
+        return ok, frame, timestamp
+
+
+class CameraSource(CaptureSource):
+    """
+    Local camera, through V4L2 on Linux. Asks for MJPEG (CAMERA_FOURCC),
+    which USB cameras deliver at full frame rate where raw YUYV is capped
+    by the bus, and keeps the driver queue short (CAMERA_BUFFERS) so read()
+    returns a fresh frame instead of one captured hundreds of ms ago.
+    """
+
+    def __init__(self, device, width=None, height=None, fps=None, fourcc=None, buffers=None):
+        api = cv2.CAP_V4L2 if sys.platform.startswith("linux") else cv2.CAP_ANY
+        super().__init__(f"camera {device}", device, api)
+        self.width = width or config.FRAME_WIDTH
+        self.height = height or config.FRAME_HEIGHT
+        self.requested_fps = fps or config.FPS
+        self.fourcc = config.CAMERA_FOURCC if fourcc is None else fourcc
+        self.buffers = config.CAMERA_BUFFERS if buffers is None else buffers
+
+    def configure(self, cap):
+        # The pixel format must be negotiated before the frame size
+        if self.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        cap.set(cv2.CAP_PROP_FPS, self.requested_fps)
+        if self.buffers:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffers)
+
+    def describe(self):
+        """Negotiated format, e.g. '1280x720 MJPG @ 30fps'."""
+        if self.cap is None:
+            return "not open"
+        code = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        fourcc = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip("\0") or "?"
+        return (f"{int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))} "
+                f"{fourcc} @ {self.cap.get(cv2.CAP_PROP_FPS):.0f}fps")
+
+
+class StreamSource(CaptureSource):
+    """
+    Network stream (RTSP...) or a GStreamer pipeline ("... ! appsink").
+    With RTSP_BACKEND = "gstreamer" URLs are wrapped into a low-latency
+    pipeline that drops late buffers; with "ffmpeg" the demuxer buffering
+    is turned off instead.
+    """
+
+    def __init__(self, url):
+        if " ! " in url:
+            name, target, api = "gstreamer pipeline", url, cv2.CAP_GSTREAMER
+        elif config.RTSP_BACKEND == "gstreamer":
+            target = (f"rtspsrc location={url} latency={config.RTSP_LATENCY_MS} ! decodebin ! "
+                      "videoconvert ! video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false")
+            name, api = url, cv2.CAP_GSTREAMER
+        else:
+            # Read by OpenCV's FFmpeg backend when the capture is opened
+            os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS",
+                                  "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay")
+            name, target, api = url, url, cv2.CAP_FFMPEG
+        super().__init__(name, target, api)
+
+    def configure(self, cap):
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+
+class VideoFileSource(CaptureSource):
+    """Frames [start, end) of a video file."""
+    live = False
+
+    def __init__(self, path, start=0, end=None):
+        super().__init__(os.path.basename(path), path)
+        self.start = start
+        self.end = end
+        self.index = start
+
+    def configure(self, cap):
+        if self.start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, self.start)
+        self.index = self.start
+
+    def _read(self, out):
+        if self.end is not None and self.index >= self.end:
+            return False, None, None
+        ok, frame, timestamp = super()._read(out)
+        if ok:
+            self.index += 1
+        return ok, frame, timestamp
+
+
+class ImageDirSource(FrameSource):
+    """Images of a folder in name order, read as a video at config.FPS."""
+    live = False
+
+    def __init__(self, directory):
+        super().__init__(os.path.basename(os.path.normpath(directory)))
+        self.directory = directory
+        self.paths = []
+        self.index = 0
+
+    def open(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.lower().endswith(IMAGE_EXTENSIONS))
+        self.paths = [os.path.join(self.directory, n) for n in names]
+        self.index = 0
+        return bool(self.paths)
+
+    def _read(self, out):
+        while self.index < len(self.paths):
+            frame = cv2.imread(self.paths[self.index])
+            self.index += 1
+            if frame is not None:
+                return True, frame, time.time()
+        return False, None, None
+
+
+# ==========================================
+# READ-AHEAD
+# ==========================================
+class ReadAhead:
+    """
+    Reads a FrameSource in a background thread.
+
+    Live sources keep only the newest frame: a frame the consumer has not
+    taken yet is replaced by the next one, so read() never returns a stale
+    frame. Finite sources queue up to `depth` frames and the reader waits
+    for room, so no frame is lost.
+
+    With `reuse` (the default) frames are decoded into a small pool of
+    recycled arrays: a frame returned by read() stays valid until the
+    next read(). Use reuse=False to keep frames longer.
+    """
+
+    def __init__(self, source, depth=None, reuse=True):
+        self.source = source
+        self.depth = 1 if source.live else (depth or config.SOURCE_READ_AHEAD)
+        self.reuse = reuse
+        self.frames = 0
+        self.dropped = 0
+
+        # Decode buffers: queued frames, the consumer's frame and the one being read
+        self._free = [None] * (self.depth + 2)
+        self._ready = deque()
+        self._held = None
+        self._cond = threading.Condition()
+        self._done = False
+        self._thread = threading.Thread(target=self._loop, name=f"source-{source.name}")
+        self._thread.daemon = True
+
+    @property
+    def name(self):
+        return self.source.name
+
+    @property
+    def fps(self):
+        return self.source.fps
+
+    @property
+    def finished(self):
+        """True once the source ended and every frame was read."""
+        with self._cond:
+            return self._done and not self._ready
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        source = self.source
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._done or len(self._ready) < self.depth or source.live)
+                if self._done:
+                    break
+                out = self._free.pop() if self.reuse else None
+
+            ok, frame, timestamp = source.read(out)
+            if not ok:
+                break
+
+            with self._cond:
+                if len(self._ready) >= self.depth:
+                    # Newest frame wins
+                    stale, _ = self._ready.popleft()
+                    self._recycle(stale)
+                    self.dropped += 1
+                self._ready.append((frame, timestamp))
+                self.frames += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def _recycle(self, frame):
+        if self.reuse:
+            self._free.append(frame)
+
+    def read(self, timeout=None):
+        """
+        Next frame as (ok, frame, timestamp). ok is False on timeout or
+        once the source has ended (see `finished`).
+        """
+        with self._cond:
+            if self._held is not None:
+                self._recycle(self._held)
+                self._held = None
+                self._cond.notify_all()
+            if not self._cond.wait_for(lambda: self._ready or self._done, timeout) or not self._ready:
+                return False, None, None
+            frame, timestamp = self._ready.popleft()
+            self._held = frame
+            self._cond.notify_all()
+            return True, frame, timestamp
+
+    def release(self):
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+        # Let the reader leave read() before the capture is closed under it
+        self.source.stop()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self.source.release()
+
+
+# ==========================================
+# FACTORY
+# ==========================================
+def make_source(spec, width=None, height=None):
+    """
+    FrameSource for a camera index or /dev/video* path, a video file, an
+    image folder, a stream URL (rtsp://...) or a GStreamer pipeline.
+    """
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return CameraSource(int(spec), width, height)
+    if spec.startswith("/dev/video"):
+        return CameraSource(spec, width, height)
+    if spec.startswith(STREAM_PREFIXES) or " ! " in spec:
+        return StreamSource(spec)
+    if os.path.isdir(spec):
+        return ImageDirSource(spec)
+    return VideoFileSource(spec)
+
+
+def open_source(spec, width=None, height=None, read_ahead=True):
+    """
+    Opens `spec` (see make_source) and, by default, starts reading ahead.
+    A live source that cannot be opened yet keeps retrying in the
+    background; a file or folder that cannot be opened raises IOError.
+    """
+    source = make_source(spec, width, height)
+    if not source.open():
+        if not source.live:
+            raise IOError(f"Cannot open {spec}")
+        print(f"⚠️  Cannot open {source.name} yet, retrying in the background...")
+    elif isinstance(source, CameraSource):
+        print(f"📷 {source.name}: {source.describe()}")
+    return ReadAhead(source).start() if read_ahead else source
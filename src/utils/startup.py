@@ -0,0 +1,29 @@
+import time
+from src.utils.metrics import metrics
+
+
+class StartupTimer:
+    """
+    Seconds from startup to each milestone (camera open, models loaded,
+    first frame...). Milestones are also exported as the
+    `startup_seconds{stage=...}` gauge.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = {}
+
+    def mark(self, name):
+        elapsed = time.perf_counter() - self.start
+        self.marks[name] = elapsed
+        metrics.gauge("startup_seconds", round(elapsed, 3), stage=name)
+        return elapsed
+
+    def timed(self, name, fn, *args, **kwargs):
+        """Calls fn(*args, **kwargs) and marks `name` when it returns."""
+        result = fn(*args, **kwargs)
+        self.mark(name)
+        return result
+
+    def summary(self):
+        return " | ".join(f"{name} {elapsed:.1f}s" for name, elapsed in self.marks.items())
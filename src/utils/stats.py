@@ -0,0 +1,31 @@
+import threading
+
+
+class StageStats:
+    """Latency counters for one processing stage (thread-safe)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed):
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.last_time = elapsed
+            if elapsed > self.max_time:
+                self.max_time = elapsed
+
+    def snapshot(self):
+        with self._lock:
+            avg = self.total_time / self.count if self.count else 0.0
+            return {
+                "count": self.count,
+                "avg_ms": avg * 1000,
+                "max_ms": self.max_time * 1000,
+                "last_ms": self.last_time * 1000,
+            }
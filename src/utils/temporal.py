@@ -0,0 +1,281 @@
+import math
+import numpy as np
+import src.config as config
+
+
+class Event:
+    """A behavior starting or stopping at `time` (seconds)."""
+
+    def __init__(self, name, kind, time, duration=0.0, track_id=None):
+        self.name = name          # e.g. "drowsy", "distracted", "phone"
+        self.kind = kind          # "start" or "stop"
+        self.time = time
+        self.duration = duration  # How long the behavior lasted (stop events)
+        self.track_id = track_id  # Object or face track (src/utils/tracker.py), if any
+
+    def __repr__(self):
+        track = f" #{self.track_id}" if self.track_id is not None else ""
+        return f"Event({self.name}{track} {self.kind} t={self.time:.2f} dur={self.duration:.2f})"
+
+
+class TimeWindow:
+    """
+    Values from the last `duration` seconds in a fixed ring buffer, with
+    running sums, so push() and mean() are O(1) (amortized) whatever the
+    frame rate. `width` > 1 keeps several channels side by side.
+
+    The ring holds `duration * max_fps` samples; beyond that the oldest
+    samples are dropped early.
+    """
+
+    def __init__(self, duration, width=1, max_fps=None):
+        self.duration = duration
+        self.capacity = max(int(math.ceil(duration * (max_fps or config.MAX_FPS))) + 1, 2)
+        self.width = width
+        self._times = np.zeros(self.capacity, dtype=np.float64)
+        self._values = np.zeros((self.capacity, width), dtype=np.float64)
+        self._sum = np.zeros(width, dtype=np.float64)
+        self._head = 0   # Oldest sample
+        self.count = 0
+
+    def _evict(self):
+        self._sum -= self._values[self._head]
+        self._head = (self._head + 1) % self.capacity
+        self.count -= 1
+
+    def push(self, t, value):
+        while self.count and self._times[self._head] <= t - self.duration:
+            self._evict()
+        if self.count == self.capacity:
+            self._evict()
+
+        i = (self._head + self.count) % self.capacity
+        self._times[i] = t
+        self._values[i] = value
+        self._sum += self._values[i]
+        self.count += 1
+
+    def mean(self):
+        """Mean per channel (a float for width 1); zeros when empty."""
+        mean = self._sum / self.count if self.count else np.zeros(self.width)
+        return float(mean[0]) if self.width == 1 else mean
+
+    def span(self):
+        """Seconds covered by the samples in the window."""
+        if not self.count:
+            return 0.0
+        last = (self._head + self.count - 1) % self.capacity
+        return float(self._times[last] - self._times[self._head])
+
+    def clear(self):
+        self._sum[:] = 0
+        self._head = 0
+        self.count = 0
+
+    def clear_columns(self, columns):
+        """Zeroes some channels in every sample, e.g. the ones of a face that left."""
+        self._values[:, columns] = 0
+        self._sum[columns] = 0
+
+
+class Ema:
+    """Exponential moving average with a time constant `tau` (seconds), not a per-frame alpha."""
+
+    def __init__(self, tau):
+        self.tau = tau
+        self.value = None
+        self._last = None
+
+    def update(self, t, value):
+        if self.value is None or self.tau <= 0:
+            self.value = value
+        else:
+            alpha = 1.0 - math.exp(-max(t - self._last, 0.0) / self.tau)
+            self.value += alpha * (value - self.value)
+        self._last = t
+        return self.value
+
+    def reset(self):
+        self.value = None
+        self._last = None
+
+
+class Hysteresis:
+    """
+    Boolean with separate on / off thresholds so a value hovering around
+    one threshold does not flicker. With `below=True` the state turns on
+    when the value drops below `on` and off once it rises above `off`.
+    """
+
+    def __init__(self, on, off, below=False):
+        self.on = on
+        self.off = off
+        self.below = below
+        self.state = False
+
+    def update(self, value):
+        if self.below:
+            self.state = value < self.on if not self.state else value <= self.off
+        else:
+            self.state = value > self.on if not self.state else value >= self.off
+        return self.state
+
+    def reset(self):
+        self.state = False
+
+
+class Track:
+    """
+    Debounced on/off state of one behavior. Becomes active once the raw
+    signal has been true for `min_on` seconds and inactive once it has been
+    false for `min_off` seconds. update() returns the start / stop Event on
+    the transition, None otherwise.
+    """
+
+    def __init__(self, name, min_on=0.0, min_off=0.0):
+        self.name = name
+        self.min_on = min_on
+        self.min_off = min_off
+        self.active = False
+        self.started = None     # Time the active period began (first raw True)
+        self._raw_since = None  # Time the raw signal last changed
+        self._raw = False
+
+    def update(self, t, raw):
+        if raw != self._raw:
+            self._raw = raw
+            self._raw_since = t
+        if self._raw_since is None:
+            self._raw_since = t
+
+        held = t - self._raw_since
+        if not self.active and raw and held >= self.min_on:
+            self.active = True
+            self.started = self._raw_since
+            return Event(self.name, "start", t)
+        if self.active and not raw and held >= self.min_off:
+            self.active = False
+            return Event(self.name, "stop", t, self._raw_since - self.started)
+        return None
+
+    def reset(self, t):
+        """Ends the track now (e.g. the face was lost). Returns the stop Event, if any."""
+        event = None
+        if self.active:
+            event = Event(self.name, "stop", t, t - self.started)
+        self.active = False
+        self._raw = False
+        self._raw_since = None
+        return event
+
+
+class HysteresisArray:
+    """Hysteresis for `size` independent values (rows), updated together."""
+
+    def __init__(self, size, on, off, below=False):
+        self.on = on
+        self.off = off
+        self.below = below
+        self.state = np.zeros(size, dtype=bool)
+
+    def update(self, values, rows):
+        """Updates `rows` with their new `values`. Returns their states."""
+        state = self.state[rows]
+        if self.below:
+            state = np.where(state, values <= self.off, values < self.on)
+        else:
+            state = np.where(state, values >= self.off, values > self.on)
+        self.state[rows] = state
+        return state
+
+    def reset(self, rows):
+        self.state[rows] = False
+
+
+class TrackArray:
+    """
+    Track for `size` rows at once (one per face), with the same rules.
+    update() and reset() take the rows and the track ID of each row and
+    return the start / stop Events, tagged with those IDs.
+    """
+
+    def __init__(self, name, size, min_on=0.0, min_off=0.0):
+        self.name = name
+        self.min_on = min_on
+        self.min_off = min_off
+        self.active = np.zeros(size, dtype=bool)
+        self.started = np.zeros(size, dtype=np.float64)
+        self._raw = np.zeros(size, dtype=bool)
+        self._raw_since = np.full(size, np.nan)
+
+    def update(self, t, raw, rows, ids):
+        raw = np.asarray(raw, dtype=bool)
+        changed = (raw != self._raw[rows]) | np.isnan(self._raw_since[rows])
+        self._raw[rows] = raw
+        self._raw_since[rows[changed]] = t
+
+        since = self._raw_since[rows]
+        active = self.active[rows]
+        start = ~active & raw & (t - since >= self.min_on)
+        stop = active & ~raw & (t - since >= self.min_off)
+
+        events = [Event(self.name, "start", t, track_id=int(ids[i])) for i in np.flatnonzero(start)]
+        events += [Event(self.name, "stop", t, float(since[i] - self.started[rows[i]]), int(ids[i]))
+                   for i in np.flatnonzero(stop)]
+        self.started[rows[start]] = since[start]
+        self.active[rows[start]] = True
+        self.active[rows[stop]] = False
+        return events
+
+    def reset(self, t, rows, ids):
+        """Ends the tracks of `rows` now (face lost). Returns the stop Events."""
+        events = [Event(self.name, "stop", t, float(t - self.started[row]), int(track_id))
+                  for row, track_id in zip(rows, ids) if self.active[row]]
+        self.active[rows] = False
+        self._raw[rows] = False
+        self._raw_since[rows] = np.nan
+        return events
+
+
+class RowOwners:
+    """
+    Which face track owns each row of a detector's per-face state arrays.
+    update() records this frame's owners and returns the rows whose state
+    must be reset first: rows of faces that are not visible any more, and
+    rows handed over to another face. Each such row is returned once.
+    """
+
+    def __init__(self, size):
+        self.ids = np.full(size, -1, dtype=np.int64)
+
+    def update(self, rows, ids):
+        """Returns (stale_rows, their_previous_ids)."""
+        stale = self.ids >= 0
+        stale[rows] = (self.ids[rows] >= 0) & (self.ids[rows] != ids)
+        stale_rows = np.flatnonzero(stale)
+        stale_ids = self.ids[stale_rows]
+        self.ids[stale_rows] = -1
+        self.ids[rows] = ids
+        return stale_rows, stale_ids
+
+
+class PresenceTracks:
+    """One debounced Track per object label, fed with the labels seen in each frame."""
+
+    def __init__(self, labels, min_on=None, min_off=None):
+        min_on = config.OBJECT_MIN_SECONDS if min_on is None else min_on
+        min_off = config.OBJECT_RELEASE_SECONDS if min_off is None else min_off
+        self.tracks = {label: Track(label, min_on, min_off) for label in labels}
+
+    def update(self, t, labels):
+        """`labels` is a set of labels present now. Returns the list of events."""
+        events = []
+        for label, track in self.tracks.items():
+            event = track.update(t, label in labels)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def active(self, label):
+        track = self.tracks.get(label)
+        return track is not None and track.active
@@ -0,0 +1,232 @@
+import itertools
+import numpy as np
+import src.config as config
+from src.utils.temporal import Event
+
+
+def box_iou(a, b):
+    """IoU matrix between (N, 4) and (M, 4) xyxy boxes."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(np.clip(a[:, 2:] - a[:, :2], 0, None), axis=1)
+    area_b = np.prod(np.clip(b[:, 2:] - b[:, :2], 0, None), axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def xyxy_to_state(box):
+    x1, y1, x2, y2 = box
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=np.float64)
+
+
+def state_to_xyxy(state):
+    cx, cy, w, h = state[:4]
+    w, h = max(w, 1.0), max(h, 1.0)
+    return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+class KalmanBoxTrack:
+    """
+    One tracked object: constant-velocity Kalman filter over
+    (cx, cy, w, h) and their velocities in pixels per second, so prediction
+    works for any gap between YOLO runs. Noise scales with the box size.
+    """
+
+    _H = np.hstack([np.eye(4), np.zeros((4, 4))])
+
+    def __init__(self, track_id, obj, timestamp):
+        self.track_id = track_id
+        self.label = obj['label']
+        self.class_id = obj.get('class_id')
+        self.conf = obj['conf']
+
+        self.x = np.zeros(8)
+        self.x[:4] = xyxy_to_state(obj['box'])
+        size = max(self.x[2], self.x[3])
+        self.P = np.diag([(0.1 * size) ** 2] * 4 + [(1.0 * size) ** 2] * 4)
+
+        self.time = timestamp          # Time of self.x
+        self.first_seen = timestamp
+        self.last_update = timestamp
+        self.hits = 1
+        self.confirmed = False
+
+    def _transition(self, dt):
+        F = np.eye(8)
+        F[:4, 4:] = np.eye(4) * dt
+        size = max(self.x[2], self.x[3], 1.0)
+        q = np.array([(0.05 * size) ** 2] * 4 + [(0.5 * size) ** 2] * 4) * dt
+        return F, np.diag(q)
+
+    def predict(self, timestamp):
+        """Advances the filter to `timestamp` (in place)."""
+        dt = max(timestamp - self.time, 0.0)
+        if dt > 0:
+            F, Q = self._transition(dt)
+            self.x = F @ self.x
+            self.P = F @ self.P @ F.T + Q
+            self.time = timestamp
+
+    def update(self, obj, timestamp):
+        self.predict(timestamp)
+        z = xyxy_to_state(obj['box'])
+        size = max(z[2], z[3], 1.0)
+        R = np.eye(4) * (0.05 * size) ** 2
+        H = self._H
+        S = H @ self.P @ H.T + R
+        K = self.P @ H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - H @ self.x)
+        self.P = (np.eye(8) - K @ H) @ self.P
+
+        self.conf = obj['conf']
+        self.last_update = timestamp
+        self.hits += 1
+
+    def box_at(self, timestamp):
+        """Predicted xyxy box at `timestamp` without changing the filter."""
+        dt = min(max(timestamp - self.time, 0.0), config.TRACK_MAX_AGE)
+        state = self.x[:4] + self.x[4:] * dt
+        return state_to_xyxy(state)
+
+
+class ObjectTracker:
+    """
+    SORT-style tracker for the YOLO detections.
+
+    observe() feeds each new DetectionResult. Detections are matched to the
+    tracks' predicted boxes of the same class by IoU (Hungarian assignment,
+    at least TRACK_IOU_MIN). A track is shown once it has TRACK_MIN_HITS
+    detections and is dropped TRACK_MAX_AGE seconds after its last one.
+    objects(t) returns the confirmed tracks with boxes predicted to time t,
+    so boxes keep moving on the frames where YOLO is skipped.
+
+    Tracks emit "start" / "stop" Events (one per object, not per detection).
+    """
+
+    def __init__(self):
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self._last_frame_id = None
+
+    def observe(self, result, now):
+        """
+        Feeds the latest DetectionResult (or None) at time `now`; a result
+        already seen is ignored. Returns the list of Events.
+        """
+        events = []
+        if result is not None and result.frame_id != self._last_frame_id:
+            self._last_frame_id = result.frame_id
+            events = self.update(result.objects, result.timestamp)
+        return events + self.expire(now)
+
+    def update(self, objects, timestamp):
+        tracks = self.tracks
+        for track in tracks:
+            track.predict(timestamp)
+
+        unmatched = list(range(len(objects)))
+        if tracks and objects:
+            track_boxes = np.array([state_to_xyxy(t.x) for t in tracks])
+            det_boxes = np.array([obj['box'] for obj in objects], dtype=np.float64)
+            iou = box_iou(track_boxes, det_boxes)
+            # Never match across classes
+            same_class = np.array([[t.label == obj['label'] for obj in objects] for t in tracks])
+            iou[~same_class] = 0
+
+            # Imported on first use: scipy adds ~0.4 s to startup
+            from scipy.optimize import linear_sum_assignment
+            rows, cols = linear_sum_assignment(-iou)
+            matched = set()
+            for r, c in zip(rows, cols):
+                if iou[r, c] >= config.TRACK_IOU_MIN:
+                    tracks[r].update(objects[c], timestamp)
+                    matched.add(c)
+            unmatched = [c for c in unmatched if c not in matched]
+
+        for c in unmatched:
+            tracks.append(KalmanBoxTrack(next(self._ids), objects[c], timestamp))
+
+        events = []
+        for track in tracks:
+            if not track.confirmed and track.hits >= config.TRACK_MIN_HITS:
+                track.confirmed = True
+                events.append(Event(track.label, "start", timestamp, track_id=track.track_id))
+        return events
+
+    def expire(self, timestamp):
+        """Drops tracks not detected for TRACK_MAX_AGE seconds before `timestamp`."""
+        events, alive = [], []
+        for track in self.tracks:
+            if timestamp - track.last_update > config.TRACK_MAX_AGE:
+                if track.confirmed:
+                    events.append(Event(track.label, "stop", timestamp,
+                                        track.last_update - track.first_seen, track.track_id))
+            else:
+                alive.append(track)
+        self.tracks = alive
+        return events
+
+    def objects(self, timestamp):
+        """Confirmed tracks as detection dicts (plus 'track_id'), boxes predicted to `timestamp`."""
+        objects = []
+        for track in self.tracks:
+            if not track.confirmed or timestamp - track.last_update > config.TRACK_MAX_AGE:
+                continue
+            objects.append({
+                'label': track.label,
+                'conf': track.conf,
+                'box': [int(v) for v in track.box_at(timestamp)],
+                'class_id': track.class_id,
+                'track_id': track.track_id,
+            })
+        return objects
+
+
+class FaceTracks:
+    """
+    Stable IDs for the faces of consecutive frames (multi-face mode).
+
+    Faces are matched to the boxes they had in their last frame by IoU
+    (Hungarian assignment, at least FACE_ID_IOU_MIN); a face that is lost
+    keeps its ID for FACE_ID_MAX_AGE seconds in case it comes back. Each
+    ID owns one of MAX_TRACKED_FACES rows: the index of that face's state
+    in the detectors' per-face arrays.
+    """
+
+    def __init__(self, rows=None, iou_min=None, max_age=None):
+        self.rows = rows or config.MAX_TRACKED_FACES
+        self.iou_min = config.FACE_ID_IOU_MIN if iou_min is None else iou_min
+        self.max_age = config.FACE_ID_MAX_AGE if max_age is None else max_age
+        self.ids = np.full(self.rows, -1, dtype=np.int64)   # -1 = free row
+        self.boxes = np.zeros((self.rows, 4), dtype=np.float64)
+        self.last_seen = np.full(self.rows, -np.inf)
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, timestamp):
+        """
+        Assigns the (F, 4) face boxes of a frame to face tracks.
+        Returns (rows, ids), two (F,) int arrays in the order of `boxes`.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64)
+        self.ids[timestamp - self.last_seen > self.max_age] = -1
+
+        rows = np.full(len(boxes), -1, dtype=np.intp)
+        live = np.flatnonzero(self.ids >= 0)
+        if len(live) and len(boxes):
+            iou = box_iou(boxes, self.boxes[live])
+            from scipy.optimize import linear_sum_assignment  # See ObjectTracker.update
+            r, c = linear_sum_assignment(-iou)
+            ok = iou[r, c] >= self.iou_min
+            rows[r[ok]] = live[c[ok]]
+
+        new = np.flatnonzero(rows < 0)
+        if len(new):
+            # Free rows first, then the ones of the faces lost the longest
+            order = np.lexsort((self.last_seen, self.ids >= 0))
+            order = order[~np.isin(order, rows)]
+            rows[new] = order[:len(new)]
+            self.ids[rows[new]] = [next(self._ids) for _ in new]
+
+        self.boxes[rows] = boxes
+        self.last_seen[rows] = timestamp
+        return rows, self.ids[rows].copy()
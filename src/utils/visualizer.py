@@ -1,59 +1,214 @@
 #/Users/mohsinniaz/BehaviorDetector/src/utils/visualizer.py
 
+from collections import OrderedDict
 import cv2
+import numpy as np
 import src.config as config
 
+class Sprite:
+    """
+    Pre-rendered overlay: BGR pixels plus the (uint8) mask of the pixels drawn.
+    `offset` is the sprite's top-left corner relative to the anchor it was
+    rendered for (e.g. a text baseline origin), `advance` the text width.
+    """
+    def __init__(self, image, mask, offset, advance=0):
+        self.image = image
+        self.mask = mask
+        self.offset = offset
+        self.advance = advance
+
+    def blit(self, frame, x, y):
+        """Copies the drawn pixels onto `frame` with the anchor at (x, y), clipped to the frame."""
+        h, w = self.mask.shape[:2]
+        fh, fw = frame.shape[:2]
+        x0, y0 = x + self.offset[0], y + self.offset[1]
+        sx, sy = max(-x0, 0), max(-y0, 0)
+        ex, ey = min(w, fw - x0), min(h, fh - y0)
+        if sx >= ex or sy >= ey:
+            return
+        # Masked copy straight into the frame region (much faster than np.copyto(where=))
+        cv2.copyTo(self.image[sy:ey, sx:ex], self.mask[sy:ey, sx:ex],
+                   frame[y0 + sy:y0 + ey, x0 + sx:x0 + ex])
+
+class SpriteCache:
+    """
+    LRU cache of sprites. On a miss, build() returns the drawing ops and
+    the advance: ops are ("text", text, org, scale, color, thickness) or
+    ("rect", pt1, pt2, color, thickness) with coordinates relative to the
+    anchor, so text metrics are only measured once per sprite too.
+    """
+    def __init__(self, font, maxsize=None):
+        self.font = font
+        self.maxsize = maxsize or config.VIZ_SPRITE_CACHE
+        self._sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        sprite = self._sprites[key] = self._render(*build())
+        if len(self._sprites) > self.maxsize:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def _render(self, ops, advance):
+        # Bounds of everything drawn, relative to the anchor
+        x0 = y0 = x1 = y1 = 0
+        for op in ops:
+            if op[0] == "text":
+                _, text, (ox, oy), scale, _, thickness = op
+                (tw, th), baseline = cv2.getTextSize(text, self.font, scale, thickness)
+                pad = thickness
+                boxes = [(ox - pad, oy - th - pad), (ox + tw + pad, oy + baseline + pad)]
+            else:
+                _, pt1, pt2, _, thickness = op
+                pad = max(thickness, 0)
+                boxes = [(min(pt1[0], pt2[0]) - pad, min(pt1[1], pt2[1]) - pad),
+                         (max(pt1[0], pt2[0]) + pad, max(pt1[1], pt2[1]) + pad)]
+            for bx, by in boxes:
+                x0, y0, x1, y1 = min(x0, bx), min(y0, by), max(x1, bx), max(y1, by)
+
+        image = np.zeros((y1 - y0 + 1, x1 - x0 + 1, 3), dtype=np.uint8)
+        mask = np.zeros(image.shape[:2], dtype=np.uint8)
+        shift = lambda p: (p[0] - x0, p[1] - y0)
+        for op in ops:
+            # Same calls as drawing on the frame, so a sprite matches direct drawing pixel for pixel
+            if op[0] == "text":
+                _, text, org, scale, color, thickness = op
+                cv2.putText(image, text, shift(org), self.font, scale, color, thickness)
+                cv2.putText(mask, text, shift(org), self.font, scale, 255, thickness)
+            else:
+                _, pt1, pt2, color, thickness = op
+                cv2.rectangle(image, shift(pt1), shift(pt2), color, thickness)
+                cv2.rectangle(mask, shift(pt1), shift(pt2), 255, thickness)
+
+        # Crop to the drawn pixels
+        ys, xs = np.nonzero(mask)
+        if not len(xs):
+            return Sprite(image[:0, :0], mask[:0, :0], (0, 0), advance)
+        top, bottom, left, right = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+        return Sprite(image[top:bottom, left:right].copy(), mask[top:bottom, left:right].copy(),
+                      (int(left + x0), int(top + y0)), advance)
+
 class Visualizer:
-    def __init__(self):
+    """
+    Draws the HUD from cached text sprites: each label, word and alert
+    banner is rendered once (per text, scale and color) and afterwards only
+    copied onto the frame. With `headless=True` nothing is drawn.
+    """
+    def __init__(self, headless=False):
         self.font = cv2.FONT_HERSHEY_SIMPLEX
+        self.headless = headless
+        self.sprites = SpriteCache(self.font)
+        self._space = {}
+
+    def _word(self, word, scale, color, thickness):
+        def build():
+            # getTextSize() adds the stroke thickness to the pen advance
+            advance = cv2.getTextSize(word, self.font, scale, thickness)[0][0] - thickness
+            return (("text", word, (0, 0), scale, color, thickness),), advance
+        return self.sprites.get(("word", word, scale, color, thickness), build)
+
+    def _space_width(self, scale, thickness):
+        key = (scale, thickness)
+        if key not in self._space:
+            with_space = cv2.getTextSize("a a", self.font, scale, thickness)[0][0]
+            without = cv2.getTextSize("aa", self.font, scale, thickness)[0][0]
+            self._space[key] = with_space - without
+        return self._space[key]
+
+    def draw_text(self, frame, text, position, scale, color, thickness):
+        """
+        putText() from cached sprites, one per word, so lines that mix
+        fixed labels and changing values (EAR, pitch, yaw) stay cached.
+        Words land within a pixel of where putText() would put them.
+        """
+        x, y = position
+        space = self._space_width(scale, thickness)
+        for word in text.split(" "):
+            if word:
+                sprite = self._word(word, scale, color, thickness)
+                sprite.blit(frame, x, y)
+                x += sprite.advance
+            x += space
 
     def draw_status(self, frame, key, value, position, color=(0, 255, 0)):
         """Draws a simple status line: 'Key: Value'"""
-        text = f"{key}: {value}"
-        cv2.putText(frame, text, position, self.font, 0.6, color, 2)
+        if self.headless:
+            return
+        self.draw_text(frame, f"{key}: {value}", position, 0.6, color, 2)
 
     def draw_objects(self, frame, objects):
         """Draws bounding boxes and labels for YOLO detections"""
-        if not objects:
+        if self.headless or not objects:
             return
 
         for obj in objects:
             x1, y1, x2, y2 = obj['box']
             color = config.COLORS.get(obj['class_id'], config.COLORS['default'])
-            
+
             # Draw Box
             cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            
-            # Draw Label background for better visibility
+
+            # Label with its background for better visibility, as one sprite anchored at the box corner
             label = f"{obj['label']} {int(obj['conf']*100)}%"
-            (w, h), _ = cv2.getTextSize(label, self.font, 0.6, 2)
-            cv2.rectangle(frame, (x1, y1 - 20), (x1 + w, y1), color, -1)
-            
-            # Draw Text
-            cv2.putText(frame, label, (x1, y1 - 5), self.font, 0.6, (255, 255, 255), 2)
+            if obj.get('track_id') is not None:
+                label = f"#{obj['track_id']} {label}"
+            def build():
+                (w, h), _ = cv2.getTextSize(label, self.font, 0.6, 2)
+                return (("rect", (0, -20), (w, 0), color, -1),
+                        ("text", label, (0, -5), 0.6, (255, 255, 255), 2)), w
+            self.sprites.get(("label", label, color), build).blit(frame, x1, y1)
+
+    def draw_faces(self, frame, faces):
+        """Draws a box and an ID label per face in multi-face mode. `faces` is a FaceResults (or None)."""
+        if self.headless or faces is None:
+            return
+
+        for i, face_id in enumerate(faces.ids):
+            x1, y1, x2, y2 = (int(v) for v in faces.boxes[i])
+            alarm = faces.drowsy[i] or faces.distracted[i]
+            color = (0, 0, 255) if alarm else (0, 255, 0)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+
+            if faces.drowsy[i]:
+                state = "DROWSY"
+            elif faces.distracted[i]:
+                state = "DISTRACTED"
+            else:
+                state = f"EAR {faces.ears[i]:.2f}"
+            self.draw_text(frame, f"#{face_id} {state}", (x1, y1 - 8), 0.6, color, 2)
 
     def draw_alerts(self, frame, alerts):
         """
         Draws big alert text in center of screen.
         alerts = ["PHONE DETECTED", "WAKE UP"]
         """
-        if not alerts:
+        if self.headless or not alerts:
             return
 
         h, w, _ = frame.shape
         center_x, center_y = w // 2, h // 2
-        
+
         offset = 0
         for msg in alerts:
-            (text_w, text_h), _ = cv2.getTextSize(msg, self.font, 1.2, 3)
-            # Draw red text with black outline for high visibility
-            cv2.putText(frame, msg, (center_x - text_w // 2, center_y + offset), 
-                        self.font, 1.2, (0, 0, 0), 6) # Outline
-            cv2.putText(frame, msg, (center_x - text_w // 2, center_y + offset), 
-                        self.font, 1.2, (0, 0, 255), 3) # Text
+            # Red text with black outline for high visibility, anchored at the text center
+            def build():
+                (text_w, text_h), _ = cv2.getTextSize(msg, self.font, 1.2, 3)
+                org = (-(text_w // 2), 0)
+                return (("text", msg, org, 1.2, (0, 0, 0), 6),     # Outline
+                        ("text", msg, org, 1.2, (0, 0, 255), 3)), text_w  # Text
+            self.sprites.get(("alert", msg), build).blit(frame, center_x, center_y + offset)
             offset += 50
 
     def draw_fps(self, frame, fps):
+        if self.headless:
+            return
         h, w, _ = frame.shape
-        cv2.putText(frame, f"FPS: {int(fps)}", (w - 120, 40), 
-                    self.font, 0.7, (255, 255, 0), 2)
\ No newline at end of file
+        self.draw_text(frame, f"FPS: {int(fps)}", (w - 120, 40), 0.7, (255, 255, 0), 2)
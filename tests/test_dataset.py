@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+from src.utils.dataset import DatasetWriter, HashIndex, dhash
+
+
+def scene(seed, shape=(480, 640)):
+    """A smooth random image, like a camera frame at low detail."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (12, 16, 3), dtype=np.uint8)
+    return cv2.resize(small, shape[::-1], interpolation=cv2.INTER_CUBIC)
+
+
+def bits(a, b):
+    return bin(int(a) ^ int(b)).count("1")
+
+
+def test_dhash_is_stable_under_small_changes():
+    image = scene(0)
+    noisy = np.clip(image + np.random.default_rng(1).normal(0, 3, image.shape), 0, 255).astype(np.uint8)
+    brighter = cv2.convertScaleAbs(image, alpha=1.0, beta=20)
+    assert bits(dhash(image), dhash(noisy)) <= 4
+    assert bits(dhash(image), dhash(brighter)) <= 4
+    assert bits(dhash(image), dhash(scene(2))) > 16
+
+
+def test_dhash_gray_matches_color():
+    image = scene(3)
+    assert bits(dhash(image), dhash(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))) <= 2
+
+
+def test_hash_index_nearest_and_growth():
+    index = HashIndex(distance=6)
+    assert index.nearest(np.uint64(0)) == 65 and not index.is_duplicate(np.uint64(0))
+    hashes = [np.uint64(1 << i) for i in range(64)] * 20  # More than the initial 1024
+    for h in hashes:
+        index.add(h)
+    assert index.count == len(hashes)
+    assert index.nearest(np.uint64(0)) == 1
+    assert index.nearest(np.uint64(0b111)) == 2
+    assert index.is_duplicate(np.uint64(0x7F)) and not index.is_duplicate(np.uint64(0xFF))
+    assert HashIndex(distance=-1).is_duplicate(np.uint64(0)) is False
+
+
+def test_writer_and_folder_index(tmp_path):
+    writer = DatasetWriter(str(tmp_path), workers=2)
+    stems = [writer.save(scene(i), "phone", 1000.0 + i) for i in range(3)]
+    writer.close()
+    assert writer.saved == 3 and len(set(stems)) == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(s + ".jpg" for s in stems)
+
+    index = HashIndex(distance=6)
+    assert index.add_folder(str(tmp_path)) == 3
+    # The reduced-size decode of a saved JPEG hashes like the original frame
+    assert index.is_duplicate(dhash(scene(1)))
+    assert not index.is_duplicate(dhash(scene(10)))
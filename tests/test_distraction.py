@@ -0,0 +1,19 @@
+import numpy as np
+from benchmarks.head_pose import affine_vs_pnp, make_poses
+from src.detectors.distraction import DistractionDetector
+
+
+def test_head_poses_match_pnp():
+    errors, same_sign = affine_vs_pnp(make_poses(300, 1280, 720), 1280, 720)
+    median = np.median(errors, axis=0)
+    assert (median < [1.0, 2.0, 1.5]).all()
+    assert (errors.max(axis=0) < 5.0).all()
+    assert same_sign > 0.95
+
+
+def test_head_poses_off_center_need_camera():
+    # Without the camera the fit measures pose against the line of sight
+    points = make_poses(300, 1280, 720)
+    pnp = np.array([DistractionDetector(warm_start=False).get_head_pose(p, 1280, 720) for p in points])
+    plain = DistractionDetector.get_head_poses(points)
+    assert np.median(np.abs(plain[:, 1] - pnp[:, 1])) > 3.0
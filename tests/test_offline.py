@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+import pytest
+import src.config as config
+import src.offline as offline
+from src.detectors.distraction import DistractionDetector, MODEL_POINTS
+from src.detectors.landmarks import NUM_LANDMARKS, POSE_IDXS
+
+FRAMES = 90
+SIZE = (160, 120)
+
+
+class LaggingMesh:
+    """
+    Stand-in for the video-mode FaceMesh: the head yaw is read from the
+    frame's brightness, and like MediaPipe's tracking the result depends on
+    the frames seen since the last reset().
+    """
+
+    def __init__(self):
+        self.camera = DistractionDetector().get_camera(*SIZE)
+        self.resets = 0
+        self._last = None
+
+    def reset(self):
+        self.resets += 1
+        self._last = None
+
+    def get_points(self, frame, rgb=None):
+        yaw = float(frame.mean()) / 2 - 30
+        if self._last is not None:
+            yaw = 0.5 * (yaw + self._last)
+        self._last = yaw
+        rvec, _ = cv2.Rodrigues(np.diag([1.0, -1.0, -1.0]) @ cv2.Rodrigues(np.radians([0.0, yaw, 0.0]))[0])
+        projected, _ = cv2.projectPoints(MODEL_POINTS, rvec, np.array([[0.0], [0.0], [2900.0]]), *self.camera)
+        points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        points[POSE_IDXS, :2] = projected[:, 0]
+        return points
+
+
+class NoDetections:
+    def detect_batch(self, frames):
+        return self
+
+    def frame(self, i):
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.int32), np.zeros(0, np.float32)
+
+
+@pytest.fixture
+def video(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "FACE_TRACKING", False)
+    monkeypatch.setattr(offline, "_models", {"face_mesh": LaggingMesh(), "object_det": NoDetections()})
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, SIZE)
+    for i in range(FRAMES):
+        # Head turned away for frames 30-69
+        writer.write(np.full(SIZE[::-1] + (3,), 160 if 30 <= i < 70 else 60, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_jobs_do_not_depend_on_earlier_jobs(video):
+    alone, _ = offline.analyze_range(video, 45, 90, 1, 8, False)
+    offline.analyze_range(video, 0, 45, 1, 8, False)
+    after, _ = offline.analyze_range(video, 45, 90, 1, 8, False)
+    np.testing.assert_array_equal(alone, after)
+    assert offline._models["face_mesh"].resets == 3
+
+
+def test_chunk_boundary_acts_as_reset(video):
+    whole, _ = offline.analyze_range(video, 0, FRAMES, 1, 8, False)
+    first, _ = offline.analyze_range(video, 0, 45, 1, 8, False)
+    second, _ = offline.analyze_range(video, 45, FRAMES, 1, 8, False)
+    chunked = np.concatenate([first, second])
+
+    assert whole["distracted"][44] and chunked["distracted"][44]
+    # The turn continues past frame 45, but the second chunk needs DISTRACTION_SECONDS again
+    held = int(np.ceil(config.DISTRACTION_SECONDS * 30))
+    assert whole["distracted"][45:45 + held].all()
+    assert not chunked["distracted"][45:45 + held - 1].any()
+    np.testing.assert_array_equal(whole["frame"], chunked["frame"])
+    np.testing.assert_array_equal(whole["distracted"][:45], chunked["distracted"][:45])
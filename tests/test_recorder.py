@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import pytest
+import src.config as config
+from src.pipeline import FramePacket
+from src.utils.recorder import SessionReader, SessionRecorder, chunk_name
+from src.utils.temporal import Event
+
+T0 = 1_700_000_000.0  # Multiple of the chunk length below
+
+
+@pytest.fixture
+def recorder(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "RECORD_CHUNK_SECONDS", 10)
+    monkeypatch.setattr(config, "RECORD_BATCH_ROWS", 16)
+    return SessionRecorder("test", str(tmp_path))
+
+
+def record_frames(recorder, times):
+    for i, t in enumerate(times):
+        packet = FramePacket(i, t, None)
+        packet.face = i % 5 != 0
+        packet.ear_score = 0.3 if packet.face else 0.0
+        packet.is_drowsy = i % 7 == 0
+        recorder.record_packet(packet)
+
+
+def test_round_trip_across_chunks(recorder):
+    times = T0 + np.arange(0, 35, 0.25)
+    record_frames(recorder, times)
+    recorder.close()
+
+    reader = SessionReader(recorder.path)
+    assert reader.chunks("frames") == [int(T0), int(T0) + 10, int(T0) + 20, int(T0) + 30]
+    rows = reader.query("frames")
+    np.testing.assert_array_equal(rows["time"], times)
+    np.testing.assert_array_equal(rows["frame"], np.arange(len(times)))
+    np.testing.assert_array_equal(rows["faces"], np.arange(len(times)) % 5 != 0)
+    np.testing.assert_array_equal(rows["drowsy"], np.arange(len(times)) % 7 == 0)
+
+    # A range query reads only its rows, across a chunk boundary
+    part = reader.query("frames", T0 + 8, T0 + 12.5, columns=["frame"])
+    np.testing.assert_array_equal(part["frame"], np.arange(32, 50))
+    assert reader.chunks("frames", T0 + 8, T0 + 12.5) == [int(T0), int(T0) + 10]
+
+
+def test_late_events_are_found(recorder):
+    recorder.record("events", (T0 + 12.0, b"drowsy", b"start", 0.0, -1))
+    recorder.flush(block=True)
+    # Arrives after a newer row was written: lands in the open chunk, not its own
+    recorder.record("events", (T0 + 9.5, b"phone", b"start", 0.0, 3))
+    recorder.record("events", (T0 + 13.0, b"drowsy", b"stop", 1.0, -1))
+    recorder.close()
+
+    reader = SessionReader(recorder.path)
+    late = reader.query("events", T0, T0 + 10)
+    assert late["name"].tolist() == [b"phone"] and late["track_id"].tolist() == [3]
+    assert len(reader.query("events")) == 3
+    times, counts = reader.aggregate("events", 10)
+    assert times.tolist() == [T0, T0 + 10] and counts.tolist() == [1, 2]
+
+
+def test_reader_ignores_partial_rows(recorder):
+    record_frames(recorder, T0 + np.arange(10) * 0.5)
+    recorder.close()
+    # A row being written: the ear column is one value longer than the others
+    path = os.path.join(recorder.path, "frames", chunk_name(T0), "ear.bin")
+    with open(path, "ab") as f:
+        f.write(np.float32(0.2).tobytes())
+    assert len(SessionReader(recorder.path).query("frames")) == 10
+
+
+def test_record_packet_writes_faces_and_events(recorder):
+    packet = FramePacket(1, T0 + 1, None)
+    packet.face = True
+    packet.events = [Event("drowsy", "start", T0 + 1)]
+    recorder.record_packet(packet)
+    recorder.close()
+    reader = SessionReader(recorder.path)
+    assert reader.query("frames")["faces"].tolist() == [1]
+    assert reader.query("events")["name"].tolist() == [b"drowsy"]
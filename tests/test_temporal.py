@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from src.utils.temporal import Hysteresis, HysteresisArray, Track, TrackArray, TimeWindow
+
+
+def test_time_window_mean_covers_last_duration():
+    window = TimeWindow(1.0, max_fps=10)
+    for i in range(30):
+        window.push(i * 0.1, float(i))
+    # Samples newer than t - 1.0: i = 20..29
+    assert window.count == 10
+    assert window.mean() == pytest.approx(np.mean(range(20, 30)))
+    assert window.span() == pytest.approx(0.9)
+
+
+def test_time_window_drops_oldest_when_full():
+    window = TimeWindow(1.0, max_fps=4)
+    for i in range(20):
+        window.push(i * 0.01, 1.0 if i < 10 else 3.0)
+    assert window.count == window.capacity
+    assert window.mean() == pytest.approx(3.0)
+
+
+def test_time_window_channels():
+    window = TimeWindow(1.0, width=2, max_fps=10)
+    window.push(0.0, [1.0, 10.0])
+    window.push(0.1, [3.0, 30.0])
+    np.testing.assert_allclose(window.mean(), [2.0, 20.0])
+    window.clear_columns([1])
+    np.testing.assert_allclose(window.mean(), [2.0, 0.0])
+
+
+def test_hysteresis_does_not_flicker_between_thresholds():
+    h = Hysteresis(on=0.2, off=0.25, below=True)
+    states = [h.update(v) for v in (0.3, 0.19, 0.22, 0.24, 0.26, 0.21)]
+    assert states == [False, True, True, True, False, False]
+
+
+def test_track_needs_min_on_and_min_off():
+    track = Track("drowsy", min_on=0.5, min_off=0.25)
+    events = {}
+    for i in range(17):
+        t = i * 0.125  # Exact in binary, so the thresholds are hit exactly
+        event = track.update(t, 0.25 <= t < 1.25)
+        if event is not None:
+            events[event.kind] = event
+    assert events["start"].time == 0.75
+    assert events["stop"].time == 1.5
+    # Lasted from the first raw True to the first raw False
+    assert events["stop"].duration == pytest.approx(1.0)
+
+
+def test_track_ignores_short_blips():
+    track = Track("drowsy", min_on=0.5)
+    events = [track.update(i * 0.1, i % 4 != 0) for i in range(40)]
+    assert all(event is None for event in events)
+
+
+def test_track_reset_ends_active_period():
+    track = Track("distracted", min_on=0.0)
+    assert track.update(1.0, True).kind == "start"
+    event = track.reset(2.5)
+    assert event.kind == "stop" and event.duration == pytest.approx(1.5)
+    assert track.reset(3.0) is None
+
+
+def test_track_array_matches_track():
+    """Each row of a TrackArray behaves like its own Track."""
+    rng = np.random.default_rng(0)
+    raw = rng.random((3, 200)) < 0.7
+    tracks = [Track("drowsy", 0.3, 0.2) for _ in range(3)]
+    array = TrackArray("drowsy", 3, 0.3, 0.2)
+    rows = np.arange(3)
+    for i in range(raw.shape[1]):
+        t = i / 30
+        expected = [(row, track.update(t, bool(raw[row, i]))) for row, track in enumerate(tracks)]
+        expected = {(row, e.kind, round(e.duration, 6)) for row, e in expected if e is not None}
+        got = {(e.track_id, e.kind, round(e.duration, 6)) for e in array.update(t, raw[:, i], rows, rows)}
+        assert got == expected
+
+
+def test_hysteresis_array_matches_hysteresis():
+    rng = np.random.default_rng(1)
+    values = rng.random((4, 100))
+    single = [Hysteresis(0.6, 0.4) for _ in range(4)]
+    array = HysteresisArray(4, 0.6, 0.4)
+    for i in range(values.shape[1]):
+        expected = [h.update(v) for h, v in zip(single, values[:, i])]
+        assert array.update(values[:, i], np.arange(4)).tolist() == expected
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import src.config as config
+from src.utils.tracker import FaceTracks, ObjectTracker, box_iou
+
+
+def phone(x, y, size=40, label="phone", conf=0.9):
+    return {'label': label, 'box': [x, y, x + size, y + size], 'conf': conf}
+
+
+def test_box_iou():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float64)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float64)
+    np.testing.assert_allclose(box_iou(a, b)[0], [1.0, 1 / 3, 0.0], atol=1e-6)
+
+
+def test_track_confirmed_after_min_hits():
+    tracker = ObjectTracker()
+    events = []
+    for i in range(config.TRACK_MIN_HITS):
+        assert tracker.objects(i * 0.1) == []
+        events += tracker.update([phone(100 + i, 100)], i * 0.1)
+    assert [(e.name, e.kind, e.track_id) for e in events] == [("phone", "start", 1)]
+    assert [obj['track_id'] for obj in tracker.objects(0.2)] == [1]
+
+
+def test_crossing_objects_keep_their_ids():
+    """Two phones moving towards each other keep their IDs (IoU + constant velocity)."""
+    tracker = ObjectTracker()
+    for i in range(10):
+        t = i * 0.1
+        tracker.update([phone(100 + 20 * i, 100), phone(400 - 20 * i, 100)], t)
+    by_id = {obj['track_id']: obj['box'][0] for obj in tracker.objects(0.9)}
+    # They crossed at i = 7.5: phone 1 is now on the right
+    assert by_id[1] == pytest.approx(280, abs=3)
+    assert by_id[2] == pytest.approx(220, abs=3)
+    assert len(tracker.tracks) == 2
+
+
+def test_prediction_moves_box_between_detections():
+    tracker = ObjectTracker()
+    for i in range(8):
+        tracker.update([phone(100 + 10 * i, 100)], i * 0.1)  # 100 px/s
+    x_next = tracker.objects(0.8)[0]['box'][0]
+    assert x_next == pytest.approx(180, abs=5)
+
+
+def test_labels_never_match_across_classes():
+    tracker = ObjectTracker()
+    for i, label in enumerate(("phone", "food", "phone")):
+        tracker.update([phone(100, 100, label=label)], i * 0.1)
+    assert [(t.track_id, t.label, t.hits) for t in tracker.tracks] == [(1, "phone", 2), (2, "food", 1)]
+
+
+def test_expire_emits_stop():
+    tracker = ObjectTracker()
+    for i in range(3):
+        tracker.update([phone(100, 100)], i * 0.1)
+    events = tracker.expire(0.2 + config.TRACK_MAX_AGE + 0.01)
+    assert [(e.kind, e.track_id) for e in events] == [("stop", 1)]
+    assert events[0].duration == pytest.approx(0.2)
+    assert tracker.tracks == []
+
+
+def test_face_tracks_keep_ids_and_reuse_rows():
+    faces = FaceTracks(rows=2, iou_min=0.3, max_age=1.0)
+    rows, ids = faces.update([[0, 0, 50, 50], [100, 0, 150, 50]], 0.0)
+    assert ids.tolist() == [1, 2]
+    # Listed in the other order and moved a little: same IDs
+    rows2, ids2 = faces.update([[102, 2, 152, 52], [3, 1, 53, 51]], 0.1)
+    assert ids2.tolist() == [2, 1] and rows2.tolist() == rows[::-1].tolist()
+    faces.update([[104, 2, 154, 52]], 0.9)
+    # A new face after face 1 expired takes its row under a new ID
+    rows3, ids3 = faces.update([[104, 2, 154, 52], [300, 300, 350, 350]], 1.5)
+    assert ids3[0] == 2 and ids3[1] == 3
+    assert rows3.tolist() == [rows[1], rows[0]]
@@ -0,0 +1,114 @@
+import numpy as np
+import src.config as config
+from src.tune import DistractionSweep, DrowsySweep, ObjectSweep, Trace, grid, held_seconds, latch, score
+from src.utils.temporal import Hysteresis, PresenceTracks, Track
+
+
+def random_trace(seed, frames=600):
+    """Irregular frame times, a noisy EAR around the thresholds, face dropouts and a phone."""
+    rng = np.random.default_rng(seed)
+    time = np.cumsum(rng.uniform(0.02, 0.06, frames))
+    time -= time[0]
+    ear = np.repeat(rng.uniform(0.1, 0.35, frames // 20), 20) + rng.normal(0, 0.02, frames)
+    face = np.repeat(rng.random(frames // 10) > 0.1, 10)
+    pitch, yaw = np.repeat(rng.normal(0, 20, (2, frames // 20)), 20, axis=1) + rng.normal(0, 2, (2, frames))
+    phone = np.repeat((rng.random(frames // 40) < 0.5) * rng.uniform(0.5, 0.9, frames // 40), 40)
+    phone = np.clip(phone + rng.normal(0, 0.1, frames), 0, 1)
+    return Trace("t", time, face, ear, pitch, yaw, {"phone": phone.astype(np.float32)})
+
+
+def test_latch_matches_loop():
+    rng = np.random.default_rng(0)
+    on, off = rng.random((5, 300)) < 0.1, rng.random((5, 300)) < 0.1
+    expected = np.zeros_like(on)
+    for r in range(on.shape[0]):
+        state = False
+        for i in range(on.shape[1]):
+            state = False if off[r, i] else (True if on[r, i] else state)
+            expected[r, i] = state
+    np.testing.assert_array_equal(latch(on, off), expected)
+
+
+def test_held_seconds_matches_track():
+    rng = np.random.default_rng(1)
+    times = np.cumsum(rng.uniform(0.01, 0.1, 400))
+    raw = rng.random((3, 400)) < 0.8
+    held = held_seconds(raw, times)
+    for r, min_on in enumerate((0.0, 0.2, 0.5)):
+        track = Track("x", min_on=min_on)
+        active = []
+        for t, v in zip(times, raw[r]):
+            track.update(t, bool(v))
+            active.append(track.active)
+        np.testing.assert_array_equal(held[r] >= min_on, active)
+
+
+def test_drowsy_replay_matches_hysteresis_and_track():
+    """Each sweep row equals DrowsinessDetector's Hysteresis + Track run frame by frame."""
+    trace = random_trace(2)
+    thresholds = np.array([0.18, 0.21, 0.25])
+    frames = np.array([5, 15, 30])
+    sweep = DrowsySweep("drowsy", thresholds[:, None], frames, config.FPS)
+    active = sweep.replay(trace, sweep.grid)
+    assert active.any(axis=1).all() and not active.all(axis=1).any()
+
+    for row, (threshold, consec) in enumerate(sweep.params):
+        closed = Hysteresis(threshold, threshold + config.EAR_OPEN_THRESHOLD - config.EAR_THRESHOLD, below=True)
+        track = Track("drowsy", min_on=consec / config.FPS)
+        expected = []
+        for t, face, ear in zip(trace.time, trace.face, trace.ear):
+            if face:
+                track.update(t, closed.update(ear))
+            else:
+                closed.reset()
+                track.reset(t)
+            expected.append(track.active)
+        np.testing.assert_array_equal(active[row], expected)
+
+
+def test_distraction_replay_matches_hysteresis_and_track():
+    trace = random_trace(4)
+    sweep = DistractionSweep("distracted", grid(np.array([15.0, 25.0]), np.array([20.0, 35.0])),
+                             np.array([10, 30]), config.FPS)
+    active = sweep.replay(trace, sweep.grid)
+    assert active.any(axis=1).all() and not active.all(axis=1).any()
+
+    for row, (pitch_max, yaw_max, consec) in enumerate(sweep.params):
+        turned = Hysteresis(1.0, config.DISTRACTION_RELEASE)
+        track = Track("distracted", min_on=consec / config.FPS)
+        expected = []
+        for t, face, pitch, yaw in zip(trace.time, trace.face, trace.pitch, trace.yaw):
+            if face:
+                track.update(t, turned.update(max(abs(pitch) / pitch_max, abs(yaw) / yaw_max)))
+            else:
+                turned.reset()
+                track.reset(t)
+            expected.append(track.active)
+        np.testing.assert_array_equal(active[row], expected)
+
+
+def test_object_replay_matches_presence_tracks():
+    trace = random_trace(3)
+    sweep = ObjectSweep("phone", np.array([[0.4], [0.6]]), np.array([0.0, 0.3, 1.0]))
+    active = sweep.replay(trace, sweep.grid)
+    assert active.any(axis=1).all() and not active.all(axis=1).any()
+
+    for row, (conf, min_on) in enumerate(sweep.params):
+        presence = PresenceTracks(["phone"], min_on=min_on)
+        expected = []
+        for t, c in zip(trace.time, trace.conf["phone"]):
+            presence.update(t, {"phone"} if c >= conf else set())
+            expected.append(presence.active("phone"))
+        np.testing.assert_array_equal(active[row], expected)
+
+
+def test_score_counts_latency_and_false_alerts():
+    times = np.arange(20, dtype=np.float64)
+    active = np.zeros((2, 20), dtype=bool)
+    active[0, 5:8] = True    # Catches the interval 4-6, 1 s late
+    active[0, 15:17] = True  # False alert
+    active[1, 12:14] = True  # Only false alerts
+    latency, alerts, right = score(active, times, [(4.0, 6.0)], tolerance=1.0)
+    np.testing.assert_allclose(latency[:, 0], [1.0, np.nan])
+    assert alerts.tolist() == [2, 1]
+    assert right.tolist() == [1, 0]